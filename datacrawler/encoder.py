@@ -1,7 +1,8 @@
 from FlagEmbedding import BGEM3FlagModel
 from sqlalchemy.orm import Session
-from models import Movies, Genres, Peoples, Jobs
-from schemas import GenreSchema, CreditSchema, PeopleSchema, JobSchema
+from models import Movies, Genres
+from schemas import GenreSchema
+from top_credits import rebuild_top_credits
 from database import engine
 import pickle
 
@@ -39,59 +40,25 @@ class MovieEncoder:
                         name=genre_details.name
                     ))
 
-            # Define a set of important job titles
-            important_jobs = {'Director', 'Producer', 'Writer', 'Editor', "Original Music Composer", "Executive Producer", "Director of Photography"}
-
-            # Collect all credits
-            credits = []
-            for credit in movie.credits:
-                people = db.query(Peoples).filter(Peoples.people_id == credit.id_people).first()
-                job = db.query(Jobs).filter(Jobs.job_id == credit.id_job).first()
-                
-                if people and job:
-                    credits.append(CreditSchema(
-                        credit_id=credit.credit_id,
-                        id_movie=credit.id_movie,
-                        id_people=credit.id_people,
-                        id_job=credit.id_job,
-                        job=JobSchema(job_id=job.job_id, title=job.title),
-                        people=PeopleSchema(people_id=people.people_id, name=people.name, photo=people.photo),
-                        character_name=credit.character_name,
-                        cast_order=credit.cast_order
-                    ))
-
-
-            # Collect all credits
-            credits = []
-            for credit in movie.credits:
-                people = db.query(Peoples).filter(Peoples.people_id == credit.id_people).first()
-                job = db.query(Jobs).filter(Jobs.job_id == credit.id_job).first()
-                
-                if people and job:
-                    credits.append({
-                        'credit_id': credit.credit_id,
-                        'id_movie': credit.id_movie,
-                        'id_people': credit.id_people,
-                        'id_job': credit.id_job,
-                        'job': job.title,
-                        'people': {
-                            'people_id': people.people_id,
-                            'name': people.name,
-                            'photo': people.photo
-                        },
-                        'character_name': credit.character_name,
-                        'cast_order': credit.cast_order
-                    })
-
-            # Separate credits into actors and important jobs
-            actors = [credit for credit in credits if credit['job'] == 'Acting']
-            important_credits = [credit for credit in credits if credit['job'] in important_jobs and credit['job'] != 'Acting']
-
-            # Sort actors by cast_order and take the first 10
-            top_actors = sorted(actors, key=lambda x: (x['cast_order'] or float('inf')))[:10]
-
-            # Combine top actors and important credits, ensuring no duplicates
-            combined_credits = {credit['credit_id']: credit for credit in top_actors + important_credits}.values()
+            # Top actors and important crew, stored in MovieTopCredits for the movie details
+            top_credits = rebuild_top_credits(db, [movie.movie_id])[movie.movie_id]
+            combined_credits = [
+                {
+                    'credit_id': credit['credit_id'],
+                    'id_movie': credit['movie_id'],
+                    'id_people': credit['people_id'],
+                    'id_job': credit['job_id'],
+                    'job': credit['job_title'],
+                    'people': {
+                        'people_id': credit['people_id'],
+                        'name': credit['people_name'],
+                        'photo': credit['people_photo']
+                    },
+                    'character_name': credit['character_name'],
+                    'cast_order': credit['cast_order']
+                }
+                for credit in top_credits
+            ]
 
             # Prepare movie details for encoding
             movie_details = {
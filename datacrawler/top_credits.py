@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from models import CatalogUpdates, Credits, Jobs, MovieTopCredits, MovieUpdates, Peoples
+
+# Copy of `select_top_credits` and `rebuild_top_credits` in
+# recommendations_api/app/recommendations/top_credits.py, with the constants of its
+# config.py: the two services ship in separate images and cannot import each other.
+# Change both copies together; tests/test_top_credits.py of the API checks the constants.
+TOP_CREDITS_ACTORS = 10
+TOP_CREDITS_JOBS = (
+    "Director",
+    "Producer",
+    "Writer",
+    "Editor",
+    "Original Music Composer",
+    "Executive Producer",
+    "Director of Photography",
+)
+
+
+def select_top_credits(db: Session, movie_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+    """Selects the top 10 actors by cast order, then the important crew, of some movies.
+
+    Args:
+        db (Session): The database session.
+        movie_ids (Iterable[int]): The movies.
+
+    Returns:
+        Dict[int, List[Dict]]: The `MovieTopCredits` rows of each movie, in rank order.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return {}
+    rows = db.execute(
+        select(
+            Credits.id_movie,
+            Credits.credit_id,
+            Credits.id_people,
+            Peoples.name,
+            Peoples.photo,
+            Credits.id_job,
+            Jobs.title,
+            Credits.character_name,
+            Credits.cast_order,
+        )
+        .join(Peoples, Credits.id_people == Peoples.people_id)
+        .join(Jobs, Credits.id_job == Jobs.job_id)
+        .where(Credits.id_movie.in_(movie_ids), Jobs.title.in_(("Acting",) + TOP_CREDITS_JOBS))
+        .order_by(Credits.id_movie, Credits.credit_id)
+    ).all()
+
+    actors, crew = defaultdict(list), defaultdict(list)
+    for movie_id, credit_id, people_id, name, photo, job_id, title, character_name, cast_order in rows:
+        row = {
+            "movie_id": movie_id,
+            "credit_id": credit_id,
+            "people_id": people_id,
+            "people_name": name,
+            "people_photo": photo,
+            "job_id": job_id,
+            "job_title": title,
+            "character_name": character_name,
+            "cast_order": cast_order,
+        }
+        (actors if title == "Acting" else crew)[movie_id].append(row)
+
+    top_credits = {}
+    for movie_id in movie_ids:
+        billed = sorted(
+            actors[movie_id], key=lambda row: row["cast_order"] if row["cast_order"] is not None else float("inf")
+        )
+        selected = billed[:TOP_CREDITS_ACTORS] + crew[movie_id]
+        top_credits[movie_id] = [dict(row, rank=rank) for rank, row in enumerate(selected)]
+    return top_credits
+
+
+def rebuild_top_credits(db: Session, movie_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+    """Replaces the `MovieTopCredits` rows of some movies after their credits were ingested.
+
+    The caller commits. Returns the rows written, keyed by movie.
+    """
+    movie_ids = list(movie_ids)
+    top_credits = select_top_credits(db, movie_ids)
+    db.execute(delete(MovieTopCredits).where(MovieTopCredits.movie_id.in_(movie_ids)))
+    rows = [row for credits in top_credits.values() for row in credits]
+    if rows:
+        db.execute(insert(MovieTopCredits), rows)
+    # Read by the ETags of the recommendations API, which would not see a same-size rewrite,
+    # and by its search index, since credited names are searchable
+    now = datetime.utcnow()
+    db.merge(CatalogUpdates(source="top_credits", updated_at=now))
+    if movie_ids:
+        db.execute(delete(MovieUpdates).where(MovieUpdates.movie_id.in_(movie_ids)))
+        db.execute(insert(MovieUpdates), [{"movie_id": movie_id, "updated_at": now} for movie_id in movie_ids])
+    return top_credits
@@ -97,6 +97,7 @@ USERS_API_LOGIN_URL = 'http://users_api:8888/api/v1/login'
 GENREUSERS_API_URL = 'http://users_api:8888/api/v1/genreusers'
 RECOMMENDATIONS_API_URL = config('RECOMMENDATIONS_API_URL', default='https://localhost/api/recos')
 RECOMMENDATIONS_API_INTERNAL_URL = 'http://rec_api:8000'
+REDIS_URL = config('REDIS_URL', default='redis://redis:6379')
 
 SESSION_COOKIE_AGE = 3600
 SESSION_SAVE_EVERY_REQUEST = True
\ No newline at end of file
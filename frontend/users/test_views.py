@@ -68,6 +68,33 @@ class AuthenticationViewsTestCase(TestCase):
         self.assertEqual(session['user_id'], 123)
         self.assertEqual(session['username'], 'test@example.com')
 
+    @patch('users.views.enqueue_recommendations_warmup')
+    @patch('users.views.requests.post')
+    @patch('users.views.requests.get')
+    def test_login_queues_recommendations_warmup(self, mock_get, mock_post, mock_warmup):
+        """Test successful login warms the recommendations of the user"""
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {'access_token': 'test_token'}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'user_id': 123, 'email': 'test@example.com'}
+
+        self.client.post(self.login_url, {
+            'email': 'test@example.com',
+            'password': 'testpass'
+        })
+
+        mock_warmup.assert_called_once_with(123)
+
+    @patch('users.views.redis.Redis.from_url')
+    def test_warmup_failure_does_not_raise(self, mock_from_url):
+        """Test an unreachable Redis only skips the warm-up"""
+        from users import views
+
+        mock_from_url.side_effect = ConnectionError("Redis down")
+        views._redis_client = None
+
+        views.enqueue_recommendations_warmup(123)
+
     @patch('users.views.requests.post')
     def test_login_invalid_credentials(self, mock_post):
         """Test login with invalid credentials"""
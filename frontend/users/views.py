@@ -10,6 +10,7 @@ import mysql.connector
 from mysql.connector import Error
 import hashlib
 import bcrypt
+import redis
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +32,35 @@ def get_user_id_from_api(access_token):
         return None
 
 
+# Keys shared with the recommendations API (recommendations/warmup.py)
+WARMUP_QUEUE_KEY = 'recommendations:warmup'
+WARMUP_PENDING_KEY = 'recommendations:warmup:pending:{user_id}'
+WARMUP_PENDING_TTL = 300
+
+_redis_client = None
+
+
+def enqueue_recommendations_warmup(user_id):
+    """Asks the recommendations API to compute the user's recommendations ahead of /home/.
+
+    Fire-and-forget: a failure only costs the warm-up, never the login.
+    """
+    global _redis_client
+    if not user_id:
+        return
+    try:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+            )
+        pipeline = _redis_client.pipeline(transaction=False)
+        pipeline.lpush(WARMUP_QUEUE_KEY, user_id)
+        pipeline.set(WARMUP_PENDING_KEY.format(user_id=user_id), 1, ex=WARMUP_PENDING_TTL)
+        pipeline.execute()
+    except Exception as e:
+        logger.warning(f"Recommendations warm-up not queued for user {user_id}: {e}")
+
+
 def get_genres_from_db():
     try:
         connection = mysql.connector.connect(
@@ -84,6 +114,8 @@ def login_view(request):
                     request.session['username'] = user_data.get('email', email)  # Use login email as fallback
                     request.session['user_prenom'] = user_data.get('prenom')
                     request.session['user_nom'] = user_data.get('nom')
+                    # /home/ asks for the recommendations right after the redirect
+                    enqueue_recommendations_warmup(user_id)
                 else:
                     # Fallback if /me endpoint fails
                     request.session['username'] = email
@@ -0,0 +1,127 @@
+"""Nightly batch: precomputes the recommendations of every active user into Redis.
+
+Usage:
+    python batch_recommendations.py [--processes N] [--chunk-size N] [--limit N]
+
+The catalog is loaded once, written to `.npy` files and memory-mapped by every
+worker, so the embedding matrix is shared through the page cache instead of being
+unpickled by each process. Users are sharded in chunks; each worker writes its
+chunk to Redis in one pipeline.
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import SessionLocal, engine
+from recommendations import models
+from recommendations.cache import to_jsonable
+from recommendations.catalog import MovieCatalog, install_catalog
+from recommendations.config import BATCH_CHUNK_SIZE, PRECOMPUTED_TTL
+from recommendations.precomputed import store_precomputed
+from recommendations.service import compute_recommendations, get_seen_movie_ids
+from redis_connect import connect_to_redis
+
+_worker_redis = None
+_worker_ttl = PRECOMPUTED_TTL
+
+
+def _init_worker(catalog_dir: str, ttl: int) -> None:
+    """Maps the shared catalog and opens the connections of a worker process."""
+    global _worker_redis, _worker_ttl
+    # Connections inherited from the parent must not be reused after the fork
+    engine.dispose(close=False)
+    install_catalog(MovieCatalog.load(catalog_dir))
+    _worker_redis = connect_to_redis()
+    _worker_ttl = ttl
+
+
+def _process_chunk(user_ids: List[int]) -> Tuple[int, int]:
+    """Computes and stores the recommendations of a chunk of users.
+
+    Returns:
+        Tuple[int, int]: Number of users stored and number of users that failed.
+    """
+    payloads, failed = {}, 0
+    with SessionLocal() as db:
+        for user_id in user_ids:
+            try:
+                seen_movie_ids = get_seen_movie_ids(db, user_id)
+                payloads[user_id] = to_jsonable(compute_recommendations(db, user_id, seen_movie_ids))
+            except Exception as e:
+                failed += 1
+                print(f"Erreur lors du calcul des recommandations de l'utilisateur {user_id} : {e}")
+    if payloads:
+        store_precomputed(_worker_redis, payloads, _worker_ttl)
+    return len(payloads), failed
+
+
+def active_user_chunks(chunk_size: int, limit: Optional[int] = None) -> Iterator[List[int]]:
+    """Streams the IDs of the users who rated at least one movie, `chunk_size` at a time."""
+    statement = (
+        select(models.MovieUsers.user_id)
+        .where(models.MovieUsers.note.isnot(None))
+        .distinct()
+        .order_by(models.MovieUsers.user_id)
+    )
+    if limit:
+        statement = statement.limit(limit)
+    with SessionLocal() as db:
+        for rows in db.execute(statement.execution_options(yield_per=chunk_size)).partitions():
+            yield [row[0] for row in rows]
+
+
+def peak_rss_mb() -> Tuple[float, float]:
+    """Returns the peak resident memory of this process and of its largest worker, in MB."""
+    # ru_maxrss is in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, workers
+
+
+def run(processes: int, chunk_size: int, limit: Optional[int], ttl: int) -> None:
+    if not connect_to_redis():
+        print("Redis est indisponible : aucun résultat ne pourrait être enregistré")
+        return
+
+    catalog_dir = tempfile.mkdtemp(prefix="catalog-")
+    try:
+        with SessionLocal() as db:
+            MovieCatalog.from_db(db).save(catalog_dir)
+
+        start = time.perf_counter()
+        stored = failed = 0
+        with Pool(processes, initializer=_init_worker, initargs=(catalog_dir, ttl)) as pool:
+            for chunk_stored, chunk_failed in pool.imap_unordered(
+                _process_chunk, active_user_chunks(chunk_size, limit)
+            ):
+                stored += chunk_stored
+                failed += chunk_failed
+                elapsed = time.perf_counter() - start
+                print(f"{stored} utilisateurs traités ({stored / elapsed:.1f} utilisateurs/s)")
+    finally:
+        shutil.rmtree(catalog_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    own, workers = peak_rss_mb()
+    print(
+        f"Terminé : {stored} utilisateurs en {elapsed:.1f} s "
+        f"({stored / elapsed if elapsed else 0.0:.1f} utilisateurs/s), {failed} en échec"
+    )
+    print(f"Pic de mémoire (RSS) : {own:.0f} Mo pour le processus principal, {workers:.0f} Mo pour le plus gros worker")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Précalcule les recommandations de tous les utilisateurs actifs")
+    parser.add_argument("--processes", "-p", type=int, default=os.cpu_count(), help="Nombre de workers")
+    parser.add_argument("--chunk-size", "-c", type=int, default=BATCH_CHUNK_SIZE, help="Utilisateurs par lot")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Nombre maximum d'utilisateurs")
+    parser.add_argument("--ttl", type=int, default=PRECOMPUTED_TTL, help="Durée de vie des résultats en secondes")
+    args = parser.parse_args()
+    run(args.processes, args.chunk_size, args.limit, args.ttl)
@@ -0,0 +1,43 @@
+"""Benchmark of the ALS fold-in on a synthetic model.
+
+Usage:
+    python benchmark_als.py --movies 200000 --factors 64 --ratings 300
+
+The item factors are random normal vectors. Each query folds in a user who rated
+`--ratings` movies of the catalog, for the explicit then the implicit objective, and
+the latency percentiles of `ALSModel.fold_in` are printed.
+"""
+import argparse
+
+import numpy as np
+
+from benchmark_search import report
+from recommendations.als_based import ALSModel
+
+
+def benchmark_fold_in(movies: int, factors: int, ratings: int, queries: int) -> None:
+    rng = np.random.default_rng(0)
+    movie_ids = np.arange(movies, dtype=np.int64)
+    item_factors = rng.normal(size=(movies, factors)).astype(np.float32)
+    users = [
+        {int(movie_id): float(rng.integers(1, 6)) for movie_id in rng.choice(movie_ids, ratings, replace=False)}
+        for _ in range(queries)
+    ]
+
+    print(f"Repli de {ratings} notes sur {movies} films x {factors} facteurs")
+    for implicit in (False, True):
+        model = ALSModel(np.arange(1), movie_ids, np.zeros((1, factors), np.float32), item_factors, implicit=implicit)
+        # Yᵀ Y is computed once per loaded model, not per request
+        model.gram()
+        report("implicite" if implicit else "explicite", lambda user: model.fold_in(users[user]), list(range(queries)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure du repli d'un utilisateur dans le modèle ALS")
+    parser.add_argument("--movies", "-m", type=int, default=200000, help="Nombre de films du modèle")
+    parser.add_argument("--factors", "-f", type=int, default=64, help="Nombre de facteurs latents")
+    parser.add_argument("--ratings", "-r", type=int, default=300, help="Nombre de notes de chaque utilisateur")
+    parser.add_argument("--queries", "-q", type=int, default=1000, help="Nombre de requêtes mesurées")
+    args = parser.parse_args()
+
+    benchmark_fold_in(args.movies, args.factors, args.ratings, args.queries)
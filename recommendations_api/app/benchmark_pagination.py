@@ -0,0 +1,112 @@
+"""Benchmark of offset pagination against keyset pagination.
+
+Usage:
+    python benchmark_pagination.py --rows 1000000 --limit 20
+
+Two cases are measured at increasing depths:
+
+- `GET /movieusers/` of the users API, on an in-memory SQLite table with the schema of
+  `MovieUsers` (primary key `movie_id` alone): `OFFSET n` reads and drops the n first
+  rows, while `WHERE (user_id, movie_id) > cursor` seeks into the
+  `ix_MovieUsers_user_id_movie_id` index of migration 7b1d2e9c4f30. The cursor is also
+  timed before that index exists, when every page sorts the whole table;
+- `/movies/search/` on a synthetic `SearchIndex`: an offset needs the `skip + limit`
+  best scores sorted, while `SearchIndex.page` masks the movies up to the cursor and
+  only sorts one page.
+
+With keysets the last page should cost about as much as the first one.
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date
+from typing import Callable, List
+
+import numpy as np
+
+from recommendations.catalog import top_k
+from recommendations.search_index import MovieDocument, SearchIndex
+
+
+def _median_ms(function: Callable[[], object], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return 1000 * sorted(durations)[len(durations) // 2]
+
+
+def _depths(rows: int, limit: int) -> List[int]:
+    depths, depth = [0], limit
+    while depth < rows - limit:
+        depths.append(depth)
+        depth *= 10
+    return depths
+
+
+def benchmark_sql(rows: int, limit: int, repeat: int) -> None:
+    rng = random.Random(0)
+    users = max(1, rows // 100)
+    table = sorted((rng.randrange(users), movie_id) for movie_id in range(rows))
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE movie_users (movie_id INTEGER PRIMARY KEY, note INTEGER, user_id INTEGER NOT NULL)")
+    db.executemany("INSERT INTO movie_users VALUES (?, 3, ?)", ((movie_id, user_id) for user_id, movie_id in table))
+    order = "ORDER BY user_id, movie_id LIMIT ?"
+
+    def offset_page(depth):
+        return db.execute(f"SELECT * FROM movie_users {order} OFFSET ?", (limit, depth)).fetchall()
+
+    def keyset_page(depth):
+        if not depth:
+            return db.execute(f"SELECT * FROM movie_users {order}", (limit,)).fetchall()
+        return db.execute(f"SELECT * FROM movie_users WHERE (user_id, movie_id) > (?, ?) {order}", (*table[depth - 1], limit)).fetchall()
+
+    depths = _depths(rows, limit)
+    unindexed = {depth: _median_ms(lambda: keyset_page(depth), repeat) for depth in depths}
+    db.execute("CREATE INDEX ix_MovieUsers_user_id_movie_id ON movie_users (user_id, movie_id)")
+
+    print(f"Liste SQL de {rows} lignes, pages de {limit}")
+    for depth in depths:
+        assert offset_page(depth) == keyset_page(depth)
+        offset = _median_ms(lambda: offset_page(depth), repeat)
+        keyset = _median_ms(lambda: keyset_page(depth), repeat)
+        print(
+            f"  à partir de la ligne {depth:>9} : offset {offset:8.2f} ms, curseur {keyset:6.2f} ms "
+            f"(sans index : {unindexed[depth]:8.2f} ms)"
+        )
+
+
+def benchmark_search(movies: int, limit: int, repeat: int) -> None:
+    rng = random.Random(0)
+    documents = [
+        MovieDocument(movie_id, "Movie", None, None, [], date(2000, 1, 1), round(rng.uniform(1, 10), 1), rng.randint(0, 10000), [])
+        for movie_id in range(1, movies + 1)
+    ]
+    index = SearchIndex.build([documents])
+    scores = index.match(None)
+
+    print(f"Recherche sur {movies} films, pages de {limit}")
+    for depth in _depths(movies, limit):
+        after = None
+        if depth:
+            # Key of the last movie of the previous page, as decoded from the cursor
+            positions = top_k(scores, depth)
+            positions = positions[np.lexsort((index.doc_movie_ids[positions], -scores[positions]))]
+            after = float(scores[positions[-1]]), int(index.doc_movie_ids[positions[-1]])
+        offset = _median_ms(lambda: top_k(scores, depth + limit)[depth:], repeat)
+        keyset = _median_ms(lambda: index.page(scores, limit, after), repeat)
+        print(f"  à partir du film {depth:>9} : offset {offset:8.2f} ms, curseur {keyset:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparaison de la pagination par offset et par curseur")
+    parser.add_argument("--rows", "-n", type=int, default=1000000, help="Nombre de lignes de la table")
+    parser.add_argument("--movies", "-m", type=int, default=200000, help="Nombre de films de l'index de recherche")
+    parser.add_argument("--limit", "-l", type=int, default=20, help="Taille des pages")
+    parser.add_argument("--repeat", "-r", type=int, default=5, help="Nombre de mesures par profondeur")
+    args = parser.parse_args()
+
+    benchmark_sql(args.rows, args.limit, args.repeat)
+    benchmark_search(args.movies, args.limit, args.repeat)
@@ -0,0 +1,81 @@
+"""Benchmark of the in-memory search indexes on a synthetic catalog.
+
+Usage:
+    python benchmark_search.py --movies 1000000 --queries 1000
+
+The titles are random runs of one to four made-up words. Every index is built once,
+then queried with titles of the catalog: misspelled by one dropped character for the
+fuzzy index, cut after a random number of characters for the title autocomplete. The
+build time and the latency percentiles of the lookups are printed.
+"""
+import argparse
+import random
+import time
+from datetime import date
+from typing import Callable, List
+
+from recommendations.autocomplete import TitleAutocomplete
+from recommendations.fuzzy_index import FuzzyIndex
+from recommendations.search_index import MovieDocument
+
+
+def make_documents(movies: int, seed: int = 0) -> List[MovieDocument]:
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(movies // 3 + 1)]
+    return [
+        MovieDocument(
+            movie_id, " ".join(rng.sample(words, rng.randint(1, 4))), None, None, [], date(2000, 1, 1),
+            round(rng.uniform(1, 10), 1), rng.randint(0, 10000), [],
+        )
+        for movie_id in range(1, movies + 1)
+    ]
+
+
+def report(name: str, lookup: Callable[[str], object], queries: List[str]) -> None:
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        lookup(query)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    percentiles = ", ".join(
+        f"p{percentile} {1000 * durations[min(len(durations) - 1, int(percentile / 100 * len(durations)))]:.2f} ms"
+        for percentile in (50, 95, 99)
+    )
+    print(f"  {name} : {percentiles}")
+
+
+def benchmark_fuzzy(documents: List[MovieDocument], queries: int, rng: random.Random) -> None:
+    start = time.perf_counter()
+    index = FuzzyIndex([documents])
+    print(f"Recherche approximative : index construit en {time.perf_counter() - start:.1f} s")
+
+    typos = []
+    for document in rng.sample(documents, queries):
+        position = rng.randrange(len(document.title))
+        typos.append(document.title[:position] + document.title[position + 1:])
+    report("titre avec une faute", index.search, typos)
+
+
+def benchmark_autocomplete(documents: List[MovieDocument], queries: int, rng: random.Random) -> None:
+    suggestions = [
+        {"movie_id": document.movie_id, "title": document.title, "release_date": None, "poster_path": None}
+        for document in documents
+    ]
+    start = time.perf_counter()
+    autocomplete = TitleAutocomplete(suggestions, [document.vote_count for document in documents])
+    print(f"Autocomplétion : index construit en {time.perf_counter() - start:.1f} s")
+
+    prefixes = [title[:rng.randint(1, len(title))] for title in (document.title for document in rng.sample(documents, queries))]
+    report("début de titre", autocomplete.complete, prefixes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure des index de recherche en mémoire")
+    parser.add_argument("--movies", "-m", type=int, default=1000000, help="Nombre de films du catalogue")
+    parser.add_argument("--queries", "-q", type=int, default=1000, help="Nombre de requêtes mesurées")
+    args = parser.parse_args()
+
+    catalog = make_documents(args.movies)
+    benchmark_fuzzy(catalog, args.queries, random.Random(1))
+    benchmark_autocomplete(catalog, args.queries, random.Random(2))
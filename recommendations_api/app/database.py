@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -8,7 +9,15 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Fail fast when MariaDB does not answer or the pool is exhausted, so the circuit breaker can open
+engine_options = {}
+if make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() in ("mysql", "mariadb"):
+    engine_options = {
+        "connect_args": {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "2"))},
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "5")),
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,95 @@
+"""Load test of /recommendations/ under a traffic spike.
+
+Usage:
+    python load_test_recommendations.py --url http://localhost:8000 --rate 200 --duration 30
+
+Requests arrive at a fixed rate whatever the response times (open loop), as during a
+real spike, and each one is given up after `--timeout` seconds like a browser would.
+Run it once with admission control disabled (`ADMISSION_MAX_IN_FLIGHT=100000` on the
+API) and once with the defaults, then compare the goodput, the latency percentiles and
+the share of requests given up. Shed requests are counted by the source they were
+answered from: the stale payload, the snapshot or a 503.
+
+Tokens are signed with the `SECRET_KEY` and `ALGORITHM` of the API, read from `.env`.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import httpx
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def make_token(user_id: int) -> str:
+    return jwt.encode({"sub": str(user_id)}, os.getenv("SECRET_KEY"), algorithm=os.getenv("ALGORITHM", "HS256"))
+
+
+async def _request(client: httpx.AsyncClient, token: str, results: List[Tuple[str, float]]) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.get("/recommendations/", headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 200:
+            outcome = response.headers.get("X-Recommendations-Source", "computed")
+        else:
+            outcome = str(response.status_code)
+    except httpx.TimeoutException:
+        outcome = "timeout"
+    except httpx.HTTPError:
+        outcome = "error"
+    results.append((outcome, time.perf_counter() - start))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(url: str, rate: float, duration: float, timeout: float, users: int) -> None:
+    tokens = [make_token(user_id) for user_id in range(1, users + 1)]
+    results: List[Tuple[str, float]] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        tasks = []
+        start = time.perf_counter()
+        sent = 0
+        while time.perf_counter() - start < duration:
+            # Arrivées à débit fixe, indépendantes des temps de réponse
+            due = int((time.perf_counter() - start) * rate) + 1
+            for _ in range(due - sent):
+                tasks.append(asyncio.create_task(_request(client, random.choice(tokens), results)))
+            sent = due
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    served = [seconds for outcome, seconds in results if outcome in ("computed", "stale", "snapshot")]
+    computed = [seconds for outcome, seconds in results if outcome == "computed"]
+    print(f"{len(results)} requêtes en {elapsed:.1f} s ({len(results) / elapsed:.1f} requêtes/s envoyées)")
+    for outcome, count in outcomes.most_common():
+        print(f"  {outcome:>10} : {count}")
+    print(f"Débit utile : {len(served) / elapsed:.1f} réponses/s, dont {len(computed) / elapsed:.1f} calculées")
+    print(
+        f"Latence des réponses servies : p50 {1000 * _percentile(served, 0.5):.0f} ms, "
+        f"p99 {1000 * _percentile(served, 0.99):.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge des recommandations")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL de l'API de recommandations")
+    parser.add_argument("--rate", "-r", type=float, default=100, help="Requêtes par seconde")
+    parser.add_argument("--duration", "-d", type=float, default=30, help="Durée du test en secondes")
+    parser.add_argument("--timeout", "-t", type=float, default=5, help="Délai d'abandon d'une requête en secondes")
+    parser.add_argument("--users", "-u", type=int, default=1000, help="Nombre d'utilisateurs simulés")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.rate, args.duration, args.timeout, args.users))
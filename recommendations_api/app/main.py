@@ -1,29 +1,68 @@
 from traceback import print_tb
 from typing import Any, Dict, List, Optional
-from fastapi import Depends, FastAPI, HTTPException, Request, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, Query
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from redis_connect import connect_to_redis
 import os
-from database import engine, get_db
-from recommendations import (
-    GenreBasedRecommendationFetcher,
-    MovieBasedRecommendationFetcher,
-    TrendingRecommendationFetcher,
-    models,
-)
+from database import SessionLocal, engine, get_db
+from recommendations import models
+from recommendations.admission import AdmissionControlMiddleware, AdmissionController
+from recommendations.autocomplete import get_autocomplete
+from recommendations.breaker import CircuitOpenError, all_breakers, db_breaker, redis_breaker
+from recommendations.cache import all_cache_stats, to_jsonable
+from recommendations.catalog import get_catalog, movies_by_ids
+from recommendations.cold_start import cold_start_cache, filter_seen, is_cold_start
+from recommendations.cursors import decode_cursor, encode_cursor
+from recommendations.fuzzy_index import get_fuzzy_index
+from recommendations.http_cache import cached_json_response
+from recommendations.impressions import ImpressionFilter, downrank_shown, record_impressions
+from recommendations.people_index import get_people_index
+from recommendations.pipeline import TIMED_OUT_KEY
+from recommendations.precomputed import get_precomputed
+from recommendations.search_index import RATING_LABELS, RUNTIME_LABELS, get_search_index
+from recommendations.service import compute_recommendations, get_genre_ids, get_pipeline, get_seen_movie_ids
+from recommendations.snapshot import SnapshotRefresher, get_snapshot
+from recommendations.top_credits import get_top_credits
+from recommendations.warmup import WarmupConsumer, record_warmup_outcome
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 import jwt
 from jwt import PyJWTError
 import datetime
+import json
+import threading
+import time
 from recommendations.schemas import (
-    CreditSchema,
+    CompactCreditSchema,
+    CreditPageSchema,
+    FilmographyRoleSchema,
+    FilmographySchema,
+    GenrePageSchema,
     GenreSchema,
     MovieSchema,
-    PeopleSchema,
-    JobSchema,
+    RecommendationSchema,
+    SearchResultsSchema,
+    SuggestionSchema,
+)
+from recommendations.config import (
+    ADMISSION_RETRY_AFTER_SECONDS,
+    AUTOCOMPLETE_LIMIT,
+    BREAKER_RESET_SECONDS,
+    CARROUSSEL_LENGTH,
+    CREDITS_MAX_PAGE_SIZE,
+    CREDITS_NULL_CAST_ORDER,
+    CREDITS_PAGE_SIZE,
+    GENRES_MAX_PAGE_SIZE,
+    GENRES_PAGE_SIZE,
+    NEIGHBORS_K,
+    RECOMMENDATIONS_BUDGET_SECONDS,
+    SEARCH_MAX_PAGE_SIZE,
+    SNAPSHOT_PATH,
 )
 from starlette.middleware.cors import CORSMiddleware
 
@@ -35,6 +74,15 @@ ORIGINS = os.getenv("BACKEND_CORS_ORIGINS")
 
 app = FastAPI()
 
+# Contrôle d'admission : au-delà de la capacité, réponse sans base de données plutôt qu'une file d'attente
+admission_controller = AdmissionController()
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=admission_controller,
+    paths=["/recommendations/"],
+    shed=lambda scope: shed_recommendations(scope),
+)
+
 origins = [
     "http://localhost",
     "http://localhost:3000",
@@ -56,16 +104,56 @@ app.add_middleware(
 
 models.Base.metadata.create_all(bind=engine)
 
+warmup_consumer = WarmupConsumer(SessionLocal, connect_to_redis)
+snapshot_refresher = SnapshotRefresher(SessionLocal)
+
+
+@app.on_event("startup")
+def start_warmup_consumer():
+    # Précalcule les recommandations des utilisateurs qui viennent de se connecter
+    if os.getenv("WARMUP_CONSUMER", "1") == "1":
+        warmup_consumer.start()
+
+
+@app.on_event("startup")
+def start_snapshot_refresher():
+    # Tient à jour l'instantané servi quand la base est indisponible
+    if os.getenv("SNAPSHOT_REFRESHER", "1") == "1":
+        snapshot_refresher.start()
+
+
+@app.on_event("startup")
+def start_index_warmup():
+    # Charge le catalogue et construit les index de recherche avant les premières requêtes plutôt que pendant l'une d'elles
+    if os.getenv("INDEX_WARMUP", "1") == "1":
+        threading.Thread(target=warm_indexes, daemon=True).start()
+
+
+def warm_indexes():
+    with SessionLocal() as db:
+        for get_index in (get_catalog, get_people_index, get_fuzzy_index):
+            try:
+                get_index(db)
+            except Exception as e:
+                print(f"Erreur lors de la construction d'un index en mémoire : {e}")
+
+
+@app.on_event("shutdown")
+def stop_warmup_consumer():
+    warmup_consumer.stop()
+    snapshot_refresher.stop()
+
 
 def save_recommendations_to_redis(client, user_id, recommendations):
     try:
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
         key = f"recommendations:{user_id}:{timestamp}"
         client.set(key, str(recommendations))
         print(
             f"Recommandations enregistrées pour l'utilisateur {user_id} avec la clé {key}"
         )
     except Exception as e:
+        redis_breaker.observe(e)
         print(f"Erreur lors de l'enregistrement des recommandations dans Redis : {e}")
 
 
@@ -73,6 +161,51 @@ class TokenData(BaseModel):
     user_id: int
 
 
+def decode_user_id(token: Optional[str]) -> Optional[int]:
+    """Returns the user ID of an `Authorization` header value, or None if it is missing or invalid."""
+    if not token:
+        return None
+
+    # Extract JWT token from Authorization header (removes Bearer prefix)
+    if token.startswith("Bearer "):
+        token = token.split(" ")[1]
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return int(payload["sub"])
+    except (PyJWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def shed_recommendations(scope) -> JSONResponse:
+    """Answers a request refused by admission control, without touching the database.
+
+    Unauthenticated requests get a 403, like on the normal path. Others are served the
+    user's precomputed payload, possibly stale, then the snapshot, and otherwise a 503
+    with `Retry-After`.
+    """
+    return await run_in_threadpool(shed_response, Request(scope).headers.get("Authorization"))
+
+
+def shed_response(token: Optional[str]) -> JSONResponse:
+    user_id = decode_user_id(token)
+    if user_id is None:
+        # Same answer as `get_current_user`: shedding must not serve anonymous requests
+        return JSONResponse({"detail": "Not authenticated"}, status_code=403)
+    redis_client = connect_to_redis()
+    recommendations = get_precomputed(redis_client, user_id) if redis_client else None
+    source = "stale"
+    if recommendations is None:
+        recommendations, source = get_snapshot(SNAPSHOT_PATH), "snapshot"
+    if recommendations is None:
+        return JSONResponse(
+            {"detail": "Too many requests, retry later"},
+            status_code=503,
+            headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+        )
+    return JSONResponse(recommendations, headers={"X-Recommendations-Source": source})
+
+
 async def get_current_user(request: Request) -> TokenData:
     """
     Retrieves the current user based on the provided request.
@@ -86,99 +219,181 @@ async def get_current_user(request: Request) -> TokenData:
     Raises:
         HTTPException: If the user is not authenticated.
     """
-    token = request.headers.get("Authorization")
-    if not token:
-        raise HTTPException(status_code=403, detail="Not authenticated")
-
-    # Extract JWT token from Authorization header (removes Bearer prefix)
-    if token.startswith("Bearer "):
-        token = token.split(" ")[1]
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=403, detail="Not authenticated")
-        return TokenData(user_id=user_id)
-    except PyJWTError:
+    user_id = decode_user_id(request.headers.get("Authorization"))
+    if user_id is None:
         raise HTTPException(status_code=403, detail="Not authenticated")
+    return TokenData(user_id=user_id)
 
 
 @app.get("/recommendations/", response_model=Dict[str, Any])
-async def get_recommendations(
+def get_recommendations(
+    response: Response,
     current_user: TokenData = Depends(get_current_user),
     db: Session = Depends(get_db),
     redis_client=Depends(connect_to_redis),
 ):
     """
     Get movie recommendations for the current user.
+
+    While the database is failing, the non-personalised snapshot is served instead,
+    with the `X-Recommendations-Source: snapshot` header.
+
+    A plain `def`: the blocking queries run in the thread pool instead of stalling the
+    event loop, and admission control bounds how many run at once.
     """
     user_id = current_user.user_id
-    recommendations = {}
+    # Generators still running when the budget is spent are dropped and listed under "timed_out"
+    deadline = time.monotonic() + RECOMMENDATIONS_BUDGET_SECONDS
 
-    # Subquery to get movie ids that the current user has seen
-    seen_movie_ids = (
-        db.query(models.MovieUsers.movie_id)
-        .filter(models.MovieUsers.user_id == user_id)
-        .subquery()
-    )
+    # Movies shown on the previous visits are pushed after the fresh ones
+    impressions = ImpressionFilter.load(redis_client, user_id) if redis_client else None
 
-    # Query to get movie ids that the current user has not seen
-    not_seen_movie_ids = (
-        db.query(models.Movies.movie_id)
-        .filter(~models.Movies.movie_id.in_(seen_movie_ids))
-        .all()
-    )
-    not_seen_movie_ids = [movie_id[0] for movie_id in not_seen_movie_ids]
+    try:
+        with db_breaker.guard():
+            recommendations, timed_out = personalised_recommendations(
+                db, redis_client, user_id, impressions, deadline
+            )
+    except (CircuitOpenError,) + db_breaker.errors as e:
+        print(f"Base de données indisponible, recommandations servies depuis l'instantané : {e}")
+        recommendations, timed_out = snapshot_recommendations(impressions), None
+        response.headers["X-Recommendations-Source"] = "snapshot"
+
+    record_impressions(redis_client, impressions, recommendations)
+    if timed_out:
+        recommendations[TIMED_OUT_KEY] = timed_out
+    return recommendations
 
-    genre_fetcher = GenreBasedRecommendationFetcher()
-    genre_recommendations = genre_fetcher.fetch(db, user_id, not_seen_movie_ids)
-    trending_fetcher = TrendingRecommendationFetcher()
-    trending_recommendations = trending_fetcher.fetch(db, not_seen_movie_ids)
-    movie_fetcher = MovieBasedRecommendationFetcher()
 
-    loved_movie_ids = (
-        db.query(models.MovieUsers.movie_id)
-        .filter(models.MovieUsers.user_id == user_id, models.MovieUsers.note >= 4)
-        .all()
-    )
-    loved_movie_ids = [movie_id[0] for movie_id in loved_movie_ids]
+def personalised_recommendations(db, redis_client, user_id, impressions, deadline):
+    """Returns the recommendations of a user and the names of the stages that missed the deadline."""
+    seen_movie_ids = get_seen_movie_ids(db, user_id)
+    timed_out = None
+
+    # Written by the nightly batch (batch_recommendations.py); movies seen since are filtered out
+    recommendations = get_precomputed(redis_client, user_id)
+    record_warmup_outcome(redis_client, user_id, recommendations is not None)
+    if recommendations is not None:
+        recommendations = downrank_shown(filter_seen(recommendations, seen_movie_ids), impressions)
+
+    elif is_cold_start(db, user_id):
+        # Cold-start users who picked the same genres share one computed payload; the
+        # carousels depending on who the user is, such as the demographic one, are added per user
+        recommendations = dict(cold_start_cache.get_or_compute(
+            redis_client,
+            get_genre_ids(db, user_id),
+            lambda: compute_recommendations(
+                db, user_id, [], session_factory=SessionLocal, deadline=deadline, shared=True
+            ),
+        ))
+        timed_out = recommendations.pop(TIMED_OUT_KEY, None) or []
+        recommendations = downrank_shown(filter_seen(recommendations, seen_movie_ids), impressions)
+        personal = compute_recommendations(db, user_id, seen_movie_ids, impressions, deadline=deadline, shared=False)
+        timed_out = timed_out + personal.pop(TIMED_OUT_KEY, []) or None
+        recommendations.update(to_jsonable(personal))
+
+    else:
+        recommendations = compute_recommendations(
+            db, user_id, seen_movie_ids, impressions, session_factory=SessionLocal, deadline=deadline
+        )
+        timed_out = recommendations.pop(TIMED_OUT_KEY, None)
+        if redis_client:
+            save_recommendations_to_redis(redis_client, user_id, recommendations)
 
-    for key, value in genre_recommendations.items():
-        recommendations[key] = value
-    for key, value in trending_recommendations.items():
-        recommendations[key] = value
-    for movie_id in loved_movie_ids:
-        movie_recommendations = movie_fetcher.fetch(movie_id, db, not_seen_movie_ids)
-        for key, value in movie_recommendations.items():
-            recommendations[key] = value
+    return recommendations, timed_out
 
-    if redis_client:
-        save_recommendations_to_redis(redis_client, user_id, recommendations)
 
-    return recommendations
+def snapshot_recommendations(impressions):
+    """Returns the trending and top-per-genre carousels of the on-disk snapshot, without any query."""
+    snapshot = get_snapshot(SNAPSHOT_PATH)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Recommendations are temporarily unavailable",
+            headers={"Retry-After": str(int(BREAKER_RESET_SECONDS))},
+        )
+    # The seen movies are unknown without the database; recently shown ones still go last
+    return downrank_shown(snapshot, impressions)
+
+
+@app.get("/metrics/cache", response_model=Dict[str, Any])
+def read_cache_metrics(redis_client=Depends(connect_to_redis)):
+    """
+    Get the hit and miss counters of the recommendation caches.
+    """
+    return {stats.name: stats.snapshot(redis_client) for stats in all_cache_stats()}
+
+
+@app.get("/metrics/admission", response_model=Dict[str, Any])
+def read_admission_metrics():
+    """
+    Get the in-flight, queued and shed request counters of admission control in this worker.
+    """
+    return admission_controller.snapshot()
+
+
+@app.get("/metrics/breakers", response_model=Dict[str, Any])
+def read_breaker_metrics():
+    """
+    Get the state of the database and Redis circuit breakers in this worker.
+    """
+    return {breaker.name: breaker.snapshot() for breaker in all_breakers()}
+
+
+@app.get("/metrics/pipeline", response_model=Dict[str, Any])
+def read_pipeline_metrics():
+    """
+    Get the timings of each stage of the recommendation pipeline in this worker.
+    """
+    return get_pipeline().stage_stats()
+
+
+@app.get("/movies/autocomplete", response_model=List[SuggestionSchema])
+def autocomplete_movies(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=AUTOCOMPLETE_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Suggest movies whose title, or a word of it, starts with what the user typed.
+
+    Answered from the in-memory title index: the session is only used when the index
+    is rebuilt, so type-ahead requests make no database call. Declared before
+    `/movies/{movie_id}`, which would otherwise match it.
+
+    Args:
+        q (str): The text typed so far; case and accents are ignored.
+        limit (int, optional): The maximum number of suggestions. Defaults to AUTOCOMPLETE_LIMIT.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        List[SuggestionSchema]: The suggestions, title-start matches first, then by popularity.
+    """
+    suggestions = get_autocomplete(db).complete(q, limit)
+    # The suggestions are plain dicts already in the response shape; skip the validation
+    return Response(json.dumps(suggestions, separators=(",", ":")), media_type="application/json")
 
 
 @app.get("/movies/{movie_id}", response_model=MovieSchema)
-async def get_movie_details(movie_id: int, db: Session = Depends(get_db)):
+async def get_movie_details(movie_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Get movie details by movie ID.
     Parameters:
     - movie_id (int): The ID of the movie.
     - db (Session): The database session.
     Returns:
-    - MovieSchema: The movie details.
+    - MovieSchema: The movie details, with an ETag; 304 if the client's copy is current.
     Raises:
     - HTTPException: If the movie is not found (status code 404).
     """
+    return cached_json_response(request, db, lambda: movie_details(db, movie_id))
+
+
+def movie_details(db: Session, movie_id: int) -> MovieSchema:
+    # Only the genres are eager-loaded: the credits come from the denormalised MovieTopCredits table
     movie = (
         db.query(models.Movies)
         .filter(models.Movies.movie_id == movie_id)
-        .options(
-            joinedload(models.Movies.genres),
-            joinedload(models.Movies.credits).joinedload(models.Credits.people),
-            joinedload(models.Movies.credits).joinedload(models.Credits.job),
-        )
+        .options(selectinload(models.Movies.genres).joinedload(models.MovieGenres.genre))
         .first()
     )
 
@@ -190,46 +405,7 @@ async def get_movie_details(movie_id: int, db: Session = Depends(get_db)):
         for movie_genre in movie.genres
     ]
 
-    important_jobs = {
-        "Director",
-        "Producer",
-        "Writer",
-        "Editor",
-        "Original Music Composer",
-        "Executive Producer",
-        "Director of Photography",
-    }
-
-    credits = []
-    actors = []
-    for credit in movie.credits:
-        if credit.job and credit.people:
-            credit_data = CreditSchema(
-                credit_id=credit.credit_id,
-                id_movie=credit.id_movie,
-                id_people=credit.id_people,
-                id_job=credit.id_job,
-                job=JobSchema(job_id=credit.job.job_id, title=credit.job.title),
-                people=PeopleSchema(
-                    people_id=credit.people.people_id,
-                    name=credit.people.name,
-                    photo=credit.people.photo,
-                ),
-                character_name=credit.character_name,
-                cast_order=credit.cast_order,
-            )
-            if credit.job.title == "Acting":
-                actors.append(credit_data)
-            elif credit.job.title in important_jobs:
-                credits.append(credit_data)
-
-    top_actors = sorted(actors, key=lambda x: (x.cast_order or float("inf")))[:10]
-
-    combined_credits = {
-        credit.credit_id: credit for credit in top_actors + credits
-    }.values()
-
-    movie_details = MovieSchema(
+    return MovieSchema(
         movie_id=movie.movie_id,
         title=movie.title,
         release_date=movie.release_date.isoformat() if movie.release_date else None,
@@ -243,86 +419,267 @@ async def get_movie_details(movie_id: int, db: Session = Depends(get_db)):
         poster_path=movie.poster_path,
         backdrop_path=movie.backdrop_path,
         genres=genres,
-        credits=list(combined_credits),
+        credits=get_top_credits(db, movie_id),
     )
 
-    return movie_details
 
+@app.get("/genres", response_model=GenrePageSchema)
+def read_genres(
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(GENRES_PAGE_SIZE, ge=1, le=GENRES_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Get one page of the genres, ordered by ID.
+
+    Args:
+        cursor (str, optional): The `next_cursor` of the previous page. Defaults to None.
+        limit (int, optional): The maximum number of genres to return. Defaults to GENRES_PAGE_SIZE.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
 
-@app.get("/genres", response_model=List[GenreSchema])
-def read_genres(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
-    genres = db.query(models.Genres).offset(skip).limit(limit).all()
-    return genres
+    Returns:
+        GenrePageSchema: The genres, and the cursor of the next page if there is one.
 
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    return cached_json_response(request, db, lambda: genres_page(db, cursor, limit))
 
-@app.get("/movies/{movie_id}/credits", response_model=List[CreditSchema])
-def read_credits(movie_id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(models.Credits)
-        .options(joinedload(models.Credits.people))
+
+def genres_page(db: Session, cursor: Optional[str], limit: int) -> GenrePageSchema:
+    query = db.query(models.Genres)
+    if cursor:
+        try:
+            (after,) = decode_cursor(cursor, (int,))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(models.Genres.genre_id > after)
+
+    genres = query.order_by(models.Genres.genre_id).limit(limit + 1).all()
+    items = [GenreSchema.from_orm(genre) for genre in genres[:limit]]
+    next_cursor = encode_cursor([items[-1].genre_id]) if len(genres) > limit else None
+    return GenrePageSchema(items=items, next_cursor=next_cursor)
+
+
+@app.get("/movies/{movie_id}/credits", response_model=CreditPageSchema)
+def read_credits(
+    movie_id: int,
+    request: Request,
+    job: Optional[str] = Query(None, min_length=1),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(CREDITS_PAGE_SIZE, ge=1, le=CREDITS_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Get one page of the credits of a movie, ordered by job, cast order and credit ID.
+
+    Args:
+        movie_id (int): The ID of the movie.
+        job (str, optional): Only return the credits of this job, e.g. "Acting". Defaults to None.
+        cursor (str, optional): The `next_cursor` of the previous page. Defaults to None.
+        limit (int, optional): The maximum number of credits to return. Defaults to CREDITS_PAGE_SIZE.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        CreditPageSchema: The credits, and the cursor of the next page if there is one.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    return cached_json_response(request, db, lambda: credits_page(db, movie_id, job, cursor, limit))
+
+
+def credits_page(
+    db: Session, movie_id: int, job: Optional[str], cursor: Optional[str], limit: int
+) -> CreditPageSchema:
+    # Credits without cast order come last within their job
+    job_key = func.coalesce(models.Jobs.title, "")
+    order_key = func.coalesce(models.Credits.cast_order, CREDITS_NULL_CAST_ORDER)
+    query = (
+        db.query(
+            models.Credits.credit_id,
+            models.Credits.id_people,
+            models.Peoples.name,
+            models.Peoples.photo,
+            models.Jobs.title,
+            models.Credits.character_name,
+            models.Credits.cast_order,
+        )
+        .join(models.Jobs, models.Credits.id_job == models.Jobs.job_id)
+        .join(models.Peoples, models.Credits.id_people == models.Peoples.people_id)
         .filter(models.Credits.id_movie == movie_id)
+    )
+    if job:
+        query = query.filter(models.Jobs.title == job)
+    if cursor:
+        try:
+            after = decode_cursor(cursor, (str, int, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(tuple_(job_key, order_key, models.Credits.credit_id) > tuple_(*after))
+
+    rows = query.order_by(job_key, order_key, models.Credits.credit_id).limit(limit + 1).all()
+
+    items = [
+        CompactCreditSchema(
+            credit_id=credit_id,
+            people_id=people_id,
+            name=name,
+            photo=photo,
+            job=title,
+            character_name=character_name,
+            cast_order=cast_order,
+        )
+        for credit_id, people_id, name, photo, title, character_name, cast_order in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        cast_order = last.cast_order if last.cast_order is not None else CREDITS_NULL_CAST_ORDER
+        next_cursor = encode_cursor([last.job or "", cast_order, last.credit_id])
+    return CreditPageSchema(items=items, next_cursor=next_cursor)
+
+
+@app.get("/movies/{movie_id}/similar", response_model=List[RecommendationSchema])
+def read_similar_movies(
+    movie_id: int,
+    limit: int = Query(CARROUSSEL_LENGTH, ge=1, le=NEIGHBORS_K),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the most similar movies of a movie from the precomputed neighbour graph.
+
+    Args:
+        movie_id (int): The ID of the movie.
+        limit (int, optional): The maximum number of movies to return, at most the NEIGHBORS_K
+            neighbours kept per movie. Defaults to CARROUSSEL_LENGTH.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        List[RecommendationSchema]: The similar movies, most similar first.
+
+    Raises:
+        HTTPException: If the movie has no precomputed neighbours (status code 404).
+    """
+    similar_movies = (
+        db.query(models.Movies)
+        .join(
+            models.MovieNeighbors,
+            models.MovieNeighbors.neighbor_id == models.Movies.movie_id,
+        )
+        .filter(models.MovieNeighbors.movie_id == movie_id)
+        .order_by(models.MovieNeighbors.rank)
+        .limit(limit)
         .all()
     )
 
+    if not similar_movies:
+        raise HTTPException(status_code=404, detail="No similar movies found")
+
+    return similar_movies
 
-@app.get("/movies/search/", response_model=List[MovieSchema])
-async def search_movies(
+
+@app.get("/movies/search/", response_model=SearchResultsSchema)
+def search_movies(
     title: Optional[str] = Query(None, min_length=1),
     release_date: Optional[str] = Query(None),
     genre: Optional[str] = Query(None),
-    skip: int = 0,
-    limit: int = 10,
+    fuzzy: bool = False,
+    actor: Optional[List[int]] = Query(None),
+    director: Optional[List[int]] = Query(None),
+    people: Optional[List[int]] = Query(None),
+    decade: Optional[int] = Query(None, ge=1800, le=2990),
+    runtime: Optional[str] = Query(None),
+    rating: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
 ):
     """
-    Search for movies by title, release date, and genre with pagination.
+    Search for movies by text, release date, and genre with keyset pagination.
+
+    The text is matched against the titles, taglines, overviews and credited names of
+    the in-memory search index and ranked with BM25; without text, the matching movies
+    are ranked by popularity. In fuzzy mode, titles and names close to a misspelled
+    text are found with the trigram index instead. Movies with given actors, directors
+    or people are found by intersecting the posting lists of the people index. Only the
+    returned page is read from the database.
+
+    The response also counts all the matching movies per genre, release decade, runtime
+    bucket and rating band, computed from the columns of the index; a count's value can
+    be passed back as the `genre`, `decade`, `runtime` or `rating` filter.
 
     Args:
-        title (str, optional): The title of the movie to search for. Defaults to None.
+        title (str, optional): The text to search for. Defaults to None.
         release_date (str, optional): The release date of the movie to search for. Defaults to None.
         genre (str, optional): The genre of the movie to search for. Defaults to None.
-        skip (int, optional): The number of records to skip for pagination. Defaults to 0.
+        fuzzy (bool, optional): Tolerate typos in the title or names searched for. Defaults to False.
+        actor (List[int], optional): IDs of people who must all act in the movie. Defaults to None.
+        director (List[int], optional): IDs of people who must all direct the movie. Defaults to None.
+        people (List[int], optional): IDs of people who must all be credited, in any job. Defaults to None.
+        decade (int, optional): The release decade, e.g. 1990. Defaults to None.
+        runtime (str, optional): A runtime bucket of the facets, e.g. "90-120". Defaults to None.
+        rating (str, optional): A rating band of the facets, e.g. "7-8". Defaults to None.
+        cursor (str, optional): The `next_cursor` of the previous page. Defaults to None.
         limit (int, optional): The maximum number of records to return. Defaults to 10.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[MovieSchema]: A list of MovieSchema instances containing the details of each matching movie.
+        SearchResultsSchema: The page of matching movies, their total number, the facet counts
+        and the cursor of the next page if there is one.
 
     Raises:
-        HTTPException: If no movies are found with the given criteria.
+        HTTPException: If a filter is invalid or no movies are found with the given criteria.
     """
-    query = db.query(models.Movies)
-
-    if title:
-        query = query.filter(models.Movies.title.ilike(f"%{title}%"))
-
+    release_date_obj = None
     if release_date:
-        # Convert release_date to date if needed
-        from datetime import datetime
-
         try:
-            release_date_obj = datetime.strptime(release_date, "%Y-%m-%d").date()
-            query = query.filter(models.Movies.release_date == release_date_obj)
+            release_date_obj = datetime.datetime.strptime(release_date, "%Y-%m-%d").date()
         except ValueError:
             raise HTTPException(
                 status_code=400, detail="Invalid date format. Use YYYY-MM-DD."
             )
 
-    if genre:
-        query = (
-            query.join(models.MovieGenres)
-            .join(models.Genres)
-            .filter(models.Genres.name.ilike(f"%{genre}%"))
-        )
+    requirements = (
+        [(people_id, "Acting") for people_id in actor or []]
+        + [(people_id, "Director") for people_id in director or []]
+        + [(people_id, None) for people_id in people or []]
+    )
+    within = get_people_index(db).intersect(requirements).tolist() if requirements else None
 
-    movies = query.offset(skip).limit(limit).all()
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, (float, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if runtime is not None and runtime not in RUNTIME_LABELS:
+        raise HTTPException(status_code=400, detail=f"Invalid runtime. Use one of {RUNTIME_LABELS}.")
+    if rating is not None and rating not in RATING_LABELS:
+        raise HTTPException(status_code=400, detail=f"Invalid rating. Use one of {RATING_LABELS}.")
+
+    index = get_search_index(db)
+    scores = index.match(
+        title,
+        genre_ids=index.genres_named(genre) if genre else None,
+        release_date=release_date_obj,
+        candidates=get_fuzzy_index(db).search(title) if fuzzy and title else None,
+        within=within,
+        decade=decade,
+        runtime=runtime,
+        rating=rating,
+    )
+    movie_ids, last = index.page(scores, limit, after)
+    movies = movies_by_ids(db, movie_ids)
 
     if not movies:
         raise HTTPException(
             status_code=404, detail="No movies found with the given criteria"
         )
 
-    return [
+    items = [
         MovieSchema(
             movie_id=movie.movie_id,
             title=movie.title,
@@ -339,3 +696,50 @@ async def search_movies(
         )
         for movie in movies
     ]
+    return SearchResultsSchema(
+        items=items,
+        total=index.count(scores),
+        facets=index.facets(scores),
+        next_cursor=encode_cursor(last) if last else None,
+    )
+
+
+@app.get("/people/{people_id}/filmography", response_model=FilmographySchema)
+def read_filmography(people_id: int, db: Session = Depends(get_db)):
+    """
+    Get the movies of a person, grouped by job, most recent first.
+
+    The movies of each job come from the people index; they are read together with one
+    primary-key query.
+
+    Args:
+        people_id (int): The ID of the person.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        FilmographySchema: The jobs of the person, each with its movies.
+
+    Raises:
+        HTTPException: If the person has no credits.
+    """
+    index = get_people_index(db)
+    roles = index.roles(people_id)
+    if not roles:
+        raise HTTPException(status_code=404, detail="Person not found")
+
+    movie_ids = sorted({movie_id for movies in roles.values() for movie_id in movies.tolist()})
+    movies = {movie.movie_id: movie for movie in movies_by_ids(db, movie_ids)}
+    titles = index.job_titles()
+    filmography = []
+    for job_id, job_movies in roles.items():
+        credited = [movies[movie_id] for movie_id in job_movies.tolist() if movie_id in movies]
+        credited.sort(key=lambda movie: movie.release_date or datetime.date.min, reverse=True)
+        filmography.append(
+            FilmographyRoleSchema(
+                job=titles.get(job_id, str(job_id)),
+                movies=[RecommendationSchema.from_orm(movie) for movie in credited],
+            )
+        )
+    # The main job of the person first
+    filmography.sort(key=lambda role: len(role.movies), reverse=True)
+    return FilmographySchema(people_id=people_id, roles=filmography)
@@ -1,3 +1,6 @@
-from .genre_based import GenreBasedRecommendationFetcher
+from .als_based import ALSRecommendationFetcher
+from .demographic_based import DemographicRecommendationFetcher
+from .hybrid_based import HybridRecommendationFetcher
+from .metadata_based import MetadataRecommendationFetcher
 from .movie_based import MovieBasedRecommendationFetcher
-from .trend_based import TrendingRecommendationFetcher
+from .social_based import SocialBasedRecommendationFetcher
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from .config import ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE_SECONDS
+
+
+class AdmissionController:
+    """Bounds the number of requests computed at once.
+
+    A request beyond `max_in_flight` waits for a slot for at most `max_queue_seconds`;
+    past that it is shed, so the requests admitted keep the database pool to themselves
+    and finish in time instead of every request queueing until the clients give up.
+
+    Attributes:
+        max_in_flight (int): Requests computed concurrently.
+        max_queue_seconds (float): Longest wait for a slot before a request is shed.
+    """
+
+    def __init__(
+        self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_queue_seconds: float = ADMISSION_MAX_QUEUE_SECONDS
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_seconds = max_queue_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.max_queue_wait = 0.0
+        self._condition = asyncio.Condition()
+        self._stats_lock = threading.Lock()
+
+    async def acquire(self) -> bool:
+        """Waits for a slot; returns False if none freed up within `max_queue_seconds`."""
+        start = time.monotonic()
+        async with self._condition:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < self.max_in_flight),
+                    timeout=self.max_queue_seconds,
+                )
+            except asyncio.TimeoutError:
+                with self._stats_lock:
+                    self.shed += 1
+                return False
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+        with self._stats_lock:
+            self.admitted += 1
+            self.max_queue_wait = max(self.max_queue_wait, time.monotonic() - start)
+        return True
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "max_in_flight": self.max_in_flight,
+                "max_queue_wait_ms": 1000 * self.max_queue_wait,
+            }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying an `AdmissionController` to some paths.
+
+    A shed request never reaches the endpoint: `shed` builds its response, e.g. from a
+    cached payload, without touching the database.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        paths: Iterable[str],
+        shed: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.shed = shed
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        if not await self.controller.acquire():
+            response = await self.shed(scope)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.controller.release()
@@ -0,0 +1,313 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .catalog import movies_by_ids, top_k
+from .config import (ALS_ALPHA, ALS_DIR, ALS_FACTORS, ALS_IMPLICIT,
+                     ALS_ITERATIONS, ALS_REGULARIZATION, CARROUSSEL_LENGTH)
+
+
+def _solve(
+    fixed: np.ndarray,
+    gram: Optional[np.ndarray],
+    notes: np.ndarray,
+    regularization: float,
+    implicit: bool,
+    alpha: float,
+) -> np.ndarray:
+    """Solves the least-squares problem of one user (or item) against fixed factors.
+
+    Explicit feedback minimises `Σ (r - x·y)² + λ n |x|²` over the rated rows of `fixed`.
+    Implicit feedback (Hu, Koren & Volinsky) treats every rated row as a positive with
+    confidence `1 + alpha * note`, the others as negatives with confidence 1; `gram`
+    must then hold `fixedᵀ fixed`.
+
+    Args:
+        fixed (np.ndarray): The factors of the rated rows only.
+        gram (Optional[np.ndarray]): `Yᵀ Y` over all rows, required for implicit feedback.
+        notes (np.ndarray): The notes of the rated rows.
+        regularization (float): The L2 regularisation λ.
+        implicit (bool): Whether to use the implicit feedback objective.
+        alpha (float): Confidence scaling of the implicit objective.
+
+    Returns:
+        np.ndarray: The solved factor vector.
+    """
+    factors = fixed.shape[1]
+    if implicit:
+        confidence = 1.0 + alpha * notes
+        a = gram + (fixed.T * (confidence - 1.0)) @ fixed + regularization * np.eye(factors)
+        b = fixed.T @ confidence
+    else:
+        a = fixed.T @ fixed + regularization * max(len(notes), 1) * np.eye(factors)
+        b = fixed.T @ notes
+    return np.linalg.solve(a, b).astype(np.float32)
+
+
+def _solve_all(
+    ratings: sparse.csr_matrix,
+    fixed: np.ndarray,
+    regularization: float,
+    implicit: bool,
+    alpha: float,
+) -> np.ndarray:
+    """Solves every row of `ratings` against the fixed factors of its columns."""
+    gram = fixed.T @ fixed if implicit else None
+    solved = np.zeros((ratings.shape[0], fixed.shape[1]), dtype=np.float32)
+    for row in range(ratings.shape[0]):
+        begin, end = ratings.indptr[row], ratings.indptr[row + 1]
+        if begin != end:
+            columns = ratings.indices[begin:end]
+            solved[row] = _solve(
+                fixed[columns], gram, ratings.data[begin:end], regularization, implicit, alpha
+            )
+    return solved
+
+
+class ALSModel:
+    """User and item factor matrices learnt by alternating least squares.
+
+    Attributes:
+        user_ids (np.ndarray): Sorted user IDs, aligned with `user_factors` (int64).
+        movie_ids (np.ndarray): Sorted movie IDs, aligned with `item_factors` (int64).
+        user_factors (np.ndarray): One factor vector per user (float32).
+        item_factors (np.ndarray): One factor vector per movie (float32).
+        offset (float): The global mean note removed before explicit training.
+        implicit (bool): Whether the model was trained on implicit feedback.
+    """
+
+    FILES = ("user_ids", "movie_ids", "user_factors", "item_factors", "params")
+
+    def __init__(
+        self,
+        user_ids: np.ndarray,
+        movie_ids: np.ndarray,
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+        offset: float = 0.0,
+        implicit: bool = ALS_IMPLICIT,
+    ):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.offset = offset
+        self.implicit = implicit
+        self._gram: Optional[np.ndarray] = None
+
+    @classmethod
+    def train(
+        cls,
+        user_ids: np.ndarray,
+        movie_ids: np.ndarray,
+        notes: np.ndarray,
+        factors: int = ALS_FACTORS,
+        iterations: int = ALS_ITERATIONS,
+        regularization: float = ALS_REGULARIZATION,
+        implicit: bool = ALS_IMPLICIT,
+        alpha: float = ALS_ALPHA,
+        seed: int = 0,
+    ) -> "ALSModel":
+        """Trains the factor matrices from raw `MovieUsers` notes.
+
+        Args:
+            user_ids (np.ndarray): The user of each rating.
+            movie_ids (np.ndarray): The movie of each rating.
+            notes (np.ndarray): The note of each rating.
+            factors (int): Number of latent factors.
+            iterations (int): Number of alternating passes.
+            regularization (float): The L2 regularisation λ.
+            implicit (bool): Whether to use the implicit feedback objective.
+            alpha (float): Confidence scaling of the implicit objective.
+            seed (int): Seed of the random initialisation.
+
+        Returns:
+            ALSModel: The trained model.
+        """
+        users, user_index = np.unique(user_ids, return_inverse=True)
+        movies, movie_index = np.unique(movie_ids, return_inverse=True)
+        offset = 0.0 if implicit or not len(notes) else float(np.mean(notes))
+        ratings = sparse.csr_matrix(
+            (np.asarray(notes, dtype=np.float32) - offset, (user_index, movie_index)),
+            shape=(len(users), len(movies)),
+        )
+        ratings_t = ratings.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        item_factors = rng.normal(0, 0.1, (len(movies), factors)).astype(np.float32)
+        user_factors = np.zeros((len(users), factors), dtype=np.float32)
+        for _ in range(iterations):
+            user_factors = _solve_all(ratings, item_factors, regularization, implicit, alpha)
+            item_factors = _solve_all(ratings_t, user_factors, regularization, implicit, alpha)
+
+        return cls(
+            users.astype(np.int64), movies.astype(np.int64), user_factors, item_factors, offset, implicit
+        )
+
+    def save(self, directory: str = ALS_DIR) -> None:
+        """Writes the model as `.npy` files that `load` can memory-map."""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            "user_ids": self.user_ids,
+            "movie_ids": self.movie_ids,
+            "user_factors": self.user_factors,
+            "item_factors": self.item_factors,
+            "params": np.array([self.offset, float(self.implicit)], dtype=np.float64),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+    @classmethod
+    def load(cls, directory: str = ALS_DIR) -> "ALSModel":
+        """Memory-maps a model written by `save`, so worker processes share its pages."""
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in cls.FILES
+        }
+        offset, implicit = arrays.pop("params")
+        return cls(**arrays, offset=float(offset), implicit=bool(implicit))
+
+    def fold_in(
+        self,
+        ratings: Dict[int, float],
+        regularization: float = ALS_REGULARIZATION,
+        alpha: float = ALS_ALPHA,
+    ) -> Optional[np.ndarray]:
+        """Solves a user vector against the fixed item factors, without retraining.
+
+        This is a single `factors x factors` linear solve, so a user who has just rated
+        a movie gets an up-to-date vector in well under a millisecond.
+
+        Args:
+            ratings (Dict[int, float]): The user's notes, keyed by movie ID.
+            regularization (float): The L2 regularisation λ.
+            alpha (float): Confidence scaling of the implicit objective.
+
+        Returns:
+            Optional[np.ndarray]: The user vector, or None if no rated movie is in the model.
+        """
+        if not ratings or not len(self.movie_ids):
+            return None
+        rated = np.fromiter(ratings.keys(), dtype=np.int64)
+        notes = np.fromiter(ratings.values(), dtype=np.float32) - self.offset
+        positions = np.minimum(np.searchsorted(self.movie_ids, rated), len(self.movie_ids) - 1)
+        known = self.movie_ids[positions] == rated
+        if not known.any():
+            return None
+        fixed = np.asarray(self.item_factors[positions[known]])
+        gram = self.gram() if self.implicit else None
+        return _solve(fixed, gram, notes[known], regularization, self.implicit, alpha)
+
+    def gram(self) -> np.ndarray:
+        """Returns `Yᵀ Y` over the item factors, computed once per loaded model."""
+        if self._gram is None:
+            items = np.asarray(self.item_factors)
+            self._gram = items.T @ items
+        return self._gram
+
+    def scores(self, user_vector: np.ndarray) -> np.ndarray:
+        """Scores every movie with one matrix-vector product."""
+        return np.asarray(self.item_factors) @ user_vector
+
+
+_model: Optional[ALSModel] = None
+_model_key: Optional[Tuple[str, float]] = None
+_model_lock = threading.Lock()
+
+
+def get_als_model(directory: str = ALS_DIR) -> Optional[ALSModel]:
+    """Returns the persisted model, re-mapping it when the files are replaced."""
+    global _model, _model_key
+    path = os.path.join(directory, "item_factors.npy")
+    with _model_lock:
+        if not os.path.exists(path):
+            return None
+        key = (directory, os.path.getmtime(path))
+        if _model is None or key != _model_key:
+            _model = ALSModel.load(directory)
+            _model_key = key
+        return _model
+
+
+class ALSRecommendationFetcher(RecommendationFetcher):
+    """Fetches recommendations from a matrix factorisation model."""
+
+    def __init__(self, model_dir: str = ALS_DIR, limit: int = CARROUSSEL_LENGTH):
+        self.model_dir = model_dir
+        self.limit = limit
+
+    def fetch(
+        self, db: Session, user_id: int, seen_movie_ids: List[int]
+    ) -> Dict[str, List[schemas.RecommendationSchema]]:
+        """
+        Recommends the movies with the highest predicted note.
+
+        The user's vector is folded in from their current notes at every request, so
+        notes saved through the `movieusers` routes are taken into account right away
+        without retraining the item factors.
+
+        Args:
+            db (Session): The database session object.
+            user_id (int): The ID of the user for whom recommendations are being made.
+            seen_movie_ids (List[int]): The IDs of the movies the user has already seen.
+
+        Returns:
+            Dict[str, List[schemas.RecommendationSchema]]: A dictionary with the `als_carousel` key.
+            If no recommendations are found, returns a message indicating no recommendations are available.
+            If an error occurs, returns a message with the error description.
+        """
+        try:
+            model = get_als_model(self.model_dir)
+            if model is None:
+                return {"message": "The factorisation model has not been trained yet."}
+
+            ratings = dict(
+                db.query(models.MovieUsers.movie_id, models.MovieUsers.note)
+                .filter(models.MovieUsers.user_id == user_id, models.MovieUsers.note.isnot(None))
+                .all()
+            )
+            user_vector = model.fold_in(ratings)
+            if user_vector is None:
+                return {"message": "No recommendations available."}
+
+            scores = model.scores(user_vector)
+            seen = np.isin(model.movie_ids, np.fromiter(seen_movie_ids, dtype=np.int64))
+            scores[seen] = -np.inf
+            best = model.movie_ids[top_k(scores, self.limit)].tolist()
+            movies = movies_by_ids(db, best)
+
+            if not movies:
+                return {"message": "No recommendations available."}
+
+            return {
+                "als_carousel": [
+                    schemas.RecommendationSchema.from_orm(movie) for movie in movies
+                ]
+            }
+
+        except db_breaker.errors:
+            raise
+        except Exception as e:
+            return {"message": f"An error occurred: {str(e)}"}
+
+
+# Entraîner le modèle hors-ligne : python -m recommendations.als_based
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    from .social_based import load_ratings
+
+    with SessionLocal() as session:
+        model = ALSModel.train(*load_ratings(session))
+    model.save()
+    print(
+        f"Modèle ALS entraîné pour {len(model.user_ids)} utilisateurs "
+        f"et {len(model.movie_ids)} films dans {ALS_DIR}"
+    )
@@ -0,0 +1,159 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalog import top_k
+from .config import (AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_PRECOMPUTED_LENGTH,
+                     AUTOCOMPLETE_REFRESH_SECONDS)
+from .search_index import normalize, popularity_score
+
+# Added to the score of keys starting at the first word, so title-start matches come first
+_TITLE_START_BONUS = 1e6
+
+
+class TitleAutocomplete:
+    """Prefix index of the movie titles, answering type-ahead queries without the database.
+
+    Every title is indexed under its normalized form and under each of its word suffixes,
+    so "thi" finds "The Thing". The keys are kept in one sorted list: the keys starting
+    with a prefix form a contiguous range found with two binary searches. The best
+    `limit` movies of every prefix of up to `AUTOCOMPLETE_PRECOMPUTED_LENGTH` characters,
+    whose ranges are the largest, are computed at build time.
+
+    Attributes:
+        keys (List[str]): Sorted normalized titles and title suffixes.
+        key_movies (np.ndarray): Position in `suggestions` of the movie of each key.
+        key_scores (np.ndarray): Popularity of the movie of each key, plus a bonus for title starts.
+        suggestions (List[Dict]): Movie ID, title, release date and poster of every movie.
+        precomputed (Dict[str, List[int]]): Best movie positions of every short prefix.
+    """
+
+    def __init__(self, suggestions: List[Dict], popularity: List[float], limit: int = AUTOCOMPLETE_LIMIT):
+        self.suggestions = suggestions
+        self.limit = limit
+        entries = []
+        for position, suggestion in enumerate(suggestions):
+            words = normalize(suggestion["title"]).split(" ")
+            for start in range(len(words)):
+                if words[start]:
+                    score = popularity[position] + (_TITLE_START_BONUS if start == 0 else 0.0)
+                    entries.append((" ".join(words[start:]), position, score))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.key_movies = np.array([position for _, position, _ in entries], dtype=np.int64)
+        self.key_scores = np.array([score for _, _, score in entries], dtype=np.float64)
+        self.precomputed = self._precompute()
+
+    @classmethod
+    def from_db(cls, db: Session, limit: int = AUTOCOMPLETE_LIMIT) -> "TitleAutocomplete":
+        rows = db.query(
+            models.Movies.movie_id,
+            models.Movies.title,
+            models.Movies.release_date,
+            models.Movies.poster_path,
+            models.Movies.vote_average,
+            models.Movies.vote_count,
+        ).filter(models.Movies.title.isnot(None)).all()
+        suggestions = [
+            {
+                "movie_id": movie_id,
+                "title": title,
+                "release_date": release_date.isoformat() if release_date else None,
+                "poster_path": poster_path,
+            }
+            for movie_id, title, release_date, poster_path, _, _ in rows
+        ]
+        popularity = [popularity_score(row[4], row[5]) for row in rows]
+        return cls(suggestions, popularity, limit)
+
+    def _range(self, prefix: str) -> range:
+        start = bisect_left(self.keys, prefix)
+        # Every key starting with the prefix sorts before the prefix followed by the highest code point
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        return range(start, end)
+
+    def _best(self, keys: range) -> List[int]:
+        """Returns the positions of the best distinct movies among a range of keys."""
+        scores = self.key_scores[keys.start:keys.stop]
+        # A movie has one key per word, so a few more candidates than needed are enough almost always
+        for wanted in (4 * self.limit, len(scores)):
+            positions = self.key_movies[keys.start + top_k(scores, wanted)]
+            best = list(dict.fromkeys(positions.tolist()))[: self.limit]
+            if len(best) == self.limit or wanted >= len(scores):
+                return best
+        return best
+
+    def _precompute(self) -> Dict[str, List[int]]:
+        precomputed = {}
+        for length in range(1, AUTOCOMPLETE_PRECOMPUTED_LENGTH + 1):
+            start = 0
+            while start < len(self.keys):
+                prefix = self.keys[start][:length]
+                # A key shorter than `length` sorts before the longer keys it starts
+                if len(prefix) < length:
+                    start += 1
+                    continue
+                keys = self._range(prefix)
+                precomputed[prefix] = self._best(keys)
+                start = keys.stop
+        return precomputed
+
+    def complete(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Dict]:
+        """Returns the most popular movies with a title or title word starting with the query.
+
+        Args:
+            query (str): What the user typed so far.
+            limit (int): Maximum number of suggestions, at most the `limit` of the index.
+
+        Returns:
+            List[Dict]: The suggestions, title-start matches first, then by popularity.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        best = self.precomputed.get(prefix)
+        if best is None:
+            best = self._best(self._range(prefix)) if len(prefix) > AUTOCOMPLETE_PRECOMPUTED_LENGTH else []
+        return [self.suggestions[position] for position in best[:limit]]
+
+
+_autocomplete: Optional[TitleAutocomplete] = None
+_autocomplete_loaded_at = 0.0
+_autocomplete_rebuilding = False
+_autocomplete_lock = threading.Lock()
+
+
+def get_autocomplete(db: Session, max_age: float = AUTOCOMPLETE_REFRESH_SECONDS) -> TitleAutocomplete:
+    """Returns the process-wide index, rebuilt from the database when older than `max_age` seconds.
+
+    Only a rebuild queries the database. It runs in the one request that found the index
+    stale, outside the lock, while the concurrent requests keep using the previous index.
+    """
+    global _autocomplete, _autocomplete_loaded_at, _autocomplete_rebuilding
+    with _autocomplete_lock:
+        current = _autocomplete
+        stale = current is None or time.monotonic() - _autocomplete_loaded_at > max_age
+        if not stale or (current is not None and _autocomplete_rebuilding):
+            return current
+        _autocomplete_rebuilding = True
+    try:
+        rebuilt = TitleAutocomplete.from_db(db)
+    finally:
+        with _autocomplete_lock:
+            _autocomplete_rebuilding = False
+    with _autocomplete_lock:
+        _autocomplete = rebuilt
+        _autocomplete_loaded_at = time.monotonic()
+    return rebuilt
+
+
+def invalidate_autocomplete() -> None:
+    """Drops the process-wide index so the next `get_autocomplete` call rebuilds it."""
+    global _autocomplete
+    with _autocomplete_lock:
+        _autocomplete = None
@@ -0,0 +1,134 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple, Type
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from .config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend for a while, so requests fail fast instead of waiting on it.
+
+    After `failure_threshold` consecutive failures the breaker opens: calls are refused
+    for `reset_seconds`. Then a single trial call is let through (half-open); its success
+    closes the breaker, its failure opens it again.
+
+    Attributes:
+        name (str): Name of the backend in `/metrics/breakers`.
+        errors (Tuple[Type[BaseException], ...]): The exceptions counted as backend failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        errors: Tuple[Type[BaseException], ...] = (Exception,),
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.errors = errors
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Returns whether a call may be made now; in half-open state, only one trial call is."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"Disjoncteur {self.name} ouvert après {self._failures} échecs")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def observe(self, error: BaseException) -> None:
+        """Records an error caught by the caller as a failure if it is a backend error."""
+        if isinstance(error, self.errors):
+            self.record_failure()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Runs the block if the breaker allows it and records its outcome.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable")
+        try:
+            yield
+        except self.errors:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Not a backend failure: a bug in the block must not hold the half-open trial
+            self.record_success()
+            raise
+        self.record_success()
+
+    def reset(self) -> None:
+        """Closes the breaker and forgets its failures."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+            self._rejected = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "failures": self._failures, "rejected": self._rejected}
+
+
+# Connection loss, saturated server or exhausted pool; query bugs do not open the breaker
+db_breaker = CircuitBreaker("database", errors=(OperationalError, PoolTimeoutError))
+# Every Redis helper catches its own errors: they report them with `redis_breaker.observe`
+redis_breaker = CircuitBreaker("redis", errors=(RedisConnectionError, RedisTimeoutError))
+
+
+def all_breakers() -> Tuple[CircuitBreaker, ...]:
+    return db_breaker, redis_breaker
@@ -0,0 +1,100 @@
+import json
+import threading
+from typing import Any, Dict, Iterable
+
+from fastapi.encoders import jsonable_encoder
+
+from .breaker import redis_breaker
+
+STATS_KEY_PREFIX = "recommendations:stats"
+
+
+class CacheStats:
+    """Hit and miss counters of a cache.
+
+    Counters are kept per process and, when a Redis client is given, mirrored in
+    Redis so the hit rate can be read across every worker.
+
+    Attributes:
+        name (str): The name of the cache.
+        hits (int): Number of hits in this process.
+        misses (int): Number of misses in this process.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self, redis_client=None) -> None:
+        self._count("hits", redis_client)
+
+    def miss(self, redis_client=None) -> None:
+        self._count("misses", redis_client)
+
+    def _count(self, counter: str, redis_client) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if redis_client:
+            try:
+                redis_client.incr(f"{STATS_KEY_PREFIX}:{self.name}:{counter}")
+            except Exception as e:
+                redis_breaker.observe(e)
+                print(f"Erreur lors de la mise à jour des statistiques dans Redis : {e}")
+
+    def snapshot(self, redis_client=None) -> Dict[str, Any]:
+        """Returns the counters and hit rate of this process, and of all workers if Redis is available."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        stats = {"hits": hits, "misses": misses, "hit_rate": _rate(hits, misses)}
+        if redis_client:
+            try:
+                shared = redis_client.mget(
+                    f"{STATS_KEY_PREFIX}:{self.name}:hits",
+                    f"{STATS_KEY_PREFIX}:{self.name}:misses",
+                )
+                shared_hits, shared_misses = (int(value or 0) for value in shared)
+                stats["shared"] = {
+                    "hits": shared_hits,
+                    "misses": shared_misses,
+                    "hit_rate": _rate(shared_hits, shared_misses),
+                }
+            except Exception as e:
+                redis_breaker.observe(e)
+                print(f"Erreur lors de la lecture des statistiques dans Redis : {e}")
+        return stats
+
+
+def _rate(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+_stats: Dict[str, CacheStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_cache_stats(name: str) -> CacheStats:
+    """Returns the process-wide counters of the named cache, creating them if needed."""
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = CacheStats(name)
+        return _stats[name]
+
+
+def all_cache_stats() -> Iterable[CacheStats]:
+    with _stats_lock:
+        return list(_stats.values())
+
+
+def to_jsonable(recommendations: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts the schemas of a recommendations payload into plain JSON values.
+
+    `jsonable_encoder` works with pydantic 1 and 2 alike, like the schemas themselves.
+    """
+    return jsonable_encoder(recommendations)
+
+
+def dumps_payload(recommendations: Dict[str, Any]) -> str:
+    """Serialises a recommendations payload to JSON for Redis."""
+    return json.dumps(to_jsonable(recommendations))
@@ -0,0 +1,417 @@
+import os
+import pickle
+import threading
+import time
+from datetime import date
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .config import (CATALOG_REFRESH_SECONDS, HYBRID_PROJECTION_DIM,
+                     HYBRID_WEIGHT_POPULARITY, WEIGHT_REVENUE,
+                     WEIGHT_VOTE_AVERAGE, WEIGHT_VOTE_COUNT)
+
+# Release day of the movies without a release date: they sort after every other one
+NO_RELEASE_DAY = np.iinfo(np.int32).min
+
+
+class MovieCatalog:
+    """Column-oriented, in-memory view of the movie catalog.
+
+    Every array is aligned on the same row order, which is the ascending order
+    of ``movie_ids``. This lets the fetchers score the whole catalog with a few
+    vectorised NumPy operations instead of one SQL query per signal.
+
+    Attributes:
+        movie_ids (np.ndarray): Sorted movie IDs (int64).
+        embeddings (np.ndarray): L2-normalised embeddings, one row per movie (float32).
+            Rows of movies without embeddings are zeros.
+        has_embedding (np.ndarray): Boolean mask of movies that have an embedding.
+        popularity (np.ndarray): Popularity normalised in [0, 1] (float32).
+        genre_bits (np.ndarray): Bitmask of the genres of each movie (uint64).
+        genre_index (Dict[int, int]): Maps a genre ID to its bit position.
+        released (np.ndarray): Boolean mask of movies already released.
+        release_days (np.ndarray): Release date as days since 1970-01-01 (int32),
+            `NO_RELEASE_DAY` if unknown.
+        vote_average (np.ndarray): Raw vote average (float32).
+        vote_count (np.ndarray): Raw vote count (float32).
+        projection (np.ndarray): Orthonormal basis of the main directions of the
+            embeddings, one column per direction (float32).
+        projected (np.ndarray): Embeddings in that basis, one row per direction and one
+            column per movie, so a taste vector is projected with one contiguous pass.
+        residuals (np.ndarray): Norm of the part of each embedding outside the basis (float32).
+    """
+
+    def __init__(
+        self,
+        movie_ids: np.ndarray,
+        embeddings: np.ndarray,
+        has_embedding: np.ndarray,
+        popularity: np.ndarray,
+        genre_bits: np.ndarray,
+        genre_index: Dict[int, int],
+        released: np.ndarray,
+        release_days: np.ndarray,
+        vote_average: np.ndarray,
+        vote_count: np.ndarray,
+        projection: np.ndarray,
+        projected: np.ndarray,
+        residuals: np.ndarray,
+    ):
+        self.movie_ids = movie_ids
+        self.embeddings = embeddings
+        self.has_embedding = has_embedding
+        self.popularity = popularity
+        self.genre_bits = genre_bits
+        self.genre_index = genre_index
+        self.released = released
+        self.release_days = release_days
+        self.vote_average = vote_average
+        self.vote_count = vote_count
+        self.projection = projection
+        self.projected = projected
+        self.residuals = residuals
+        self._genre_orders: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def positions(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Returns the row positions of the given movie IDs, dropping unknown IDs.
+
+        Args:
+            movie_ids (Iterable[int]): The movie IDs to locate.
+
+        Returns:
+            np.ndarray: The row positions (int64) of the known movies.
+        """
+        ids = np.fromiter(movie_ids, dtype=np.int64)
+        if not len(self.movie_ids) or not len(ids):
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.movie_ids, ids)
+        positions = np.minimum(positions, len(self.movie_ids) - 1)
+        return positions[self.movie_ids[positions] == ids]
+
+    def genre_mask(self, genre_ids: Iterable[int]) -> np.uint64:
+        """Builds the bitmask matching a set of genre IDs."""
+        mask = np.uint64(0)
+        for genre_id in genre_ids:
+            bit = self.genre_index.get(genre_id)
+            if bit is not None:
+                mask |= np.uint64(1) << np.uint64(bit)
+        return mask
+
+    def taste_vector(self, movie_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """Computes a user's taste vector as the normalised mean of the given movies' embeddings.
+
+        Args:
+            movie_ids (Iterable[int]): The movies the user liked.
+
+        Returns:
+            Optional[np.ndarray]: The unit taste vector, or None if none of the movies has an embedding.
+        """
+        positions = self.positions(movie_ids)
+        positions = positions[self.has_embedding[positions]]
+        if not len(positions):
+            return None
+        vector = self.embeddings[positions].mean(axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    @cached_property
+    def base_scores(self) -> np.ndarray:
+        """Popularity part of the hybrid score, ``-inf`` for the movies not released yet."""
+        scores = (HYBRID_WEIGHT_POPULARITY * self.popularity).astype(np.float32)
+        scores[~self.released] = -np.inf
+        return scores
+
+    @cached_property
+    def trending_order(self) -> np.ndarray:
+        """Positions of every movie, latest release first, then by vote count and vote average."""
+        return np.lexsort(
+            (-self.vote_average, -self.vote_count, -self.release_days.astype(np.int64))
+        )
+
+    def genre_order(self, genre_id: int) -> np.ndarray:
+        """Positions of the released movies of a genre, most popular first.
+
+        Computed on first use and kept with the catalog, so later calls cost nothing.
+
+        Args:
+            genre_id (int): The genre.
+
+        Returns:
+            np.ndarray: The positions, empty for a genre unknown to the catalog.
+        """
+        order = self._genre_orders.get(genre_id)
+        if order is None:
+            bit = self.genre_index.get(genre_id)
+            if bit is None:
+                return np.empty(0, dtype=np.int64)
+            selected = ((self.genre_bits >> np.uint64(bit)) & np.uint64(1)).astype(bool) & self.released
+            order = np.flatnonzero(selected)
+            order = order[np.argsort(-self.popularity[order], kind="stable")]
+            self._genre_orders[genre_id] = order
+        return order
+
+    def save(self, directory: str) -> None:
+        """Writes the arrays of the catalog to `.npy` files so other processes can map them."""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        genre_index = np.array(sorted(self.genre_index.items()), dtype=np.int64).reshape(-1, 2)
+        np.save(os.path.join(directory, "genre_index.npy"), genre_index)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "MovieCatalog":
+        """Reads a catalog written by `save`, memory-mapping its arrays by default.
+
+        Mapped arrays are read-only and shared through the page cache, so every
+        process of a pool can load the catalog without its own copy.
+        """
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        }
+        genre_index = np.load(os.path.join(directory, "genre_index.npy"))
+        return cls(genre_index={int(genre_id): int(bit) for genre_id, bit in genre_index}, **arrays)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "MovieCatalog":
+        """Loads the catalog from the database in two queries.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            MovieCatalog: The loaded catalog.
+        """
+        rows = (
+            db.query(
+                models.Movies.movie_id,
+                models.Movies.vote_average,
+                models.Movies.vote_count,
+                models.Movies.revenue,
+                models.Movies.release_date,
+                models.Movies.embeddings,
+            )
+            .order_by(models.Movies.movie_id)
+            .all()
+        )
+        size = len(rows)
+        movie_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=size)
+
+        vote_average = np.array([row[1] or 0.0 for row in rows], dtype=np.float32)
+        vote_count = np.array([row[2] or 0 for row in rows], dtype=np.float32)
+        revenue = np.array([max(row[3] or 0.0, 0.0) for row in rows], dtype=np.float32)
+        popularity = (
+            WEIGHT_VOTE_AVERAGE * vote_average / 10.0
+            + WEIGHT_REVENUE * _log_scale(revenue)
+            + WEIGHT_VOTE_COUNT * _log_scale(vote_count)
+        ).astype(np.float32)
+
+        today = date.today()
+        released = np.array(
+            [row[4] is not None and row[4] <= today for row in rows], dtype=bool
+        )
+        epoch = date(1970, 1, 1)
+        release_days = np.array(
+            [(row[4] - epoch).days if row[4] is not None else NO_RELEASE_DAY for row in rows],
+            dtype=np.int32,
+        )
+
+        vectors = [pickle.loads(row[5]) if row[5] else None for row in rows]
+        dim = next((np.asarray(v).size for v in vectors if v is not None), 0)
+        embeddings = np.zeros((size, dim), dtype=np.float32)
+        has_embedding = np.zeros(size, dtype=bool)
+        for position, vector in enumerate(vectors):
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32).ravel()
+                norm = np.linalg.norm(vector)
+                if vector.size == dim and norm:
+                    embeddings[position] = vector / norm
+                    has_embedding[position] = True
+        del vectors
+        projection, projected, residuals = _project(embeddings, has_embedding)
+
+        genre_index: Dict[int, int] = {}
+        genre_bits = np.zeros(size, dtype=np.uint64)
+        genre_rows = db.query(models.MovieGenres.movie_id, models.MovieGenres.genre_id).all()
+        for genre_id in sorted({row[1] for row in genre_rows}):
+            if len(genre_index) < 64:
+                genre_index[genre_id] = len(genre_index)
+        if genre_rows and size:
+            ids = np.array([row[0] for row in genre_rows], dtype=np.int64)
+            bits = np.array(
+                [genre_index.get(row[1], -1) for row in genre_rows], dtype=np.int64
+            )
+            positions = np.minimum(np.searchsorted(movie_ids, ids), size - 1)
+            known = (movie_ids[positions] == ids) & (bits >= 0)
+            np.bitwise_or.at(
+                genre_bits,
+                positions[known],
+                np.left_shift(np.uint64(1), bits[known].astype(np.uint64)),
+            )
+
+        return cls(
+            movie_ids=movie_ids,
+            embeddings=embeddings,
+            has_embedding=has_embedding,
+            popularity=popularity,
+            genre_bits=genre_bits,
+            genre_index=genre_index,
+            released=released,
+            release_days=release_days,
+            vote_average=vote_average,
+            vote_count=vote_count,
+            projection=projection,
+            projected=projected,
+            residuals=residuals,
+        )
+
+
+_ARRAYS = (
+    "movie_ids",
+    "embeddings",
+    "has_embedding",
+    "popularity",
+    "genre_bits",
+    "released",
+    "release_days",
+    "vote_average",
+    "vote_count",
+    "projection",
+    "projected",
+    "residuals",
+)
+
+
+def _project(
+    embeddings: np.ndarray,
+    has_embedding: np.ndarray,
+    dim: int = HYBRID_PROJECTION_DIM,
+    sample_size: int = 20000,
+    chunk_size: int = 65536,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Projects the embeddings on their `dim` main directions.
+
+    The directions are the top right singular vectors of up to `sample_size` embeddings.
+    For a unit taste vector ``t`` split the same way, ``t . x`` is at most
+    ``(P't) . (P'x) + |t - PP't| * |x - PP'x|``: `hybrid_top_k` uses this bound to
+    skip the movies that cannot reach the top-k.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The basis (d x dim), the projected
+        embeddings (dim x n) and the residual norms (n).
+    """
+    size, width = embeddings.shape
+    rows = np.flatnonzero(has_embedding)
+    if len(rows) > sample_size:
+        rows = np.sort(np.random.default_rng(0).choice(rows, sample_size, replace=False))
+    dim = min(dim, width, len(rows))
+    projection = np.zeros((width, dim), dtype=np.float32)
+    if dim:
+        projection[:] = np.linalg.svd(embeddings[rows], full_matrices=False)[2][:dim].T
+
+    projected = np.empty((dim, size), dtype=np.float32)
+    residuals = np.empty(size, dtype=np.float32)
+    for start in range(0, size, chunk_size):
+        block = embeddings[start:start + chunk_size]
+        coordinates = block @ projection
+        projected[:, start:start + chunk_size] = coordinates.T
+        residuals[start:start + chunk_size] = np.linalg.norm(block - coordinates @ projection.T, axis=1)
+    return projection, projected, residuals
+
+
+def _log_scale(values: np.ndarray) -> np.ndarray:
+    """Log-scales non-negative values into [0, 1]."""
+    scaled = np.log1p(values)
+    top = scaled.max() if len(scaled) else 0.0
+    return scaled / top if top else np.zeros_like(scaled)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the positions of the k highest finite scores, best first.
+
+    Uses ``argpartition`` so the cost is linear in the catalog size.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return candidates[np.isfinite(scores[candidates])]
+
+
+def movies_by_ids(db: Session, movie_ids: List[int]) -> List[models.Movies]:
+    """Fetches movies by primary key, keeping the order of ``movie_ids``."""
+    if not movie_ids:
+        return []
+    movies = db.query(models.Movies).filter(models.Movies.movie_id.in_(movie_ids)).all()
+    by_id = {movie.movie_id: movie for movie in movies}
+    return [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+
+
+_catalog: Optional[MovieCatalog] = None
+_catalog_loaded_at = 0.0
+_catalog_refreshing = False
+_catalog_lock = threading.Lock()
+
+
+def _refresh_catalog(bind: Engine) -> None:
+    global _catalog, _catalog_loaded_at, _catalog_refreshing
+    try:
+        with sessionmaker(bind=bind)() as session:
+            catalog = MovieCatalog.from_db(session)
+        with _catalog_lock:
+            # A catalog installed meanwhile stays pinned
+            if _catalog_loaded_at != float("inf"):
+                _catalog, _catalog_loaded_at = catalog, time.monotonic()
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement du catalogue : {e}")
+    finally:
+        with _catalog_lock:
+            _catalog_refreshing = False
+
+
+def get_catalog(db: Session, max_age: float = CATALOG_REFRESH_SECONDS) -> MovieCatalog:
+    """Returns the process-wide catalog.
+
+    Only the very first call loads it on the request path. Once it is older than
+    `max_age` seconds, it is reloaded in a background thread with its own session and
+    swapped in when ready, while requests keep using the current one.
+
+    Args:
+        db (Session): The database session used if the catalog must be loaded.
+        max_age (float): Maximum age of the cached catalog in seconds.
+
+    Returns:
+        MovieCatalog: The current catalog.
+    """
+    global _catalog, _catalog_loaded_at, _catalog_refreshing
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog, _catalog_loaded_at = MovieCatalog.from_db(db), time.monotonic()
+        elif time.monotonic() - _catalog_loaded_at > max_age and not _catalog_refreshing:
+            _catalog_refreshing = True
+            threading.Thread(target=_refresh_catalog, args=(db.get_bind(),), daemon=True).start()
+        return _catalog
+
+
+def invalidate_catalog() -> None:
+    """Drops the process-wide catalog so the next `get_catalog` call reloads it."""
+    global _catalog, _catalog_loaded_at
+    with _catalog_lock:
+        _catalog, _catalog_loaded_at = None, 0.0
+
+
+def install_catalog(catalog: MovieCatalog) -> None:
+    """Makes `catalog` the process-wide catalog and pins it until `invalidate_catalog` is called."""
+    global _catalog, _catalog_loaded_at
+    with _catalog_lock:
+        _catalog = catalog
+        _catalog_loaded_at = float("inf")
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .breaker import redis_breaker
+from .cache import dumps_payload, get_cache_stats, to_jsonable
+from .config import COLD_START_LOCAL_SIZE, COLD_START_TTL
+from .pipeline import TIMED_OUT_KEY
+
+
+def cold_start_key(genre_ids: Iterable[int]) -> str:
+    """Builds the canonical cache key of a set of genres: order and duplicates do not matter."""
+    return "recommendations:coldstart:" + ",".join(str(genre_id) for genre_id in sorted(set(genre_ids)))
+
+
+def is_cold_start(db: Session, user_id: int) -> bool:
+    """A user is cold-start while they have not rated any movie."""
+    return (
+        db.query(models.MovieUsers.movie_id)
+        .filter(models.MovieUsers.user_id == user_id, models.MovieUsers.note.isnot(None))
+        .first()
+        is None
+    )
+
+
+def filter_seen(recommendations: Dict[str, Any], seen_movie_ids: Iterable[int]) -> Dict[str, Any]:
+    """Removes the seen movies from every carousel of a JSON payload, dropping emptied carousels."""
+    seen = set(seen_movie_ids)
+    if not seen:
+        return recommendations
+    filtered = {}
+    for key, value in recommendations.items():
+        if isinstance(value, list):
+            value = [movie for movie in value if movie["movie_id"] not in seen]
+            if not value:
+                continue
+        filtered[key] = value
+    return filtered
+
+
+class ColdStartCache:
+    """Recommendations shared by every cold-start user who picked the same genres.
+
+    Payloads are stored in Redis under `cold_start_key` so every worker shares them,
+    with a bounded in-process copy used as a first level and as a fallback when
+    Redis is unavailable.
+    """
+
+    def __init__(self, ttl: int = COLD_START_TTL, local_size: int = COLD_START_LOCAL_SIZE):
+        self.ttl = ttl
+        self.local_size = local_size
+        self.stats = get_cache_stats("cold_start")
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, redis_client, genre_ids: Iterable[int]) -> Optional[Dict[str, Any]]:
+        key = cold_start_key(genre_ids)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._local.move_to_end(key)
+                return entry[1]
+        if redis_client:
+            try:
+                data = redis_client.get(key)
+                if data:
+                    payload = json.loads(data)
+                    self._remember(key, payload)
+                    return payload
+            except Exception as e:
+                redis_breaker.observe(e)
+                print(f"Erreur lors de la lecture du cache de démarrage à froid : {e}")
+        return None
+
+    def set(self, redis_client, genre_ids: Iterable[int], recommendations: Dict[str, Any]) -> Dict[str, Any]:
+        key = cold_start_key(genre_ids)
+        payload = to_jsonable(recommendations)
+        self._remember(key, payload)
+        if redis_client:
+            try:
+                redis_client.set(key, dumps_payload(payload), ex=self.ttl)
+            except Exception as e:
+                redis_breaker.observe(e)
+                print(f"Erreur lors de l'écriture du cache de démarrage à froid : {e}")
+        return payload
+
+    def get_or_compute(
+        self,
+        redis_client,
+        genre_ids: Iterable[int],
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Returns the shared payload of the genre set, computing and storing it on a miss.
+
+        A partial payload, cut by the deadline, is returned without being stored.
+        """
+        genre_ids = list(genre_ids)
+        payload = self.get(redis_client, genre_ids)
+        if payload is not None:
+            self.stats.hit(redis_client)
+            return payload
+        self.stats.miss(redis_client)
+        recommendations = compute()
+        if TIMED_OUT_KEY in recommendations:
+            return to_jsonable(recommendations)
+        return self.set(redis_client, genre_ids, recommendations)
+
+    def clear(self) -> None:
+        """Empties the in-process copy; Redis entries expire on their own."""
+        with self._lock:
+            self._local.clear()
+
+    def _remember(self, key: str, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, payload)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+cold_start_cache = ColdStartCache()
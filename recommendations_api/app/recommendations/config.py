@@ -1,4 +1,134 @@
+import os
+
 CARROUSSEL_LENGTH = 20
 WEIGHT_VOTE_AVERAGE = 0.5
 WEIGHT_REVENUE = 0.3
 WEIGHT_VOTE_COUNT = 0.2
+CATALOG_REFRESH_SECONDS = 600
+HYBRID_WEIGHT_SIMILARITY = 0.5
+HYBRID_WEIGHT_POPULARITY = 0.3
+HYBRID_WEIGHT_GENRE = 0.2
+# The similarity is bounded from embeddings projected on this many main directions,
+# then computed exactly for the movies whose bound can still reach the top-k
+HYBRID_PROJECTION_DIM = 16
+HYBRID_CANDIDATES = 1024
+# Above this many movies left to score exactly, the whole catalog is scored instead
+HYBRID_RESCORE_LIMIT = 50_000
+CAROUSEL_PRIORITY = (
+    "hybrid_carousel",
+    "social_carousel",
+    "als_carousel",
+    "movie_",
+    "demographic_carousel",
+    "genre_",
+    "trending_carousel",
+)
+MMR_LAMBDA = 0.7
+DATA_DIR = os.getenv("RECOMMENDATIONS_DATA_DIR", "data")
+CF_NEIGHBORS = 50
+CF_CHUNK_NNZ = 20_000_000
+CF_BATCH_SIZE = 100_000
+CF_NEUTRAL_NOTE = 3
+CF_NEIGHBORS_PATH = os.path.join(DATA_DIR, "item_neighbors.npz")
+ALS_FACTORS = 64
+ALS_ITERATIONS = 10
+ALS_REGULARIZATION = 0.1
+ALS_ALPHA = 10.0
+ALS_IMPLICIT = False
+ALS_DIR = os.path.join(DATA_DIR, "als")
+NEIGHBORS_K = 50
+NEIGHBORS_BLOCK_SIZE = 256
+NEIGHBORS_DIR = os.path.join(DATA_DIR, "neighbors")
+METADATA_TOP_CAST = 10
+METADATA_CREW_JOBS = ("Director", "Writer", "Screenplay")
+COLD_START_TTL = 3600
+COLD_START_LOCAL_SIZE = 1024
+SEGMENT_COUNT = 300
+SEGMENT_POOL_SIZE = 2000
+SEGMENT_ITERATIONS = 20
+SEGMENT_GENRE_WEIGHT = 0.5
+SEGMENTS_PATH = os.path.join(DATA_DIR, "segments.npz")
+DEMOGRAPHIC_AGE_BANDS = (18, 25, 35, 45, 55, 65)
+DEMOGRAPHIC_POOL_SIZE = 100
+DEMOGRAPHIC_REFRESH_SECONDS = 3600
+PRECOMPUTED_TTL = 2 * 24 * 3600
+BATCH_CHUNK_SIZE = 256
+WARMUP_TTL = 900
+IMPRESSION_BLOOM_BITS = 16384
+IMPRESSION_HASHES = 4
+IMPRESSION_WINDOW = 7 * 24 * 3600
+IMPRESSION_CANDIDATES = 2 * CARROUSSEL_LENGTH
+# Sessions a request opens for its pooled generators, besides its own
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+# Threads shared by the concurrent generators of every request, each holding one connection
+PIPELINE_POOL_WORKERS = int(os.getenv("PIPELINE_POOL_WORKERS", "8"))
+PIPELINE_CACHE_SIZE = 1024
+# Expected duration of each candidate generator, in seconds
+PIPELINE_BUDGETS = {
+    "hybrid": 0.05,
+    "social": 0.05,
+    "als": 0.05,
+    "demographic": 0.01,
+    "movie": 0.3,
+}
+RECOMMENDATIONS_BUDGET_SECONDS = float(os.getenv("RECOMMENDATIONS_BUDGET_SECONDS", "0.5"))
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+REDIS_TIMEOUT_SECONDS = float(os.getenv("REDIS_TIMEOUT_SECONDS", "0.2"))
+SNAPSHOT_LENGTH = 2 * CARROUSSEL_LENGTH
+SNAPSHOT_REFRESH_SECONDS = 600
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "snapshot.json")
+# SQLAlchemy's default pool holds 15 connections: the generator threads hold at most
+# PIPELINE_POOL_WORKERS of them, and each admitted request one more
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(max(1, 15 - PIPELINE_POOL_WORKERS))))
+ADMISSION_MAX_QUEUE_SECONDS = float(os.getenv("ADMISSION_MAX_QUEUE_SECONDS", "0.5"))
+ADMISSION_RETRY_AFTER_SECONDS = 1
+# Also defined in datacrawler/top_credits.py, which fills MovieTopCredits at ingest
+TOP_CREDITS_ACTORS = 10
+TOP_CREDITS_JOBS = (
+    "Director",
+    "Producer",
+    "Writer",
+    "Editor",
+    "Original Music Composer",
+    "Executive Producer",
+    "Director of Photography",
+)
+TOP_CREDITS_BATCH_SIZE = 500
+CREDITS_PAGE_SIZE = 50
+CREDITS_MAX_PAGE_SIZE = 200
+CREDITS_NULL_CAST_ORDER = 2**31 - 1
+HTTP_CACHE_MAX_AGE = 60
+HTTP_BODY_CACHE_SIZE = 2048
+CATALOG_VERSION_TTL = 30
+SEARCH_INDEX_PATH = os.path.join(DATA_DIR, "search_index.npz")
+# Each occurrence of a term counts this many times in its field
+SEARCH_FIELD_WEIGHTS = {"title": 3, "names": 2, "tagline": 2, "overview": 1}
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_BATCH_SIZE = 1000
+SEARCH_COMPACT_THRESHOLD = 1_000_000
+SEARCH_REFRESH_SECONDS = 300
+# Deleted documents, as a share of the live ones, past which a refresh compacts the index
+SEARCH_COMPACT_DELETED_SHARE = 0.1
+AUTOCOMPLETE_LIMIT = 10
+# Prefixes up to this length have their suggestions computed when the index is built
+AUTOCOMPLETE_PRECOMPUTED_LENGTH = 3
+AUTOCOMPLETE_REFRESH_SECONDS = 600
+SEARCH_FUZZY_CANDIDATES = 50
+SEARCH_FUZZY_MIN_SIMILARITY = 0.6
+# Candidates share at least this fraction of the trigrams shared by the closest entry
+SEARCH_FUZZY_MIN_OVERLAP = 0.5
+# Trigrams in more entries than this are skipped, once the rarest ones are used
+SEARCH_FUZZY_MAX_POSTINGS = 20000
+SEARCH_FUZZY_MIN_TRIGRAMS = 3
+SEARCH_FUZZY_POPULARITY_WEIGHT = 0.01
+SEARCH_FUZZY_REFRESH_SECONDS = 600
+PEOPLE_INDEX_BATCH_SIZE = 100_000
+PEOPLE_INDEX_REFRESH_SECONDS = 600
+# Facet buckets of the search results: runtime in minutes and vote average
+SEARCH_RUNTIME_EDGES = (90, 120, 150)
+SEARCH_RATING_EDGES = (5, 6, 7, 8)
+GENRES_PAGE_SIZE = 20
+GENRES_MAX_PAGE_SIZE = 100
+SEARCH_MAX_PAGE_SIZE = 100
@@ -0,0 +1,39 @@
+import base64
+import json
+import math
+from typing import Any, Sequence, Tuple, Type
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes the sort key of the last row of a page into an opaque, URL-safe cursor."""
+    data = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[Type]) -> Tuple[Any, ...]:
+    """Decodes a cursor made by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+        types (Sequence[Type]): Type of each value of the sort key: `int`, `float` or `str`.
+            Integers are accepted for `float` values, which must be finite.
+
+    Raises:
+        ValueError: If the cursor is malformed or a value has the wrong type.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    decoded = []
+    for value, kind in zip(values, types):
+        accepted = (int, float) if kind is float else kind
+        # bool is a subclass of int, but never part of a sort key
+        if isinstance(value, bool) or not isinstance(value, accepted):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if kind is float and not math.isfinite(value):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        decoded.append(kind(value))
+    return tuple(decoded)
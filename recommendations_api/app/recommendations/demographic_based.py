@@ -0,0 +1,236 @@
+import threading
+import time
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import case, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models, schemas
+from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .catalog import movies_by_ids
+from .config import (CARROUSSEL_LENGTH, DEMOGRAPHIC_AGE_BANDS,
+                     DEMOGRAPHIC_POOL_SIZE, DEMOGRAPHIC_REFRESH_SECONDS)
+
+# (age band, sexe); None stands for "any", so (None, None) is every user
+SegmentKey = Tuple[Optional[int], Optional[str]]
+
+
+def age_band(
+    birthday: Optional[date], today: date, bands: Tuple[int, ...] = DEMOGRAPHIC_AGE_BANDS
+) -> Optional[int]:
+    """Returns the index of the age band of a birthday, e.g. 0 for under 18 with the default bands."""
+    if birthday is None:
+        return None
+    age = today.year - birthday.year - ((today.month, today.day) < (birthday.month, birthday.day))
+    return bisect_right(bands, age)
+
+
+def segment_chain(band: Optional[int], sexe: Optional[str]) -> List[SegmentKey]:
+    """Returns the segments to draw from for a user, most specific first."""
+    return list(dict.fromkeys([(band, sexe), (band, None), (None, sexe), (None, None)]))
+
+
+class DemographicIndex:
+    """Most liked movies of each age band and sexe, held in memory.
+
+    Attributes:
+        rankings (Dict[SegmentKey, np.ndarray]): Ranked movie IDs of each segment.
+        movies (Dict[int, schemas.RecommendationSchema]): The ranked movies, ready to serve.
+        user_ids (np.ndarray): Sorted IDs of the users known at build time (int64).
+        user_segments (List[SegmentKey]): The `(age band, sexe)` of each user.
+    """
+
+    def __init__(
+        self,
+        rankings: Dict[SegmentKey, np.ndarray],
+        movies: Dict[int, schemas.RecommendationSchema],
+        user_ids: np.ndarray,
+        user_segments: List[SegmentKey],
+    ):
+        self.rankings = rankings
+        self.movies = movies
+        self.user_ids = user_ids
+        self.user_segments = user_segments
+
+    @classmethod
+    def from_db(cls, db: Session, pool_size: int = DEMOGRAPHIC_POOL_SIZE) -> "DemographicIndex":
+        """Builds the rankings from one grouped aggregation over `MovieUsers` joined to `Users`.
+
+        Movies are ranked by the number of users of the segment who rated them 4 or more,
+        then by their number of raters.
+
+        Args:
+            db (Session): The database session.
+            pool_size (int): Number of movies kept per segment, so seen movies can be skipped.
+
+        Returns:
+            DemographicIndex: The index.
+        """
+        today = date.today()
+        liked = func.sum(case((models.MovieUsers.note >= 4, 1), else_=0))
+        birth_year = func.extract("year", models.Users.birthday)
+        rows = (
+            db.query(birth_year, models.Users.sexe, models.MovieUsers.movie_id, func.count(), liked)
+            .join(models.Users, models.MovieUsers.user_id == models.Users.user_id)
+            .filter(models.MovieUsers.note.isnot(None))
+            .group_by(birth_year, models.Users.sexe, models.MovieUsers.movie_id)
+            .all()
+        )
+
+        # Bands from the birth year only: the aggregation is per year, not per birthday
+        bands = [
+            None if row[0] is None else bisect_right(DEMOGRAPHIC_AGE_BANDS, today.year - int(row[0]))
+            for row in rows
+        ]
+        sexes = [row[1] or None for row in rows]
+        movie_ids = np.array([row[2] for row in rows], dtype=np.int64)
+        raters = np.array([row[3] for row in rows], dtype=np.float64)
+        likes = np.array([row[4] or 0 for row in rows], dtype=np.float64)
+        band_column = np.array([-1 if band is None else band for band in bands], dtype=np.int64)
+        sexe_column = np.array([sexe or "" for sexe in sexes], dtype=object)
+
+        keys = {(band, sexe) for band, sexe in zip(bands, sexes)}
+        keys = {key for band, sexe in keys for key in segment_chain(band, sexe)}
+        rankings: Dict[SegmentKey, np.ndarray] = {}
+        for band, sexe in keys:
+            selected = np.ones(len(rows), dtype=bool)
+            if band is not None:
+                selected &= band_column == band
+            if sexe is not None:
+                selected &= sexe_column == sexe
+            candidates, inverse = np.unique(movie_ids[selected], return_inverse=True)
+            segment_likes = np.bincount(inverse, weights=likes[selected])
+            segment_raters = np.bincount(inverse, weights=raters[selected])
+            order = np.lexsort((-segment_raters, -segment_likes))
+            rankings[(band, sexe)] = candidates[order[:pool_size]]
+
+        ranked = sorted({int(movie_id) for ranking in rankings.values() for movie_id in ranking})
+        movies = {
+            movie.movie_id: schemas.RecommendationSchema.from_orm(movie)
+            for movie in movies_by_ids(db, ranked)
+        }
+
+        users = db.query(models.Users.user_id, models.Users.birthday, models.Users.sexe).order_by(
+            models.Users.user_id
+        ).all()
+        user_ids = np.fromiter((row[0] for row in users), dtype=np.int64, count=len(users))
+        user_segments = [(age_band(row[1], today), row[2] or None) for row in users]
+        return cls(rankings, movies, user_ids, user_segments)
+
+    def segment_of(self, user_id: int) -> Optional[SegmentKey]:
+        """Returns the `(age band, sexe)` of a user known at build time, or None."""
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return self.user_segments[position]
+        return None
+
+    def recommend(
+        self, segment: SegmentKey, seen_movie_ids: Iterable[int], k: int = CARROUSSEL_LENGTH
+    ) -> List[schemas.RecommendationSchema]:
+        """Returns up to k unseen movies, completing a small segment with the broader ones."""
+        seen = set(seen_movie_ids)
+        picked: Dict[int, schemas.RecommendationSchema] = {}
+        for key in segment_chain(*segment):
+            for movie_id in self.rankings.get(key, ()):
+                movie_id = int(movie_id)
+                if movie_id not in seen and movie_id not in picked and movie_id in self.movies:
+                    picked[movie_id] = self.movies[movie_id]
+                    if len(picked) == k:
+                        return list(picked.values())
+        return list(picked.values())
+
+
+_index: Optional[DemographicIndex] = None
+_index_built_at = 0.0
+_index_refreshing = False
+_index_lock = threading.Lock()
+
+
+def _refresh_index(bind: Engine) -> None:
+    global _index, _index_built_at, _index_refreshing
+    try:
+        with sessionmaker(bind=bind)() as session:
+            index = DemographicIndex.from_db(session)
+        with _index_lock:
+            _index, _index_built_at = index, time.monotonic()
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement des classements démographiques : {e}")
+    finally:
+        with _index_lock:
+            _index_refreshing = False
+
+
+def get_demographic_index(db: Session, max_age: float = DEMOGRAPHIC_REFRESH_SECONDS) -> DemographicIndex:
+    """Returns the process-wide index.
+
+    Only the very first call builds it on the request path. Once it is older than
+    `max_age` seconds, it is rebuilt in a background thread with its own session and
+    swapped in when ready, while requests keep being served from the current one.
+    """
+    global _index, _index_built_at, _index_refreshing
+    with _index_lock:
+        if _index is None:
+            _index, _index_built_at = DemographicIndex.from_db(db), time.monotonic()
+        elif time.monotonic() - _index_built_at > max_age and not _index_refreshing:
+            _index_refreshing = True
+            threading.Thread(target=_refresh_index, args=(db.get_bind(),), daemon=True).start()
+        return _index
+
+
+def invalidate_demographic_index() -> None:
+    """Drops the process-wide index so the next `get_demographic_index` call rebuilds it."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+class DemographicRecommendationFetcher(RecommendationFetcher):
+    """Fetches the movies popular with people of the user's age band and sexe."""
+
+    def __init__(self, limit: int = CARROUSSEL_LENGTH):
+        self.limit = limit
+
+    def fetch(
+        self, db: Session, user_id: int, seen_movie_ids: List[int]
+    ) -> Dict[str, List[schemas.RecommendationSchema]]:
+        """
+        Recommends the movies most liked by users of the same age band and sexe.
+
+        The rankings are precomputed in memory by `DemographicIndex`, so serving them
+        does not query the database, except for one primary-key lookup for users who
+        signed up since the last refresh.
+
+        Args:
+            db (Session): The database session object.
+            user_id (int): The ID of the user for whom recommendations are being made.
+            seen_movie_ids (List[int]): The IDs of the movies the user has already seen.
+
+        Returns:
+            Dict[str, List[schemas.RecommendationSchema]]: A dictionary with the `demographic_carousel` key.
+            If no recommendations are found, returns a message indicating no recommendations are available.
+            If an error occurs, returns a message with the error description.
+        """
+        try:
+            index = get_demographic_index(db)
+
+            segment = index.segment_of(user_id)
+            if segment is None:
+                user = db.get(models.Users, user_id)
+                segment = (age_band(user.birthday, date.today()), user.sexe or None) if user else (None, None)
+
+            movies = index.recommend(segment, seen_movie_ids, self.limit)
+
+            if not movies:
+                return {"message": "No recommendations available."}
+
+            return {"demographic_carousel": movies}
+
+        except db_breaker.errors:
+            raise
+        except Exception as e:
+            return {"message": f"An error occurred: {str(e)}"}
@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .catalog import MovieCatalog
+from .config import CAROUSEL_PRIORITY, MMR_LAMBDA
+
+
+def carousel_rank(key: str, priority: Sequence[str] = CAROUSEL_PRIORITY) -> int:
+    """Returns the priority rank of a carousel key, matching on key prefixes.
+
+    Args:
+        key (str): The carousel key, e.g. `genre_Action` or `trending_carousel`.
+        priority (Sequence[str]): Key prefixes, most important first.
+
+    Returns:
+        int: The rank of the first matching prefix, or `len(priority)` if none matches.
+    """
+    for rank, prefix in enumerate(priority):
+        if key.startswith(prefix):
+            return rank
+    return len(priority)
+
+
+def mmr_order(
+    embeddings: np.ndarray, relevance: np.ndarray, lambda_: float = MMR_LAMBDA
+) -> np.ndarray:
+    """Orders items by Maximal Marginal Relevance.
+
+    Each step picks the item maximising
+    `lambda_ * relevance - (1 - lambda_) * max similarity to the items already picked`.
+    The pairwise similarities are computed once as a single matrix product and the
+    running maximum is updated with one vector operation per step.
+
+    Args:
+        embeddings (np.ndarray): Unit vectors of the items, one row per item.
+        relevance (np.ndarray): Relevance of each item, higher is better.
+        lambda_ (float): Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        np.ndarray: The item indices in MMR order.
+    """
+    size = len(relevance)
+    similarity = embeddings @ embeddings.T
+    max_similarity = np.zeros(size, dtype=np.float32)
+    available = np.ones(size, dtype=bool)
+    order = np.empty(size, dtype=np.int64)
+    for step in range(size):
+        scores = lambda_ * relevance - (1.0 - lambda_) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        order[step] = best
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return order
+
+
+def diversify(
+    recommendations: Dict[str, Any],
+    catalog: MovieCatalog,
+    priority: Sequence[str] = CAROUSEL_PRIORITY,
+    lambda_: float = MMR_LAMBDA,
+) -> Dict[str, Any]:
+    """De-duplicates movies across carousels and re-ranks each carousel with MMR.
+
+    Carousels are visited in `priority` order: a movie stays in the first carousel
+    that shows it and is removed from the following ones. The remaining movies of
+    each carousel are then re-ordered by MMR, using their original position as
+    relevance and the catalog embeddings as similarity. Carousels left empty are
+    dropped; entries that are not carousels (e.g. `message`) are kept as-is.
+
+    Args:
+        recommendations (Dict[str, Any]): The carousels, as returned by the fetchers.
+        catalog (MovieCatalog): The in-memory catalog holding the embeddings.
+        priority (Sequence[str]): Carousel key prefixes, most important first.
+        lambda_ (float): MMR trade-off between relevance and diversity.
+
+    Returns:
+        Dict[str, Any]: The de-duplicated and re-ranked carousels, in their original key order.
+    """
+    shown = set()
+    diversified = {}
+    for key in sorted(recommendations, key=lambda key: carousel_rank(key, priority)):
+        movies = recommendations[key]
+        if not isinstance(movies, list):
+            diversified[key] = movies
+            continue
+
+        movies = [movie for movie in movies if movie.movie_id not in shown]
+        shown.update(movie.movie_id for movie in movies)
+        if not movies:
+            continue
+
+        ids = np.array([movie.movie_id for movie in movies], dtype=np.int64)
+        vectors = np.zeros((len(ids), catalog.embeddings.shape[1]), dtype=np.float32)
+        positions = np.searchsorted(catalog.movie_ids, ids)
+        known = positions < len(catalog.movie_ids)
+        known[known] = catalog.movie_ids[positions[known]] == ids[known]
+        vectors[known] = catalog.embeddings[positions[known]]
+
+        relevance = np.linspace(1.0, 0.0, num=len(movies), dtype=np.float32)
+        diversified[key] = [movies[i] for i in mmr_order(vectors, relevance, lambda_)]
+
+    return {key: diversified[key] for key in recommendations if key in diversified}
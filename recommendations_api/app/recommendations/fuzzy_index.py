@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .catalog import top_k
+from .config import (SEARCH_FUZZY_CANDIDATES, SEARCH_FUZZY_MAX_POSTINGS,
+                     SEARCH_FUZZY_MIN_OVERLAP, SEARCH_FUZZY_MIN_SIMILARITY,
+                     SEARCH_FUZZY_MIN_TRIGRAMS, SEARCH_FUZZY_POPULARITY_WEIGHT,
+                     SEARCH_FUZZY_REFRESH_SECONDS)
+from .search_index import (MovieDocument, load_documents, normalize,
+                           popularity_score)
+
+
+def trigrams(text: str) -> Set[str]:
+    """Returns the trigrams of the words of a normalized text, padded like pg_trgm ("  a", " ab", ..., "yz ")."""
+    grams = set()
+    for word in text.split(" "):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(first: str, second: str, bound: Optional[int] = None) -> int:
+    """Levenshtein distance: the number of inserted, deleted or replaced characters.
+
+    With a `bound`, stops as soon as the distance is known to exceed it and returns `bound + 1`.
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    if bound is not None and len(first) - len(second) > bound:
+        return bound + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, start=1):
+        current = [i]
+        for j, other in enumerate(second, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if bound is not None and min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+
+def similarity(query: str, text: str, threshold: float = 0.0) -> float:
+    """Edit similarity between a query and its closest run of as many words in a text, from 0 to 1.
+
+    Comparing to runs of words lets "amelie" fully match "le fabuleux destin d amelie".
+    Runs less similar than `threshold` are abandoned early and count as 0.
+    """
+    words = text.split(" ")
+    size = len(query.split(" "))
+    best = 0.0
+    for start in range(max(1, len(words) - size + 1)):
+        window = " ".join(words[start:start + size])
+        longest = max(len(query), len(window))
+        bound = int((1 - max(best, threshold)) * longest)
+        distance = edit_distance(query, window, bound)
+        if distance <= bound:
+            best = max(best, 1 - distance / longest)
+    return best
+
+
+class FuzzyIndex:
+    """Trigram index of the movie titles and credited names, for misspelled queries.
+
+    Every distinct normalized title or name is an entry, linked to the movies it belongs
+    to. The entries sharing the most trigrams with the query are the candidates; they are
+    re-ranked by edit similarity, and each movie gets the best similarity of its entries
+    plus a small popularity term. Trigrams found in more than `SEARCH_FUZZY_MAX_POSTINGS`
+    entries, like " th", are skipped when rarer ones are available, so a lookup reads a
+    bounded number of postings whatever the size of the catalog.
+
+    Attributes:
+        entries (List[str]): The normalized titles and names.
+        entry_offsets (np.ndarray): The movies of entry `e` are `entry_movies[entry_offsets[e]:entry_offsets[e + 1]]`.
+        entry_movies (np.ndarray): Movie positions of the entries (int32).
+        entry_sizes (np.ndarray): Number of trigrams of each entry (int16).
+        grams (Dict[str, int]): Position of every trigram in `gram_offsets`.
+        gram_offsets (np.ndarray): The entries of trigram `g` are `gram_entries[gram_offsets[g]:gram_offsets[g + 1]]`.
+        gram_entries (np.ndarray): Sorted entries of each trigram (int32).
+        movie_ids (np.ndarray): Movie ID of each movie position (int64).
+        popularity (np.ndarray): `popularity_score` of each movie position (float32).
+    """
+
+    def __init__(self, batches: Iterable[List[MovieDocument]]):
+        entry_ids: Dict[str, int] = {}
+        entry_movies: List[List[int]] = []
+        postings = defaultdict(list)
+        movie_ids, popularity = [], []
+        for documents in batches:
+            for document in documents:
+                position = len(movie_ids)
+                movie_ids.append(document.movie_id)
+                popularity.append(popularity_score(document.vote_average, document.vote_count))
+                for text in [document.title, *document.names]:
+                    key = normalize(text)
+                    if not key:
+                        continue
+                    entry = entry_ids.get(key)
+                    if entry is None:
+                        entry = entry_ids[key] = len(entry_movies)
+                        entry_movies.append([])
+                        for gram in trigrams(key):
+                            postings[gram].append(entry)
+                    if not entry_movies[entry] or entry_movies[entry][-1] != position:
+                        entry_movies[entry].append(position)
+
+        self.entries = list(entry_ids)
+        self.entry_offsets, self.entry_movies = self._csr(entry_movies)
+        self.entry_sizes = np.array([len(trigrams(entry)) for entry in self.entries], dtype=np.int16)
+        self.grams = {gram: position for position, gram in enumerate(postings)}
+        self.gram_offsets, self.gram_entries = self._csr(list(postings.values()))
+        self.movie_ids = np.array(movie_ids, dtype=np.int64)
+        self.popularity = np.array(popularity, dtype=np.float32)
+
+    @staticmethod
+    def _csr(lists: List[List[int]]):
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(values) for values in lists], out=offsets[1:])
+        values = np.fromiter((value for values in lists for value in values), dtype=np.int32, count=offsets[-1])
+        return offsets, values
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def _postings(self, gram: str) -> np.ndarray:
+        position = self.grams[gram]
+        return self.gram_entries[self.gram_offsets[position]:self.gram_offsets[position + 1]]
+
+    def search(self, query: str, candidates: int = SEARCH_FUZZY_CANDIDATES) -> Dict[int, float]:
+        """Returns the score of the movies with a title or credited name close to the query.
+
+        Args:
+            query (str): The text typed by the user, possibly misspelled.
+            candidates (int): Number of entries re-ranked by edit similarity.
+
+        Returns:
+            Dict[int, float]: Score of each matching movie ID, higher is better.
+        """
+        key = normalize(query)
+        lists = sorted((self._postings(gram) for gram in trigrams(key) if gram in self.grams), key=len)
+        used = [
+            entries for rank, entries in enumerate(lists)
+            if rank < SEARCH_FUZZY_MIN_TRIGRAMS or len(entries) <= SEARCH_FUZZY_MAX_POSTINGS
+        ]
+        if not used:
+            return {}
+        entries, shared = np.unique(np.concatenate(used), return_counts=True)
+        # A typo changes at most three trigrams: entries sharing far fewer than the best one are not worth comparing
+        close = shared >= SEARCH_FUZZY_MIN_OVERLAP * shared.max()
+        entries, shared = entries[close], shared[close]
+        # Most shared trigrams first; among equals, the shortest entries
+        overlap = shared - 1e-3 * self.entry_sizes[entries]
+        scores: Dict[int, float] = {}
+        for entry in entries[top_k(overlap, candidates)].tolist():
+            closeness = similarity(key, self.entries[entry], SEARCH_FUZZY_MIN_SIMILARITY)
+            if closeness < SEARCH_FUZZY_MIN_SIMILARITY:
+                continue
+            for movie in self.entry_movies[self.entry_offsets[entry]:self.entry_offsets[entry + 1]].tolist():
+                score = closeness + SEARCH_FUZZY_POPULARITY_WEIGHT * float(self.popularity[movie])
+                movie_id = int(self.movie_ids[movie])
+                scores[movie_id] = max(score, scores.get(movie_id, score))
+        return scores
+
+
+_fuzzy_index: Optional[FuzzyIndex] = None
+_fuzzy_index_loaded_at = 0.0
+_fuzzy_index_refreshing = False
+_fuzzy_index_lock = threading.Lock()
+
+
+def _refresh_fuzzy_index(bind: Engine) -> None:
+    global _fuzzy_index, _fuzzy_index_loaded_at, _fuzzy_index_refreshing
+    try:
+        with sessionmaker(bind=bind)() as session:
+            index = FuzzyIndex(load_documents(session))
+        with _fuzzy_index_lock:
+            _fuzzy_index, _fuzzy_index_loaded_at = index, time.monotonic()
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement de l'index de recherche approximative : {e}")
+    finally:
+        with _fuzzy_index_lock:
+            _fuzzy_index_refreshing = False
+
+
+def get_fuzzy_index(db: Session, max_age: float = SEARCH_FUZZY_REFRESH_SECONDS) -> FuzzyIndex:
+    """Returns the process-wide index.
+
+    Only the very first call builds it on the request path. Once it is older than
+    `max_age` seconds, it is rebuilt in a background thread with its own session and
+    swapped in when ready, while searches keep using the current one.
+    """
+    global _fuzzy_index, _fuzzy_index_loaded_at, _fuzzy_index_refreshing
+    with _fuzzy_index_lock:
+        if _fuzzy_index is None:
+            _fuzzy_index, _fuzzy_index_loaded_at = FuzzyIndex(load_documents(db)), time.monotonic()
+        elif time.monotonic() - _fuzzy_index_loaded_at > max_age and not _fuzzy_index_refreshing:
+            _fuzzy_index_refreshing = True
+            threading.Thread(target=_refresh_fuzzy_index, args=(db.get_bind(),), daemon=True).start()
+        return _fuzzy_index
+
+
+def invalidate_fuzzy_index() -> None:
+    """Drops the process-wide index so the next `get_fuzzy_index` call rebuilds it."""
+    global _fuzzy_index
+    with _fuzzy_index_lock:
+        _fuzzy_index = None
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import models
+from .config import (CATALOG_VERSION_TTL, HTTP_BODY_CACHE_SIZE,
+                     HTTP_CACHE_MAX_AGE)
+
+
+def bump_catalog_version(db: Session, source: str) -> None:
+    """Marks the catalog as changed, for edits that add no rows; the caller commits.
+
+    The time is written to the shared `CatalogUpdates` table, like the datacrawler
+    does, so every API worker sees it within `CATALOG_VERSION_TTL`.
+    """
+    db.merge(models.CatalogUpdates(source=source, updated_at=datetime.utcnow()))
+
+
+def record_movie_updates(db: Session, movie_ids: Iterable[int]) -> None:
+    """Marks movies already ingested as edited, so the search index reads them again; the caller commits."""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    now = datetime.utcnow()
+    db.execute(delete(models.MovieUpdates).where(models.MovieUpdates.movie_id.in_(movie_ids)))
+    db.execute(insert(models.MovieUpdates), [{"movie_id": movie_id, "updated_at": now} for movie_id in movie_ids])
+
+
+class CatalogVersion:
+    """Short fingerprint of the movie catalog, used as the ETag of the catalog endpoints.
+
+    It combines the row counts and highest IDs of the catalog tables with the latest
+    `CatalogUpdates` and `MovieUpdates` times, written by the ingest jobs. It is
+    recomputed at most every `ttl` seconds, so checking it costs no query on most
+    requests.
+
+    The time this worker first saw the current fingerprint is the `Last-Modified` date:
+    it is never earlier than the change itself, so a copy fetched before the change
+    always looks older.
+    """
+
+    def __init__(self, ttl: float = CATALOG_VERSION_TTL):
+        self.ttl = ttl
+        self._version: Optional[str] = None
+        self._computed_at = 0.0
+        self._seen_version: Optional[str] = None
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, db: Session) -> Tuple[str, float]:
+        """Returns the version and the Unix time this worker first saw it."""
+        with self._lock:
+            if self._version is None or time.monotonic() - self._computed_at > self.ttl:
+                self._version = self._compute(db)
+                self._computed_at = time.monotonic()
+                if self._version != self._seen_version:
+                    self._seen_version, self._changed_at = self._version, time.time()
+            return self._version, self._changed_at
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def _compute(self, db: Session) -> str:
+        # Counting Credits or MovieTopCredits would scan millions of rows: the highest credit ID
+        # is read from the index, and every top-credits rebuild bumps `CatalogUpdates`
+        fingerprint = [
+            *db.query(func.count(), func.max(models.Movies.movie_id)).one(),
+            *db.query(func.count(), func.max(models.Genres.genre_id)).one(),
+            db.query(func.max(models.Credits.credit_id)).scalar(),
+            db.query(func.max(models.CatalogUpdates.updated_at)).scalar(),
+            db.query(func.max(models.MovieUpdates.updated_at)).scalar(),
+        ]
+        data = json.dumps(fingerprint, default=str).encode()
+        return hashlib.sha1(data).hexdigest()[:16]
+
+
+class BodyCache:
+    """Bounded in-process store of encoded JSON bodies, keyed by URL and catalog version."""
+
+    def __init__(self, size: int = HTTP_BODY_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: Tuple[str, str], body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_version = CatalogVersion()
+body_cache = BodyCache()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def not_modified_since(if_modified_since: Optional[str], changed_at: float) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have a one-second resolution
+    return since.tzinfo is not None and int(changed_at) <= since.timestamp()
+
+
+def cached_json_response(request: Request, db: Session, build: Callable[[], Any]) -> Response:
+    """Answers a catalog endpoint with an ETag and a Last-Modified derived from the catalog version.
+
+    A matching `If-None-Match`, or without it an `If-Modified-Since` not older than
+    the version, gets an empty 304 without calling `build`. The encoded body of every
+    URL is kept in `body_cache` until the catalog changes.
+
+    Args:
+        request (Request): The request, for its URL and conditional headers.
+        db (Session): The database session, used only when the version must be recomputed.
+        build (Callable[[], Any]): Computes the response content; may raise `HTTPException`.
+
+    Returns:
+        Response: The 200 or 304 response.
+    """
+    version, changed_at = catalog_version.current(db)
+    etag = f'"{version}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(changed_at, usegmt=True),
+        "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    # If-Modified-Since only counts without If-None-Match (RFC 9110, 13.1.3)
+    if etag_matches(if_none_match, etag) or (
+        if_none_match is None and not_modified_since(request.headers.get("if-modified-since"), changed_at)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    key = (str(request.url), version)
+    body = body_cache.get(key)
+    if body is None:
+        body = json.dumps(jsonable_encoder(build()), separators=(",", ":")).encode()
+        body_cache.set(key, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,274 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .cache import get_cache_stats
+from .catalog import MovieCatalog, get_catalog, movies_by_ids, top_k
+from .config import (CARROUSSEL_LENGTH, HYBRID_CANDIDATES,
+                     HYBRID_RESCORE_LIMIT, HYBRID_WEIGHT_GENRE,
+                     HYBRID_WEIGHT_SIMILARITY, SEGMENTS_PATH)
+from .segments import get_user_segments
+
+
+def _base_scores(
+    catalog: MovieCatalog, genre_mask: np.uint64, positions: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Popularity and genre part of the hybrid score; ``-inf`` for unreleased movies."""
+    rows = slice(None) if positions is None else positions
+    preferred = int(np.bitwise_count(genre_mask))
+    if not preferred:
+        return catalog.base_scores[rows].copy()
+    scores = np.bitwise_count(catalog.genre_bits[rows] & genre_mask).astype(np.float32)
+    scores *= np.float32(HYBRID_WEIGHT_GENRE / preferred)
+    scores += catalog.base_scores[rows]
+    return scores
+
+
+def _uses_taste(catalog: MovieCatalog, taste: Optional[np.ndarray]) -> bool:
+    return taste is not None and catalog.embeddings.shape[1] == taste.size
+
+
+def hybrid_scores(
+    catalog: MovieCatalog,
+    taste: Optional[np.ndarray],
+    genre_mask: np.uint64,
+    excluded: Optional[np.ndarray] = None,
+    positions: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Scores the movies of the catalog in one vectorised pass.
+
+    The score is a weighted blend of the cosine similarity to the user's taste vector,
+    the normalised popularity and the share of the user's preferred genres the movie has.
+    Excluded and unreleased movies get ``-inf``.
+
+    Args:
+        catalog (MovieCatalog): The in-memory catalog.
+        taste (Optional[np.ndarray]): The user's unit taste vector, if any.
+        genre_mask (np.uint64): Bitmask of the user's preferred genres.
+        excluded (Optional[np.ndarray]): Catalog positions of movies to leave out (e.g. already seen).
+        positions (Optional[np.ndarray]): Catalog rows to score; the whole catalog if None.
+
+    Returns:
+        np.ndarray: One score per scored row (float32).
+    """
+    scores = _base_scores(catalog, genre_mask, positions)
+    if _uses_taste(catalog, taste):
+        rows = slice(None) if positions is None else positions
+        similarity = catalog.embeddings[rows] @ taste.astype(np.float32)
+        scores += np.float32(HYBRID_WEIGHT_SIMILARITY) * np.maximum(similarity, 0.0)
+    if excluded is not None and len(excluded):
+        scores[excluded if positions is None else np.isin(positions, excluded)] = -np.inf
+    return scores
+
+
+def _best_bounds(bound: np.ndarray, count: int) -> np.ndarray:
+    """Returns about `count` positions with the best bounds, falling back on an exact top-k.
+
+    The cut-off is read from a strided sample, which is cheaper than partitioning the
+    whole catalog: any movies would do, the best ones only give a tighter threshold.
+    """
+    sample = bound[:: max(1, len(bound) // (8 * count))]
+    rank = len(sample) * count // len(bound)
+    if 0 < rank < len(sample):
+        cut = np.partition(sample, len(sample) - rank)[len(sample) - rank]
+        if np.isfinite(cut):
+            positions = np.flatnonzero(bound >= cut)
+            if len(positions) >= count:
+                return positions
+    return top_k(bound, count)
+
+
+def hybrid_top_k(
+    catalog: MovieCatalog,
+    taste: Optional[np.ndarray],
+    genre_mask: np.uint64,
+    k: int,
+    excluded: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Returns the catalog positions of the k best `hybrid_scores`, best first.
+
+    Same result as ``top_k(hybrid_scores(...), k)`` without reading every embedding.
+    The similarity is bounded from the projected embeddings of the catalog (see
+    `catalog._project`): the `HYBRID_CANDIDATES` best bounds are scored exactly, which
+    gives the score to beat, then only the movies whose bound reaches it are scored. If
+    the bound is too loose to leave fewer than `HYBRID_RESCORE_LIMIT` of them, the whole
+    catalog is scored.
+
+    Args:
+        catalog (MovieCatalog): The in-memory catalog.
+        taste (Optional[np.ndarray]): The user's unit taste vector, if any.
+        genre_mask (np.uint64): Bitmask of the user's preferred genres.
+        k (int): Number of movies to return.
+        excluded (Optional[np.ndarray]): Catalog positions of movies to leave out.
+
+    Returns:
+        np.ndarray: The positions of the best movies (int64).
+    """
+    base = _base_scores(catalog, genre_mask)
+    if excluded is not None and len(excluded):
+        base[excluded] = -np.inf
+    if not _uses_taste(catalog, taste):
+        return top_k(base, k)
+
+    taste = taste.astype(np.float32)
+    reduced = catalog.projection.T @ taste
+    outside = np.float32(np.linalg.norm(taste - catalog.projection @ reduced))
+    weight = np.float32(HYBRID_WEIGHT_SIMILARITY)
+
+    # The weight is applied to the small vectors rather than to the catalog-sized bound
+    bound = (weight * reduced) @ catalog.projected
+    bound += (weight * outside) * catalog.residuals
+    np.maximum(bound, 0.0, out=bound)
+    bound += base
+
+    def exact(positions: np.ndarray) -> np.ndarray:
+        similarity = catalog.embeddings[positions] @ taste
+        return base[positions] + weight * np.maximum(similarity, 0.0)
+
+    candidates = _best_bounds(bound, max(HYBRID_CANDIDATES, k))
+    scores = exact(candidates)
+    threshold = np.sort(scores)[-k] if len(scores) >= k else -np.inf
+    if not np.isfinite(threshold):
+        return candidates[top_k(scores, k)]
+
+    # The margin absorbs the float32 rounding of the bound
+    positions = np.flatnonzero(bound >= threshold - 1e-4)
+    if len(positions) > HYBRID_RESCORE_LIMIT:
+        similarity = catalog.embeddings @ taste
+        np.maximum(similarity, 0.0, out=similarity)
+        similarity *= weight
+        similarity += base
+        return top_k(similarity, k)
+    return positions[top_k(exact(positions), k)]
+
+
+def _first_unseen(order: np.ndarray, seen: np.ndarray, limit: int) -> np.ndarray:
+    """Returns the `limit` first positions of `order` that are not in `seen`."""
+    head = order[:limit + len(seen)]
+    return head[~np.isin(head, seen)][:limit]
+
+
+class HybridRecommendationFetcher(RecommendationFetcher):
+    """Fetches the hybrid, per-genre and trending carousels in one pass over the catalog."""
+
+    def __init__(self, segments_path: str = SEGMENTS_PATH, limit: int = CARROUSSEL_LENGTH):
+        self.segments_path = segments_path
+        self.limit = limit
+        self.segment_stats = get_cache_stats("segments")
+
+    def fetch(
+        self,
+        db: Session,
+        user_id: int,
+        seen_movie_ids: List[int],
+        loved_movie_ids: Optional[List[int]] = None,
+    ) -> Dict[str, List[schemas.RecommendationSchema]]:
+        """
+        Recommends movies with a single scoring pass over the in-memory catalog.
+
+        The user's taste vector is the mean embedding of the movies they rated 4 or more,
+        and the genre affinity comes from their `UserGenre` picks. Both are combined with
+        the popularity using the `HYBRID_WEIGHT_*` constants from `config.py`.
+
+        When the segments job (`python -m recommendations.segments`) has run, only the
+        candidate pool of the user's segment is re-ranked. The whole catalog is searched
+        with `hybrid_top_k` when there are no segments or when the pool runs short once
+        seen movies are removed.
+
+        The same pass reads the `genre_<name>` carousels of the user's genres (released
+        movies by popularity) and the `trending_carousel` (latest releases first) from
+        orders precomputed with the catalog, and all the carousels are loaded with one query.
+
+        Args:
+            db (Session): The database session object.
+            user_id (int): The ID of the user for whom recommendations are being made.
+            seen_movie_ids (List[int]): The IDs of the movies the user has already seen.
+            loved_movie_ids (Optional[List[int]]): The movies the user rated 4 or more,
+                queried if not given.
+
+        Returns:
+            Dict[str, List[schemas.RecommendationSchema]]: The `hybrid_carousel`, `genre_<name>`
+            and `trending_carousel` keys.
+            If no recommendations are found, returns a message indicating no recommendations are available.
+            If an error occurs, returns a message with the error description.
+        """
+        try:
+            catalog = get_catalog(db)
+
+            if loved_movie_ids is None:
+                loved_movie_ids = [
+                    row[0]
+                    for row in db.query(models.MovieUsers.movie_id)
+                    .filter(models.MovieUsers.user_id == user_id, models.MovieUsers.note >= 4)
+                    .all()
+                ]
+            genres = (
+                db.query(models.UserGenre.genre_id, models.Genres.name)
+                .join(models.Genres, models.Genres.genre_id == models.UserGenre.genre_id)
+                .filter(models.UserGenre.user_id == user_id)
+                .all()
+            )
+            genre_ids = [genre_id for genre_id, _ in genres]
+
+            taste = catalog.taste_vector(loved_movie_ids)
+            genre_mask = catalog.genre_mask(genre_ids)
+            seen = catalog.positions(seen_movie_ids)
+
+            best = self._rank_segment_pool(catalog, user_id, taste, genre_ids, genre_mask, seen)
+            if best is None:
+                best = hybrid_top_k(catalog, taste, genre_mask, self.limit, seen)
+            carousels = {"hybrid_carousel": best}
+            for genre_id, name in genres:
+                carousels[f"genre_{name}"] = _first_unseen(catalog.genre_order(genre_id), seen, self.limit)
+            carousels["trending_carousel"] = _first_unseen(catalog.trending_order, seen, self.limit)
+
+            carousel_ids = {key: catalog.movie_ids[positions].tolist() for key, positions in carousels.items()}
+            movies = {
+                movie.movie_id: movie
+                for movie in movies_by_ids(db, sorted(set().union(*carousel_ids.values())))
+            }
+            recommendations = {}
+            for key, movie_ids in carousel_ids.items():
+                carousel = [
+                    schemas.RecommendationSchema.from_orm(movies[movie_id])
+                    for movie_id in movie_ids
+                    if movie_id in movies
+                ]
+                if carousel:
+                    recommendations[key] = carousel
+
+            if not recommendations:
+                return {"message": "No recommendations available."}
+            return recommendations
+
+        except db_breaker.errors:
+            raise
+        except Exception as e:
+            return {"message": f"An error occurred: {str(e)}"}
+
+    def _rank_segment_pool(
+        self,
+        catalog: MovieCatalog,
+        user_id: int,
+        taste: Optional[np.ndarray],
+        genre_ids: List[int],
+        genre_mask: np.uint64,
+        seen: np.ndarray,
+    ) -> Optional[np.ndarray]:
+        """Returns the best catalog positions of the user's segment pool, or None to search the catalog."""
+        segments = get_user_segments(self.segments_path)
+        segment = segments.segment_of(user_id, taste, genre_ids) if segments is not None else None
+        if segment is None:
+            return None
+        positions = catalog.positions(segments.pool(segment))
+        scores = hybrid_scores(catalog, taste, genre_mask, seen, positions)
+        best = positions[top_k(scores, self.limit)]
+        if len(best) < self.limit and len(positions) < len(catalog):
+            self.segment_stats.miss()
+            return None
+        self.segment_stats.hit()
+        return best
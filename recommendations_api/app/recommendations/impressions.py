@@ -0,0 +1,160 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .breaker import redis_breaker
+from .config import (CARROUSSEL_LENGTH, IMPRESSION_BLOOM_BITS,
+                     IMPRESSION_HASHES, IMPRESSION_WINDOW)
+
+IMPRESSION_KEY_PREFIX = "recommendations:impressions"
+
+# Odd 64-bit constants of the double hashing h1 + i * h2
+_HASH_1 = np.uint64(0x9E3779B97F4A7C15)
+_HASH_2 = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def impression_key(user_id: int, generation: int) -> str:
+    return f"{IMPRESSION_KEY_PREFIX}:{user_id}:{generation}"
+
+
+def bloom_offsets(
+    movie_ids: Iterable[int], bits: int = IMPRESSION_BLOOM_BITS, hashes: int = IMPRESSION_HASHES
+) -> np.ndarray:
+    """Returns the `hashes` bit offsets of each movie in a Bloom filter of `bits` bits.
+
+    Args:
+        movie_ids (Iterable[int]): The movies.
+        bits (int): Size of the filter in bits.
+        hashes (int): Number of bits set per movie.
+
+    Returns:
+        np.ndarray: One row of offsets per movie (int64).
+    """
+    ids = np.fromiter(movie_ids, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        first = (ids * _HASH_1) >> np.uint64(17)
+        second = ((ids * _HASH_2) >> np.uint64(17)) | np.uint64(1)
+        offsets = first[:, None] + np.arange(hashes, dtype=np.uint64) * second[:, None]
+    return (offsets % np.uint64(bits)).astype(np.int64)
+
+
+def _generation(now: Optional[float], window: int) -> int:
+    return int((time.time() if now is None else now) // window)
+
+
+def _movie_id(movie: Any) -> int:
+    return movie["movie_id"] if isinstance(movie, dict) else movie.movie_id
+
+
+class ImpressionFilter:
+    """The movies recently shown to a user, as Bloom filters held in Redis.
+
+    Impressions are recorded in the filter of the current time window; lookups also
+    check the previous window, so a movie counts as recently shown for one to two
+    windows. Each filter is a fixed-size Redis string expiring after two windows,
+    so memory per user is bounded whatever the number of visits, and a lookup costs
+    `IMPRESSION_HASHES` bit tests.
+
+    Attributes:
+        user_id (int): The user.
+        generation (int): The current time window.
+        bitmaps (List[np.ndarray]): The bits of the current then previous filters.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        generation: int,
+        bitmaps: List[np.ndarray],
+        bits: int = IMPRESSION_BLOOM_BITS,
+        hashes: int = IMPRESSION_HASHES,
+    ):
+        self.user_id = user_id
+        self.generation = generation
+        self.bitmaps = bitmaps
+        self.bits = bits
+        self.hashes = hashes
+
+    @classmethod
+    def load(
+        cls, redis_client, user_id: int, now: Optional[float] = None, window: int = IMPRESSION_WINDOW
+    ) -> "ImpressionFilter":
+        """Reads the current and previous filters of a user in one round trip."""
+        generation = _generation(now, window)
+        bitmaps = []
+        if not redis_client:
+            return cls(user_id, generation, bitmaps)
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.get(impression_key(user_id, generation))
+            pipeline.get(impression_key(user_id, generation - 1))
+            for data in pipeline.execute():
+                # SETBIT numbers bits from the most significant bit of the first byte
+                stored = np.unpackbits(np.frombuffer(data or b"", dtype=np.uint8))[:IMPRESSION_BLOOM_BITS]
+                bitmap = np.zeros(IMPRESSION_BLOOM_BITS, dtype=np.uint8)
+                bitmap[:len(stored)] = stored
+                bitmaps.append(bitmap)
+        except Exception as e:
+            redis_breaker.observe(e)
+            print(f"Erreur lors de la lecture des impressions dans Redis : {e}")
+            bitmaps = []
+        return cls(user_id, generation, bitmaps)
+
+    def contains(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Returns whether each movie was shown recently; rare false positives, never false negatives."""
+        offsets = bloom_offsets(movie_ids, self.bits, self.hashes)
+        shown = np.zeros(len(offsets), dtype=bool)
+        for bitmap in self.bitmaps:
+            shown |= bitmap[offsets].all(axis=1)
+        return shown
+
+    def record(self, redis_client, movie_ids: Iterable[int], window: int = IMPRESSION_WINDOW) -> None:
+        """Adds movies to the filter of the current window, setting only the bits not set yet."""
+        offsets = np.unique(bloom_offsets(movie_ids, self.bits, self.hashes))
+        if self.bitmaps:
+            offsets = offsets[self.bitmaps[0][offsets] == 0]
+        key = impression_key(self.user_id, self.generation)
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for offset in offsets.tolist():
+                pipeline.setbit(key, offset, 1)
+            pipeline.expire(key, 2 * window)
+            pipeline.execute()
+        except Exception as e:
+            redis_breaker.observe(e)
+            print(f"Erreur lors de l'enregistrement des impressions dans Redis : {e}")
+            return
+        if self.bitmaps:
+            self.bitmaps[0][offsets] = 1
+
+
+def downrank_shown(
+    recommendations: Dict[str, Any], impressions: Optional[ImpressionFilter], length: int = CARROUSSEL_LENGTH
+) -> Dict[str, Any]:
+    """Moves the recently shown movies of every carousel after the fresh ones, then keeps `length` movies.
+
+    Fetchers can return more than `length` candidates so fresh movies replace the shown ones.
+    """
+    ranked = {}
+    for key, value in recommendations.items():
+        if isinstance(value, list) and impressions is not None and value:
+            shown = impressions.contains(_movie_id(movie) for movie in value)
+            value = [movie for movie, was_shown in zip(value, shown) if not was_shown] + [
+                movie for movie, was_shown in zip(value, shown) if was_shown
+            ]
+        ranked[key] = value[:length] if isinstance(value, list) else value
+    return ranked
+
+
+def record_impressions(
+    redis_client, impressions: Optional[ImpressionFilter], recommendations: Dict[str, Any]
+) -> None:
+    """Records every movie of the response as shown."""
+    if not redis_client or impressions is None:
+        return
+    movie_ids = {
+        _movie_id(movie) for value in recommendations.values() if isinstance(value, list) for movie in value
+    }
+    if movie_ids:
+        impressions.record(redis_client, movie_ids)
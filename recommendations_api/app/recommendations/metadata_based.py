@@ -0,0 +1,217 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models, schemas
+from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .catalog import movies_by_ids, top_k
+from .config import (CARROUSSEL_LENGTH, CATALOG_REFRESH_SECONDS,
+                     METADATA_CREW_JOBS, METADATA_TOP_CAST)
+
+
+class MetadataIndex:
+    """Sparse TF-IDF vectors of the movies built from their credits and genres.
+
+    Each movie is described by binary features such as `genre:28`, `cast:500` or
+    `Director:138`, weighted by their inverse document frequency, so that sharing a
+    rare director weighs more than sharing the "Drama" genre. Rows are L2-normalised,
+    so a sparse dot product is a cosine similarity.
+
+    Attributes:
+        movie_ids (np.ndarray): Sorted movie IDs (int64).
+        matrix (sparse.csr_matrix): One normalised TF-IDF row per movie.
+        features (List[str]): The feature name of each column.
+    """
+
+    def __init__(self, movie_ids: np.ndarray, matrix: sparse.csr_matrix, features: List[str]):
+        self.movie_ids = movie_ids
+        self.matrix = matrix
+        self.features = features
+        # features x movies, so one movie row times it only touches the postings of its features
+        self.postings = matrix.T.tocsr()
+
+    @classmethod
+    def build(cls, pairs: List[Tuple[int, str]]) -> "MetadataIndex":
+        """Builds the index from `(movie_id, feature)` pairs.
+
+        Args:
+            pairs (List[Tuple[int, str]]): The features of each movie; duplicates are ignored.
+
+        Returns:
+            MetadataIndex: The index.
+        """
+        pairs = sorted(set(pairs))
+        movie_ids = np.unique(np.array([movie_id for movie_id, _ in pairs], dtype=np.int64))
+        features = sorted({feature for _, feature in pairs})
+        feature_index = {feature: column for column, feature in enumerate(features)}
+
+        rows = np.searchsorted(movie_ids, np.array([movie_id for movie_id, _ in pairs], dtype=np.int64))
+        columns = np.array([feature_index[feature] for _, feature in pairs], dtype=np.int64)
+        document_frequency = np.bincount(columns, minlength=len(features))
+        idf = np.log((1.0 + len(movie_ids)) / (1.0 + document_frequency)) + 1.0
+
+        matrix = sparse.csr_matrix(
+            (idf[columns].astype(np.float32), (rows, columns)),
+            shape=(len(movie_ids), len(features)),
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        matrix = sparse.diags(inverse_norms.astype(np.float32)) @ matrix
+        return cls(movie_ids, matrix.tocsr(), features)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "MetadataIndex":
+        """Loads the genres, the crew of `METADATA_CREW_JOBS` and the top-billed cast."""
+        credits = (
+            db.query(models.Credits.id_movie, models.Credits.id_people, models.Jobs.title)
+            .join(models.Jobs, models.Credits.id_job == models.Jobs.job_id)
+            .filter(
+                or_(
+                    models.Jobs.title.in_(METADATA_CREW_JOBS),
+                    and_(
+                        models.Jobs.title == "Acting",
+                        models.Credits.cast_order < METADATA_TOP_CAST,
+                    ),
+                )
+            )
+            .all()
+        )
+        genres = db.query(models.MovieGenres.movie_id, models.MovieGenres.genre_id).all()
+
+        pairs = [
+            (movie_id, f"cast:{people_id}" if job == "Acting" else f"{job}:{people_id}")
+            for movie_id, people_id, job in credits
+        ]
+        pairs += [(movie_id, f"genre:{genre_id}") for movie_id, genre_id in genres]
+        return cls.build(pairs)
+
+    def similarities(self, movie_id: int) -> Optional[np.ndarray]:
+        """Returns the cosine similarity of every movie to `movie_id`, or None if it is unknown."""
+        position = np.searchsorted(self.movie_ids, movie_id)
+        if position >= len(self.movie_ids) or self.movie_ids[position] != movie_id:
+            return None
+        scores = (self.matrix[position] @ self.postings).toarray().ravel()
+        scores[position] = -np.inf
+        return scores
+
+    def similar(
+        self,
+        movie_id: int,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+        excluded: Optional[np.ndarray] = None,
+    ) -> List[int]:
+        """Returns the IDs of the k most similar movies sharing at least one feature.
+
+        Args:
+            movie_id (int): The target movie.
+            k (int): Number of movies to return.
+            allowed (Optional[np.ndarray]): Candidate movie IDs; all movies if None.
+            excluded (Optional[np.ndarray]): Movie IDs never returned, such as the seen ones.
+
+        Returns:
+            List[int]: The similar movie IDs, most similar first.
+        """
+        scores = self.similarities(movie_id)
+        if scores is None:
+            return []
+        scores[scores <= 0] = -np.inf
+        if allowed is not None:
+            scores[~np.isin(self.movie_ids, allowed)] = -np.inf
+        if excluded is not None:
+            scores[np.isin(self.movie_ids, excluded)] = -np.inf
+        return self.movie_ids[top_k(scores, k)].tolist()
+
+
+_index: Optional[MetadataIndex] = None
+_index_loaded_at = 0.0
+_index_refreshing = False
+_index_lock = threading.Lock()
+
+
+def _refresh_metadata_index(bind: Engine) -> None:
+    global _index, _index_loaded_at, _index_refreshing
+    try:
+        with sessionmaker(bind=bind)() as session:
+            index = MetadataIndex.from_db(session)
+        with _index_lock:
+            _index, _index_loaded_at = index, time.monotonic()
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement de l'index des métadonnées : {e}")
+    finally:
+        with _index_lock:
+            _index_refreshing = False
+
+
+def get_metadata_index(db: Session, max_age: float = CATALOG_REFRESH_SECONDS) -> MetadataIndex:
+    """Returns the process-wide metadata index.
+
+    Only the very first call scans `Credits` on the request path. Once the index is older
+    than `max_age` seconds, it is rebuilt in a background thread with its own session and
+    swapped in when ready, while requests keep using the current one.
+    """
+    global _index, _index_loaded_at, _index_refreshing
+    with _index_lock:
+        if _index is None:
+            _index, _index_loaded_at = MetadataIndex.from_db(db), time.monotonic()
+        elif time.monotonic() - _index_loaded_at > max_age and not _index_refreshing:
+            _index_refreshing = True
+            threading.Thread(target=_refresh_metadata_index, args=(db.get_bind(),), daemon=True).start()
+        return _index
+
+
+def invalidate_metadata_index() -> None:
+    """Drops the process-wide index so the next `get_metadata_index` call rebuilds it."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+class MetadataRecommendationFetcher(RecommendationFetcher):
+    """Fetches movies sharing cast, crew and genres with a target movie."""
+
+    def fetch(self, id_movie: int, db: Session, seen_movie_ids: List) -> Dict[str, List[dict]]:
+        """
+        Fetches movie recommendations from credits and genres, without embeddings.
+
+        Args:
+            id_movie (int): The ID of the target movie.
+            db (Session): The database session.
+            seen_movie_ids (List): A list of movie IDs that the user has already seen.
+
+        Returns:
+            Dict[str, List[dict]]: A dictionary containing the movie recommendations. The key is
+            `movie_` followed by the title of the target movie.
+            If no recommendations are found, returns a message indicating no recommendations are available.
+            If an error occurs, returns a message with the error description.
+        """
+        try:
+            target_movie = db.query(models.Movies.title).filter(models.Movies.movie_id == id_movie).first()
+            if not target_movie:
+                return {"message": "Target movie not found."}
+
+            similar_ids = get_metadata_index(db).similar(
+                id_movie, CARROUSSEL_LENGTH, excluded=np.fromiter(seen_movie_ids, dtype=np.int64)
+            )
+            movies = movies_by_ids(db, similar_ids)
+
+            if not movies:
+                return {"message": "No recommendations available."}
+
+            return {
+                f"movie_{target_movie.title}": [
+                    schemas.RecommendationSchema.from_orm(movie) for movie in movies
+                ]
+            }
+
+        except db_breaker.errors:
+            raise
+        except Exception as e:
+            return {"message": f"An error occurred: {str(e)}"}
@@ -1,7 +1,7 @@
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 
-from sqlalchemy import Date, Float, ForeignKey, Integer, String, BLOB
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Integer, String, BLOB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -129,4 +129,58 @@ class UserGenre(Base):
         ForeignKey("Users.user_id"), primary_key=True)
 
     user: Mapped["Users"] = relationship("Users",overlaps="genres")
-    genre: Mapped["Genres"] = relationship("Genres",overlaps="usergenres")
\ No newline at end of file
+    genre: Mapped["Genres"] = relationship("Genres",overlaps="usergenres")
+
+
+class MovieNeighbors(Base):
+    __tablename__ = "MovieNeighbors"
+    movie_id: Mapped[int] = mapped_column(
+        ForeignKey("Movies.movie_id"), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    neighbor_id: Mapped[int] = mapped_column(ForeignKey("Movies.movie_id"))
+    score: Mapped[float] = mapped_column(Float)
+
+    neighbor: Mapped["Movies"] = relationship("Movies", foreign_keys=[neighbor_id])
+
+
+class MovieTopCredits(Base):
+    """Top 10 actors and important crew of each movie, with the people and job inlined.
+
+    Rebuilt at ingest time so the movie details read them with one query on the
+    primary key, whatever the size of the crew.
+    """
+    __tablename__ = "MovieTopCredits"
+    movie_id: Mapped[int] = mapped_column(
+        ForeignKey("Movies.movie_id"), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    credit_id: Mapped[int] = mapped_column(Integer)
+    people_id: Mapped[int] = mapped_column(Integer)
+    people_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    people_photo: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    job_id: Mapped[int] = mapped_column(Integer)
+    job_title: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    character_name: Mapped[Optional[str]] = mapped_column(
+        String(255), nullable=True)
+    cast_order: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class CatalogUpdates(Base):
+    """Time of the last catalog edit made by each ingest job, shared by every service.
+
+    Edits that add no rows (e.g. rebuilding `MovieTopCredits`) would not change the
+    ETags of the recommendations API, which read this table too.
+    """
+    __tablename__ = "CatalogUpdates"
+    source: Mapped[str] = mapped_column(String(64), primary_key=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class MovieUpdates(Base):
+    """Time of the last edit of each movie already ingested, shared by every service.
+
+    New movies are found by their ID; the search index of the recommendations API
+    reads this table to re-index the movies edited or deleted since its last refresh.
+    """
+    __tablename__ = "MovieUpdates"
+    movie_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, index=True)
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 
 from . import models
 from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .metadata_based import MetadataRecommendationFetcher
 from . import schemas
 from .config import CARROUSSEL_LENGTH
 import numpy as np
@@ -13,14 +15,14 @@ from sqlalchemy.exc import NoResultFound
 class MovieBasedRecommendationFetcher(RecommendationFetcher):
     """Fetches recommendations based on movies similar to those the user likes."""
 
-    def fetch(self, id_movie: int, db: Session, not_seen_movie_ids: List) -> Dict[str, List[dict]]:
+    def fetch(self, id_movie: int, db: Session, seen_movie_ids: List) -> Dict[str, List[dict]]:
             """
             Fetches movie recommendations based on a target movie.
 
             Args:
                 id_movie (int): The ID of the target movie.
                 db (Session): The database session.
-                not_seen_movie_ids (List): A list of movie IDs that the user has not seen.
+                seen_movie_ids (List): A list of movie IDs that the user has already seen.
 
             Returns:
                 Dict[str, List[dict]]: A dictionary containing the movie recommendations. The keys are the title of the target movie and the values are lists of recommended movies.
@@ -30,14 +32,35 @@ class MovieBasedRecommendationFetcher(RecommendationFetcher):
                 Exception: If any other error occurs during the recommendation process.
             """
             try:
+                seen = set(seen_movie_ids)
                 target_movie = db.query(models.Movies).filter(models.Movies.movie_id == id_movie).first()
-                if not target_movie or not target_movie.embeddings:
-                    return {"message": "Target movie not found or without embeddings."}
+
+                # Use the offline neighbour graph when it has been built for this movie;
+                # its NEIGHBORS_K rows are read whole and the seen movies dropped here
+                if target_movie:
+                    neighbors = db.query(models.Movies).join(
+                        models.MovieNeighbors, models.MovieNeighbors.neighbor_id == models.Movies.movie_id
+                    ).filter(
+                        models.MovieNeighbors.movie_id == id_movie
+                    ).order_by(models.MovieNeighbors.rank).all()
+                    neighbors = [movie for movie in neighbors if movie.movie_id not in seen][:CARROUSSEL_LENGTH]
+                    if neighbors:
+                        return {
+                            f'movie_{target_movie.title}': [
+                                schemas.RecommendationSchema.from_orm(movie) for movie in neighbors
+                            ]
+                        }
+
+                if not target_movie:
+                    return {"message": "Target movie not found."}
+                if not target_movie.embeddings:
+                    # Fall back on credits and genres when the movie has not been encoded
+                    return MetadataRecommendationFetcher().fetch(id_movie, db, seen_movie_ids)
                 target_movie_embedding = pickle.loads(target_movie.embeddings)
 
                 movie_distances = []
-                for movie in db.query(models.Movies).filter(models.Movies.movie_id.in_(not_seen_movie_ids)).all():
-                    if movie.embeddings:
+                for movie in db.query(models.Movies).filter(models.Movies.movie_id != id_movie).all():
+                    if movie.embeddings and movie.movie_id not in seen:
                         embedding = pickle.loads(movie.embeddings)
                         dist = self.distance_euclidean(target_movie_embedding, embedding)
                         movie_distances.append((movie, dist))
@@ -57,6 +80,8 @@ class MovieBasedRecommendationFetcher(RecommendationFetcher):
 
             except NoResultFound:
                 return {"message": "User not found."}
+            except db_breaker.errors:
+                raise
             except Exception as e:
                 return {"message": f"An error occurred: {str(e)}"}
 
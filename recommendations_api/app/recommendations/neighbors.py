@@ -0,0 +1,156 @@
+import os
+from multiprocessing import Pool
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalog import MovieCatalog
+from .config import NEIGHBORS_BLOCK_SIZE, NEIGHBORS_DIR, NEIGHBORS_K
+
+_worker_embeddings: Optional[np.ndarray] = None
+
+
+def _init_worker(embeddings_path: str) -> None:
+    """Maps the shared embedding matrix once per worker process."""
+    global _worker_embeddings
+    _worker_embeddings = np.load(embeddings_path, mmap_mode="r")
+
+
+def _block_neighbors(task: Tuple[int, int, int]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Computes the top-k neighbours of the rows `start:stop` with one matrix product."""
+    start, stop, k = task
+    embeddings = _worker_embeddings
+    similarity = np.asarray(embeddings[start:stop]) @ np.asarray(embeddings).T
+    rows = np.arange(stop - start)
+    similarity[rows, start + rows] = -np.inf
+    best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(similarity, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return (
+        start,
+        np.take_along_axis(best, order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+class MovieNeighborGraph:
+    """Top-k most similar movies of every movie having an embedding.
+
+    Attributes:
+        movie_ids (np.ndarray): Sorted movie IDs (int64).
+        neighbors (np.ndarray): Neighbour movie IDs, one row per movie (int32).
+        scores (np.ndarray): Cosine similarity of each neighbour (float16).
+    """
+
+    def __init__(self, movie_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        self.movie_ids = movie_ids
+        self.neighbors = neighbors
+        self.scores = scores
+
+    @classmethod
+    def build(
+        cls,
+        catalog: MovieCatalog,
+        k: int = NEIGHBORS_K,
+        block_size: int = NEIGHBORS_BLOCK_SIZE,
+        processes: int = 1,
+        work_dir: str = NEIGHBORS_DIR,
+    ) -> "MovieNeighborGraph":
+        """Computes the graph with blocked matrix products.
+
+        The normalised embeddings are written once to `work_dir` and memory-mapped
+        by every worker, so `processes` workers share a single copy of the matrix.
+        Each task multiplies `block_size` rows by the whole matrix and keeps the
+        top-k of each row.
+
+        Args:
+            catalog (MovieCatalog): The catalog holding the embeddings.
+            k (int): Number of neighbours per movie.
+            block_size (int): Number of rows per matrix product.
+            processes (int): Number of worker processes.
+            work_dir (str): Directory receiving the shared embedding matrix.
+
+        Returns:
+            MovieNeighborGraph: The neighbour graph.
+        """
+        movie_ids = catalog.movie_ids[catalog.has_embedding]
+        k = min(k, len(movie_ids) - 1)
+        if k <= 0:
+            empty = np.empty((len(movie_ids), 0))
+            return cls(movie_ids, empty.astype(np.int32), empty.astype(np.float16))
+
+        os.makedirs(work_dir, exist_ok=True)
+        embeddings_path = os.path.join(work_dir, "embeddings.npy")
+        np.save(embeddings_path, catalog.embeddings[catalog.has_embedding])
+
+        neighbors = np.empty((len(movie_ids), k), dtype=np.int32)
+        scores = np.empty((len(movie_ids), k), dtype=np.float16)
+        tasks = [
+            (start, min(start + block_size, len(movie_ids)), k)
+            for start in range(0, len(movie_ids), block_size)
+        ]
+        if processes > 1:
+            with Pool(processes, initializer=_init_worker, initargs=(embeddings_path,)) as pool:
+                results = pool.imap_unordered(_block_neighbors, tasks)
+                for start, block_neighbors, block_scores in results:
+                    neighbors[start:start + len(block_neighbors)] = movie_ids[block_neighbors]
+                    scores[start:start + len(block_scores)] = block_scores
+        else:
+            _init_worker(embeddings_path)
+            for start, block_neighbors, block_scores in map(_block_neighbors, tasks):
+                neighbors[start:start + len(block_neighbors)] = movie_ids[block_neighbors]
+                scores[start:start + len(block_scores)] = block_scores
+        os.remove(embeddings_path)
+
+        return cls(movie_ids, neighbors, scores)
+
+    def save(self, directory: str = NEIGHBORS_DIR) -> None:
+        """Writes the graph as three `.npy` files that `load` can memory-map."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "movie_ids.npy"), self.movie_ids)
+        np.save(os.path.join(directory, "neighbors.npy"), self.neighbors)
+        np.save(os.path.join(directory, "scores.npy"), self.scores)
+
+    @classmethod
+    def load(cls, directory: str = NEIGHBORS_DIR) -> "MovieNeighborGraph":
+        """Memory-maps a graph written by `save`."""
+        return cls(
+            *(
+                np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in ("movie_ids", "neighbors", "scores")
+            )
+        )
+
+    def write_table(self, db: Session, batch_size: int = 10_000) -> None:
+        """Replaces the content of the `MovieNeighbors` table with the graph."""
+        db.execute(delete(models.MovieNeighbors))
+        rows = []
+        for position, movie_id in enumerate(self.movie_ids.tolist()):
+            for rank, (neighbor_id, score) in enumerate(
+                zip(self.neighbors[position].tolist(), self.scores[position].tolist())
+            ):
+                rows.append(
+                    {"movie_id": movie_id, "rank": rank, "neighbor_id": neighbor_id, "score": score}
+                )
+            if len(rows) >= batch_size:
+                db.execute(insert(models.MovieNeighbors), rows)
+                rows = []
+        if rows:
+            db.execute(insert(models.MovieNeighbors), rows)
+        db.commit()
+
+
+# Construire le graphe hors-ligne : python -m recommendations.neighbors
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        graph = MovieNeighborGraph.build(
+            MovieCatalog.from_db(session), processes=os.cpu_count() or 1
+        )
+        graph.save()
+        graph.write_table(session)
+    print(f"Voisins calculés pour {len(graph.movie_ids)} films dans {NEIGHBORS_DIR}")
@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .config import PEOPLE_INDEX_BATCH_SIZE, PEOPLE_INDEX_REFRESH_SECONDS
+
+
+class PeopleIndex:
+    """In-memory posting lists of the movies of every person, split by job.
+
+    The credits are grouped by (person, job) and sorted: the movies of the `k`-th pair
+    are `movies[offsets[k]:offsets[k + 1]]`, a sorted array of unique movie IDs. Queries
+    combining several people intersect these arrays, shortest first, instead of joining
+    `Credits` once per person.
+
+    Attributes:
+        people (np.ndarray): Person of each (person, job) pair, sorted (int64).
+        jobs (np.ndarray): Job of each pair, sorted within a person (int64).
+        offsets (np.ndarray): Start of the movies of each pair, plus the total (int64).
+        movies (np.ndarray): Movie IDs of every pair (int32, like the `movie_id` column).
+        job_ids (Dict[str, int]): ID of every job title, e.g. "Acting" or "Director".
+    """
+
+    def __init__(self, credits: np.ndarray, job_ids: Dict[str, int]):
+        """Builds the index from an (n, 3) array of (people_id, job_id, movie_id) rows."""
+        credits = np.unique(credits.reshape(-1, 3).astype(np.int64), axis=0)
+        starts = np.flatnonzero(
+            np.concatenate([[True], np.any(credits[1:, :2] != credits[:-1, :2], axis=1)])
+        ) if len(credits) else np.empty(0, dtype=np.int64)
+        self.people = credits[starts, 0]
+        self.jobs = credits[starts, 1]
+        self.offsets = np.append(starts, len(credits)).astype(np.int64)
+        self.movies = credits[:, 2].astype(np.int32)
+        self.job_ids = job_ids
+
+    @classmethod
+    def from_db(cls, db: Session, batch_size: int = PEOPLE_INDEX_BATCH_SIZE) -> "PeopleIndex":
+        """Reads every credit once, `batch_size` rows at a time, as three integer columns."""
+        result = db.execute(
+            select(models.Credits.id_people, models.Credits.id_job, models.Credits.id_movie).execution_options(
+                yield_per=batch_size
+            )
+        )
+        chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+        credits = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+        job_ids = {title: job_id for job_id, title in db.query(models.Jobs.job_id, models.Jobs.title) if title}
+        return cls(credits, job_ids)
+
+    def _pairs(self, people_id: int) -> range:
+        start = int(np.searchsorted(self.people, people_id, side="left"))
+        end = int(np.searchsorted(self.people, people_id, side="right"))
+        return range(start, end)
+
+    def __contains__(self, people_id: int) -> bool:
+        return len(self._pairs(people_id)) > 0
+
+    def roles(self, people_id: int) -> Dict[int, np.ndarray]:
+        """Returns the sorted movie IDs of a person for each of their jobs."""
+        return {
+            int(self.jobs[pair]): self.movies[self.offsets[pair]:self.offsets[pair + 1]]
+            for pair in self._pairs(people_id)
+        }
+
+    def movies_of(self, people_id: int, job: Optional[str] = None) -> np.ndarray:
+        """Returns the sorted movie IDs of a person, in one job or in any."""
+        roles = self.roles(people_id)
+        if job is not None:
+            return roles.get(self.job_ids.get(job), self.movies[:0])
+        if len(roles) == 1:
+            return next(iter(roles.values()))
+        return np.unique(np.concatenate(list(roles.values()))) if roles else self.movies[:0]
+
+    def intersect(self, requirements: Iterable[Tuple[int, Optional[str]]]) -> np.ndarray:
+        """Returns the sorted IDs of the movies matching every (people_id, job) requirement.
+
+        A `None` job accepts any job. The shortest posting lists are intersected first,
+        so the cost is bounded by the least prolific person.
+        """
+        postings = sorted((self.movies_of(people_id, job) for people_id, job in requirements), key=len)
+        if not postings:
+            return self.movies[:0]
+        movies = postings[0]
+        for other in postings[1:]:
+            if not len(movies):
+                break
+            movies = np.intersect1d(movies, other, assume_unique=True)
+        return movies
+
+    def job_titles(self) -> Dict[int, str]:
+        return {job_id: title for title, job_id in self.job_ids.items()}
+
+
+_people_index: Optional[PeopleIndex] = None
+_people_index_loaded_at = 0.0
+_people_index_refreshing = False
+_people_index_lock = threading.Lock()
+
+
+def _refresh_people_index(bind: Engine) -> None:
+    global _people_index, _people_index_loaded_at, _people_index_refreshing
+    try:
+        with sessionmaker(bind=bind)() as session:
+            index = PeopleIndex.from_db(session)
+        with _people_index_lock:
+            _people_index, _people_index_loaded_at = index, time.monotonic()
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement de l'index des personnes : {e}")
+    finally:
+        with _people_index_lock:
+            _people_index_refreshing = False
+
+
+def get_people_index(db: Session, max_age: float = PEOPLE_INDEX_REFRESH_SECONDS) -> PeopleIndex:
+    """Returns the process-wide index.
+
+    Only the very first call scans `Credits` on the request path. Once the index is older
+    than `max_age` seconds, it is rebuilt in a background thread with its own session and
+    swapped in when ready, while requests keep using the current one.
+    """
+    global _people_index, _people_index_loaded_at, _people_index_refreshing
+    with _people_index_lock:
+        if _people_index is None:
+            _people_index, _people_index_loaded_at = PeopleIndex.from_db(db), time.monotonic()
+        elif time.monotonic() - _people_index_loaded_at > max_age and not _people_index_refreshing:
+            _people_index_refreshing = True
+            threading.Thread(target=_refresh_people_index, args=(db.get_bind(),), daemon=True).start()
+        return _people_index
+
+
+def invalidate_people_index() -> None:
+    """Drops the process-wide index so the next `get_people_index` call rebuilds it."""
+    global _people_index
+    with _people_index_lock:
+        _people_index = None
@@ -0,0 +1,521 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+from .breaker import db_breaker
+from .config import (CARROUSSEL_LENGTH, PIPELINE_BUDGETS, PIPELINE_CACHE_SIZE,
+                     PIPELINE_POOL_WORKERS, PIPELINE_WORKERS)
+from .impressions import ImpressionFilter
+
+Recommendations = Dict[str, Any]
+
+# Key of the names of the generators dropped at the deadline, when there are any
+TIMED_OUT_KEY = "timed_out"
+
+
+@dataclass
+class RecommendationContext:
+    """Everything a stage may need about the request, with the derived queries run at most once.
+
+    Attributes:
+        db (Session): The database session of the request.
+        user_id (int): The user.
+        seen_movie_ids (List[int]): The movies to leave out.
+        impressions (Optional[ImpressionFilter]): The movies recently shown to the user.
+        session_factory (Optional[Callable[[], Session]]): Opens sessions for the stages run
+            in worker threads; concurrent stages run sequentially on `db` without it.
+        limit (int): Number of candidates a generator should return per carousel.
+        shared (Optional[bool]): Run only the generators whose `shared` flag has this value;
+            every generator if None.
+        deadline (Optional[float]): `time.monotonic()` value after which the generators
+            still running are dropped; no deadline if None.
+    """
+
+    db: Session
+    user_id: int
+    seen_movie_ids: List[int]
+    impressions: Optional[ImpressionFilter] = None
+    session_factory: Optional[Callable[[], Session]] = None
+    limit: int = CARROUSSEL_LENGTH
+    shared: Optional[bool] = None
+    deadline: Optional[float] = None
+    _memo: Dict[str, Any] = field(default_factory=dict, repr=False)
+    _memo_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without deadline."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _remember(self, name: str, compute: Callable[[], Any]) -> Any:
+        with self._memo_lock:
+            if name not in self._memo:
+                self._memo[name] = compute()
+            return self._memo[name]
+
+    def loved_movie_ids(self) -> List[int]:
+        return self._remember(
+            "loved",
+            lambda: [
+                row[0]
+                for row in self.db.query(models.MovieUsers.movie_id)
+                .filter(models.MovieUsers.user_id == self.user_id, models.MovieUsers.note >= 4)
+                .all()
+            ],
+        )
+
+
+@dataclass(frozen=True)
+class StageBudget:
+    """Limits of a stage: its expected duration and the size of each carousel it returns.
+
+    Attributes:
+        seconds (Optional[float]): Time the stage should take; overruns are reported in the profile.
+        max_items (Optional[int]): Movies kept per carousel.
+    """
+
+    seconds: Optional[float] = None
+    max_items: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How the output of a generator is reused across requests.
+
+    Attributes:
+        ttl (float): Lifetime of a cached output in seconds; 0 disables caching.
+        per_user (bool): If False, the output is computed once for every user with an
+            empty seen list, and each user's seen movies are filtered out afterwards.
+    """
+
+    ttl: float = 0.0
+    per_user: bool = True
+
+
+NO_CACHE = CachePolicy()
+
+
+class CandidateGenerator(ABC):
+    """A source of carousels, such as the trending movies or the ALS factors.
+
+    Attributes:
+        name (str): Name of the stage in profiles and metrics.
+        budget (StageBudget): Time and size budget.
+        cache (CachePolicy): Caching policy of the output.
+        concurrent (bool): Whether the stage may run in a worker thread.
+        shared (bool): Whether the output depends only on the seen movies and picked genres,
+            so users with the same genres may share it, e.g. while they are cold-start.
+    """
+
+    name: str = "generator"
+    budget: StageBudget = StageBudget()
+    cache: CachePolicy = NO_CACHE
+    concurrent: bool = True
+    shared: bool = True
+
+    @abstractmethod
+    def generate(self, context: RecommendationContext) -> Recommendations:
+        """Returns carousels keyed by name; non-list values (messages) are reported, not served."""
+
+
+class FetcherGenerator(CandidateGenerator):
+    """Adapts a `RecommendationFetcher` call to the generator interface.
+
+    The fetchers have different signatures, so each generator is given the call to make.
+    Without an explicit budget, the time budget is read from `PIPELINE_BUDGETS`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[RecommendationContext], Recommendations],
+        budget: Optional[StageBudget] = None,
+        cache: CachePolicy = NO_CACHE,
+        concurrent: bool = True,
+        shared: bool = True,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.budget = budget or StageBudget(seconds=PIPELINE_BUDGETS.get(name))
+        self.cache = cache
+        self.concurrent = concurrent
+        self.shared = shared
+
+    def generate(self, context: RecommendationContext) -> Recommendations:
+        return self.fetch(context)
+
+
+class Merger(ABC):
+    @abstractmethod
+    def merge(self, context: RecommendationContext, outputs: List[Recommendations]) -> Recommendations:
+        """Combines the outputs of the generators, given in generator order."""
+
+
+class Ranker(ABC):
+    @abstractmethod
+    def rank(self, context: RecommendationContext, recommendations: Recommendations) -> Recommendations:
+        """Orders the movies of the merged carousels."""
+
+
+class PostFilter(ABC):
+    @abstractmethod
+    def apply(self, context: RecommendationContext, recommendations: Recommendations) -> Recommendations:
+        """Last pass over the ranked carousels, e.g. business rules or truncation."""
+
+
+class OrderedMerger(Merger):
+    """Merges carousels in generator order; a later carousel with the same key wins."""
+
+    def merge(self, context: RecommendationContext, outputs: List[Recommendations]) -> Recommendations:
+        merged: Recommendations = {}
+        for output in outputs:
+            merged.update(output)
+        return merged
+
+
+@dataclass
+class StageReport:
+    """Measurements of one stage in one run."""
+
+    name: str
+    seconds: float
+    items: int
+    cached: bool = False
+    over_budget: bool = False
+    timed_out: bool = False
+    message: Optional[str] = None
+    error: Optional[Exception] = field(default=None, repr=False)
+
+
+class StageStats:
+    """Process-wide timings of a stage, for `/metrics/pipeline`."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.cache_hits = 0
+        self.over_budget = 0
+        self.timeouts = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def record(self, report: StageReport) -> None:
+        with self._lock:
+            if report.timed_out:
+                self.timeouts += 1
+                return
+            self.calls += 1
+            self.total_seconds += report.seconds
+            self.max_seconds = max(self.max_seconds, report.seconds)
+            self.cache_hits += report.cached
+            self.over_budget += report.over_budget
+            self.messages += report.message is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "mean_ms": 1000 * self.total_seconds / self.calls if self.calls else 0.0,
+                "max_ms": 1000 * self.max_seconds,
+                "cache_hits": self.cache_hits,
+                "over_budget": self.over_budget,
+                "timeouts": self.timeouts,
+                "messages": self.messages,
+            }
+
+
+class StageCache:
+    """Bounded in-process store of generator outputs with per-entry expiry."""
+
+    def __init__(self, size: int = PIPELINE_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[Tuple, Tuple[float, Recommendations]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Recommendations]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Tuple, value: Recommendations, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool shared by the concurrent generators of every request.
+
+    Its size bounds the connections the generators hold across all requests, including
+    the stages still running after their request's deadline.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PIPELINE_POOL_WORKERS, thread_name_prefix="pipeline")
+        return _executor
+
+
+def limit_statement_time(session: Session, seconds: Optional[float]) -> None:
+    """Makes MariaDB or MySQL abort the queries of a session after `seconds`; None lifts the limit.
+
+    Other databases, and test doubles of the session, are left unchanged.
+    """
+    if not isinstance(session, Session):
+        return
+    dialect = session.get_bind().dialect
+    if dialect.name not in ("mysql", "mariadb"):
+        return
+    if getattr(dialect, "is_mariadb", False):
+        session.execute(text("SET SESSION max_statement_time = :seconds"), {"seconds": seconds or 0})
+    else:
+        session.execute(text("SET SESSION max_execution_time = :ms"), {"ms": int(1000 * (seconds or 0))})
+
+
+def _movie_id(movie: Any) -> int:
+    return movie["movie_id"] if isinstance(movie, dict) else movie.movie_id
+
+
+def _count(recommendations: Recommendations) -> int:
+    return sum(len(value) for value in recommendations.values() if isinstance(value, list))
+
+
+def _filter(recommendations: Recommendations, seen: set, max_items: Optional[int]) -> Recommendations:
+    filtered = {}
+    for key, value in recommendations.items():
+        if isinstance(value, list):
+            if seen:
+                value = [movie for movie in value if _movie_id(movie) not in seen]
+            if max_items is not None:
+                value = value[:max_items]
+            if not value:
+                continue
+        filtered[key] = value
+    return filtered
+
+
+class RecommendationPipeline:
+    """Candidate generation, merge, ranking and post-filtering of the recommendations.
+
+    Generators marked `concurrent` run in the process-wide pool of `get_executor`, each
+    with its own session from `context.session_factory`; the others run in the request
+    thread, on the request's session. At most `workers` generators of a request go to
+    the pool, so a request holds at most `workers + 1` connections; the concurrent ones
+    beyond that run in the request thread too. Every stage is timed, and the timings
+    are kept per stage for profiling.
+
+    With a `context.deadline`, the generators not done in time are dropped: the carousels
+    that finished are served, and the names of the others are listed under `timed_out`.
+    The queries of the pooled generators are aborted by the database at the deadline, so
+    a late stage gives its thread and connection back instead of finishing for nothing.
+
+    A generator that fails on the database (`db_breaker.errors`) is reported like any
+    other failure, unless every generator that ran failed that way: the error is then
+    raised, so the caller's `db_breaker.guard()` records the outage.
+
+    Attributes:
+        generators (Sequence[CandidateGenerator]): The candidate generators, in merge order.
+        merger (Merger): Combines the generator outputs.
+        ranker (Optional[Ranker]): Orders the merged carousels.
+        post_filters (Sequence[PostFilter]): Applied in order after ranking.
+        workers (int): Sessions a request may open for its pooled generators; none below 2.
+    """
+
+    def __init__(
+        self,
+        generators: Sequence[CandidateGenerator],
+        merger: Optional[Merger] = None,
+        ranker: Optional[Ranker] = None,
+        post_filters: Sequence[PostFilter] = (),
+        workers: int = PIPELINE_WORKERS,
+    ):
+        self.generators = list(generators)
+        self.merger = merger or OrderedMerger()
+        self.ranker = ranker
+        self.post_filters = list(post_filters)
+        self.workers = workers
+        self.cache = StageCache()
+        self.stats: Dict[str, StageStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def run(self, context: RecommendationContext) -> Recommendations:
+        return self.run_with_profile(context)[0]
+
+    def run_with_profile(self, context: RecommendationContext) -> Tuple[Recommendations, List[StageReport]]:
+        """Runs every stage and returns the recommendations with the report of each stage."""
+        reports: List[StageReport] = []
+        outputs, timed_out = self._generate(context, reports)
+
+        start = time.perf_counter()
+        recommendations = self.merger.merge(context, outputs)
+        self._report(reports, "merge", start, recommendations)
+
+        if self.ranker is not None:
+            start = time.perf_counter()
+            recommendations = self.ranker.rank(context, recommendations)
+            self._report(reports, "rank", start, recommendations)
+
+        for post_filter in self.post_filters:
+            start = time.perf_counter()
+            recommendations = post_filter.apply(context, recommendations)
+            self._report(reports, type(post_filter).__name__, start, recommendations)
+
+        if timed_out:
+            recommendations[TIMED_OUT_KEY] = timed_out
+        return recommendations, reports
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._stats_lock:
+            return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def _generate(
+        self, context: RecommendationContext, reports: List[StageReport]
+    ) -> Tuple[List[Recommendations], List[str]]:
+        generators = [
+            generator for generator in self.generators if context.shared in (None, generator.shared)
+        ]
+        outputs: List[Optional[Recommendations]] = [None] * len(generators)
+        timed_out: List[int] = []
+        futures: Dict[int, Future] = {}
+        if context.session_factory is not None and self.workers > 1:
+            concurrent = [i for i, generator in enumerate(generators) if generator.concurrent]
+            if len(concurrent) > 1:
+                executor = get_executor()
+                # Past `workers` sessions, the other stages share the request's session
+                for i in concurrent[:self.workers]:
+                    futures[i] = executor.submit(self._run_in_session, generators[i], context)
+        try:
+            for i, generator in enumerate(generators):
+                if i in futures:
+                    continue
+                # A stage in the request thread cannot be interrupted, but the next ones are skipped
+                if context.expired():
+                    timed_out.append(i)
+                    continue
+                outputs[i], report = self._run_generator(generator, context)
+                reports.append(report)
+            if futures:
+                done, _ = wait(futures.values(), timeout=context.remaining())
+                for i, future in futures.items():
+                    if future in done and future.result() is not None:
+                        outputs[i], report = future.result()
+                        reports.append(report)
+                    else:
+                        timed_out.append(i)
+        finally:
+            # Stages not started yet are dropped; running ones stop at their statement timeout
+            for future in futures.values():
+                future.cancel()
+
+        names = [generators[i].name for i in sorted(timed_out)]
+        for name in names:
+            self._record(StageReport(name, 0.0, 0, timed_out=True))
+
+        # Every stage that ran lost the database: fail the request so the circuit breaker
+        # counts it, instead of serving empty carousels while the breaker stays closed
+        errors = [report.error for report in reports if report.error is not None]
+        if errors and len(errors) == len(reports):
+            raise errors[0]
+        return [output for output in outputs if output is not None], names
+
+    def _run_in_session(
+        self, generator: CandidateGenerator, context: RecommendationContext
+    ) -> Optional[Tuple[Recommendations, StageReport]]:
+        # Queued behind other requests until after the deadline: not worth a connection
+        if context.expired():
+            return None
+        remaining = context.remaining()
+        with context.session_factory() as session:
+            limit_statement_time(session, None if remaining is None else max(remaining, 1e-3))
+            try:
+                return self._run_generator(generator, replace(context, db=session))
+            finally:
+                try:
+                    limit_statement_time(session, None)
+                except SQLAlchemyError:
+                    # The connection is broken: the session discards it on close
+                    pass
+
+    def _run_generator(
+        self, generator: CandidateGenerator, context: RecommendationContext
+    ) -> Tuple[Recommendations, StageReport]:
+        start = time.perf_counter()
+        policy = generator.cache
+        key = (generator.name, context.limit) + ((context.user_id,) if policy.per_user else ())
+        output = self.cache.get(key) if policy.ttl > 0 else None
+        cached = output is not None
+        error = None
+        if output is None:
+            stage_context = context if policy.per_user else replace(context, seen_movie_ids=[], _memo={})
+            try:
+                output = generator.generate(stage_context)
+            except db_breaker.errors as e:
+                # Kept on the report: `_generate` raises it if the whole database is failing
+                error = e
+                output = {"message": f"An error occurred: {str(e)}"}
+            except Exception as e:
+                output = {"message": f"An error occurred: {str(e)}"}
+            if policy.ttl > 0 and _count(output):
+                self.cache.set(key, output, policy.ttl)
+        seen = set(context.seen_movie_ids) if not policy.per_user else set()
+        output = _filter(output, seen, generator.budget.max_items)
+        # Messages such as errors or "no recommendations" are kept out of the payload
+        messages = [str(value) for value in output.values() if not isinstance(value, list)]
+        if messages:
+            output = {key: value for key, value in output.items() if isinstance(value, list)}
+            if any(message.startswith("An error occurred") for message in messages):
+                print(f"Erreur dans l'étape {generator.name} : {'; '.join(messages)}")
+
+        seconds = time.perf_counter() - start
+        budget = generator.budget.seconds
+        report = StageReport(
+            generator.name,
+            seconds,
+            _count(output),
+            cached=cached,
+            over_budget=budget is not None and seconds > budget,
+            message="; ".join(messages) or None,
+            error=error,
+        )
+        self._record(report)
+        return output, report
+
+    def _report(self, reports: List[StageReport], name: str, start: float, recommendations: Recommendations) -> None:
+        report = StageReport(name, time.perf_counter() - start, _count(recommendations))
+        reports.append(report)
+        self._record(report)
+
+    def _record(self, report: StageReport) -> None:
+        with self._stats_lock:
+            if report.name not in self.stats:
+                self.stats[report.name] = StageStats(report.name)
+            stats = self.stats[report.name]
+        stats.record(report)
@@ -0,0 +1,45 @@
+import json
+from typing import Any, Dict, Optional
+
+from .breaker import redis_breaker
+from .cache import dumps_payload, get_cache_stats
+from .config import PRECOMPUTED_TTL
+
+PRECOMPUTED_KEY_PREFIX = "recommendations:precomputed"
+
+stats = get_cache_stats("precomputed")
+
+
+def precomputed_key(user_id: int) -> str:
+    return f"{PRECOMPUTED_KEY_PREFIX}:{user_id}"
+
+
+def store_precomputed(redis_client, payloads: Dict[int, Dict[str, Any]], ttl: int = PRECOMPUTED_TTL) -> None:
+    """Writes the payloads of many users in one Redis round trip.
+
+    Args:
+        redis_client: The Redis client.
+        payloads (Dict[int, Dict[str, Any]]): The recommendations of each user, keyed by user ID.
+        ttl (int): Lifetime of the payloads in seconds, so a missed nightly run does not serve them forever.
+    """
+    pipeline = redis_client.pipeline(transaction=False)
+    for user_id, payload in payloads.items():
+        pipeline.set(precomputed_key(user_id), dumps_payload(payload), ex=ttl)
+    pipeline.execute()
+
+
+def get_precomputed(redis_client, user_id: int) -> Optional[Dict[str, Any]]:
+    """Returns the payload written by the nightly batch for a user, or None."""
+    if not redis_client:
+        return None
+    try:
+        data = redis_client.get(precomputed_key(user_id))
+    except Exception as e:
+        redis_breaker.observe(e)
+        print(f"Erreur lors de la lecture des recommandations précalculées : {e}")
+        return None
+    if data is None:
+        stats.miss(redis_client)
+        return None
+    stats.hit(redis_client)
+    return json.loads(data)
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Optional, List
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -77,3 +77,47 @@ class RecommendationSchema(BaseModel):
     class Config:
         orm_mode = True
         from_attributes = True
+
+
+class CompactCreditSchema(BaseModel):
+    credit_id: int
+    people_id: int
+    name: Optional[str] = None
+    photo: Optional[str] = None
+    job: Optional[str] = None
+    character_name: Optional[str] = None
+    cast_order: Optional[int] = None
+
+
+class CreditPageSchema(BaseModel):
+    items: List[CompactCreditSchema]
+    next_cursor: Optional[str] = None
+
+
+class SuggestionSchema(BaseModel):
+    movie_id: int
+    title: str
+    release_date: Optional[date] = None
+    poster_path: Optional[str] = None
+
+
+class FilmographyRoleSchema(BaseModel):
+    job: str
+    movies: List[RecommendationSchema]
+
+
+class FilmographySchema(BaseModel):
+    people_id: int
+    roles: List[FilmographyRoleSchema]
+
+
+class SearchResultsSchema(BaseModel):
+    items: List[MovieSchema]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+    next_cursor: Optional[str] = None
+
+
+class GenrePageSchema(BaseModel):
+    items: List[GenreSchema]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,714 @@
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalog import top_k
+from .config import (SEARCH_BATCH_SIZE, SEARCH_BM25_B, SEARCH_BM25_K1,
+                     SEARCH_COMPACT_DELETED_SHARE, SEARCH_COMPACT_THRESHOLD,
+                     SEARCH_FIELD_WEIGHTS, SEARCH_INDEX_PATH,
+                     SEARCH_RATING_EDGES, SEARCH_REFRESH_SECONDS,
+                     SEARCH_RUNTIME_EDGES)
+from .top_credits import select_top_credits
+
+_TOKEN = re.compile(r"\w+")
+
+
+def fold(text: Optional[str]) -> str:
+    """Lower-cases a text and strips its accents, so "Amélie" and "amelie" match."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(fold(text))
+
+
+def normalize(text: Optional[str]) -> str:
+    """Folds a title or query to lower-case, accent-free words separated by single spaces."""
+    return " ".join(tokenize(text))
+
+
+def popularity_score(vote_average: Optional[float], vote_count: Optional[int]) -> float:
+    """Rating weighted by the log of its number of votes; used to rank and break ties."""
+    return (vote_average or 0.0) / 10.0 * math.log1p(vote_count or 0)
+
+
+class MovieDocument(NamedTuple):
+    movie_id: int
+    title: Optional[str]
+    tagline: Optional[str]
+    overview: Optional[str]
+    names: List[str]
+    release_date: Optional[date]
+    vote_average: Optional[float]
+    vote_count: Optional[int]
+    genre_ids: List[int]
+    runtime: Optional[int] = None
+
+
+_DOCUMENT_COLUMNS = (
+    models.Movies.movie_id,
+    models.Movies.title,
+    models.Movies.tagline,
+    models.Movies.overview,
+    models.Movies.release_date,
+    models.Movies.vote_average,
+    models.Movies.vote_count,
+    models.Movies.runtime,
+)
+
+
+def load_documents(
+    db: Session, after_movie_id: Optional[int] = None, batch_size: int = SEARCH_BATCH_SIZE
+) -> Iterator[List[MovieDocument]]:
+    """Streams the searchable fields of the movies, `batch_size` movies at a time.
+
+    Credited names are the top-billed actors and the important crew of `MovieTopCredits`,
+    selected from `Credits` for movies not in the table yet.
+
+    Args:
+        db (Session): The database session.
+        after_movie_id (Optional[int]): Only load the movies with a greater ID.
+        batch_size (int): Movies per batch.
+    """
+    while True:
+        # Keyset pages on the primary key, so the other queries can run between them
+        query = db.query(*_DOCUMENT_COLUMNS).order_by(models.Movies.movie_id)
+        if after_movie_id is not None:
+            query = query.filter(models.Movies.movie_id > after_movie_id)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            return
+        after_movie_id = rows[-1][0]
+        yield _documents(db, rows)
+
+
+def load_updated_documents(
+    db: Session, movie_ids: List[int], batch_size: int = SEARCH_BATCH_SIZE
+) -> Iterator[List[MovieDocument]]:
+    """Streams the searchable fields of some movies, `batch_size` movies at a time.
+
+    Movies deleted since are left out, so the caller can tell them from the IDs missing.
+    """
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        rows = (
+            db.query(*_DOCUMENT_COLUMNS)
+            .filter(models.Movies.movie_id.in_(batch))
+            .order_by(models.Movies.movie_id)
+            .all()
+        )
+        if rows:
+            yield _documents(db, rows)
+
+
+def _documents(db: Session, rows: List[Tuple]) -> List[MovieDocument]:
+    """Adds the credited names and genres of some `_DOCUMENT_COLUMNS` rows."""
+    movie_ids = [row[0] for row in rows]
+    names: Dict[int, List[str]] = defaultdict(list)
+    for movie_id, name in db.query(models.MovieTopCredits.movie_id, models.MovieTopCredits.people_name).filter(
+        models.MovieTopCredits.movie_id.in_(movie_ids)
+    ):
+        names[movie_id].append(name or "")
+    missing = [movie_id for movie_id in movie_ids if movie_id not in names]
+    for movie_id, credits in select_top_credits(db, missing).items():
+        names[movie_id] = [credit["people_name"] or "" for credit in credits]
+    genres: Dict[int, List[int]] = defaultdict(list)
+    for movie_id, genre_id in db.query(models.MovieGenres.movie_id, models.MovieGenres.genre_id).filter(
+        models.MovieGenres.movie_id.in_(movie_ids)
+    ):
+        genres[movie_id].append(genre_id)
+    return [
+        MovieDocument(*row[:4], names[row[0]], *row[4:7], genres[row[0]], row[7])
+        for row in rows
+    ]
+
+
+def load_movie_updates(db: Session, since: Optional[datetime]) -> Tuple[List[int], Optional[datetime]]:
+    """Returns the movies of `MovieUpdates` edited after `since`, and the time of the latest edit.
+
+    Args:
+        db (Session): The database session.
+        since (Optional[datetime]): Time of the latest edit already indexed; None for every edit.
+
+    Returns:
+        Tuple[List[int], Optional[datetime]]: The edited movie IDs, and the time of the latest
+        edit, `since` if there is none.
+    """
+    query = db.query(models.MovieUpdates.movie_id, models.MovieUpdates.updated_at)
+    if since is not None:
+        query = query.filter(models.MovieUpdates.updated_at > since)
+    rows = query.all()
+    return [row[0] for row in rows], max((row[1] for row in rows), default=since)
+
+
+def bucket_labels(edges: Tuple[float, ...]) -> List[str]:
+    """Names the buckets delimited by sorted edges, e.g. (90, 120) gives "<90", "90-120" and "120+"."""
+    return [f"<{edges[0]}"] + [f"{low}-{high}" for low, high in zip(edges, edges[1:])] + [f"{edges[-1]}+"]
+
+
+RUNTIME_LABELS = bucket_labels(SEARCH_RUNTIME_EDGES)
+RATING_LABELS = bucket_labels(SEARCH_RATING_EDGES)
+# Bucket of every runtime in minutes and band of every rating in tenths: a lookup is cheaper than a search
+_RUNTIME_BUCKETS = np.digitize(np.arange(1000), SEARCH_RUNTIME_EDGES)
+_RATING_BANDS = np.digitize(np.arange(101) / 10, SEARCH_RATING_EDGES)
+
+
+def runtime_buckets(runtimes: np.ndarray) -> np.ndarray:
+    """Returns the position in `RUNTIME_LABELS` of each runtime, -1 if unknown."""
+    return np.where(runtimes > 0, _RUNTIME_BUCKETS[np.clip(runtimes, 0, len(_RUNTIME_BUCKETS) - 1)], -1)
+
+
+def rating_bands(ratings: np.ndarray) -> np.ndarray:
+    """Returns the position in `RATING_LABELS` of each rating, -1 if unknown."""
+    tenths = np.clip(np.nan_to_num(ratings) * 10, 0, len(_RATING_BANDS) - 1).astype(np.int64)
+    return np.where(np.isnan(ratings), -1, _RATING_BANDS[tenths])
+
+
+def load_genre_names(db: Session) -> Dict[int, str]:
+    return {genre_id: name or "" for genre_id, name in db.query(models.Genres.genre_id, models.Genres.name)}
+
+
+class SearchIndex:
+    """In-memory inverted index of the movies, scored with BM25.
+
+    The text of each movie is its title, tagline, overview and credited names; a term
+    counts `SEARCH_FIELD_WEIGHTS[field]` times per occurrence in a field, so title and
+    name matches weigh more than overview ones.
+
+    Postings are stored compressed-row style: the document positions of term `t` are
+    `docs[offsets[t]:offsets[t + 1]]` (int32) with their weighted frequencies in `freqs`
+    (uint16). Movies added later go to small per-term delta lists, merged into the main
+    arrays by `compact`, so adding a movie does not rebuild the index. A movie indexed
+    again is added as a new document and its previous one is marked deleted, like a
+    movie removed; `compact` drops the deleted documents and renumbers the others.
+
+    Attributes:
+        terms (Dict[str, int]): Term ID of every folded token.
+        doc_movie_ids (np.ndarray): Movie of each document (int64).
+        doc_lengths (np.ndarray): Weighted number of tokens of each document (float32).
+        deleted (np.ndarray): Documents replaced by a newer one.
+        release_days (np.ndarray): Release date as a proleptic ordinal, 0 if unknown (int32).
+        release_years (np.ndarray): Release year, 0 if unknown, for the decade facet (int16).
+        genre_bits (np.ndarray): Bitmask of the genres of each document (uint64).
+        genre_index (Dict[int, int]): Maps a genre ID to its bit position.
+        genre_names (Dict[int, str]): Name of every genre, for the genre filter.
+        popularity (np.ndarray): `popularity_score` of each document (float32).
+        runtimes (np.ndarray): Runtime in minutes, 0 if unknown (int16).
+        ratings (np.ndarray): Vote average, NaN if unknown (float32).
+        updated_at (Optional[datetime]): Time of the latest `MovieUpdates` edit indexed.
+    """
+
+    _ARRAYS = ("offsets", "docs", "freqs", "doc_movie_ids", "doc_lengths", "deleted",
+               "release_days", "release_years", "genre_bits", "popularity", "runtimes", "ratings")
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        freqs: np.ndarray,
+        doc_movie_ids: np.ndarray,
+        doc_lengths: np.ndarray,
+        deleted: np.ndarray,
+        release_days: np.ndarray,
+        release_years: np.ndarray,
+        genre_bits: np.ndarray,
+        genre_index: Dict[int, int],
+        popularity: np.ndarray,
+        runtimes: np.ndarray,
+        ratings: np.ndarray,
+        genre_names: Optional[Dict[int, str]] = None,
+        updated_at: Optional[datetime] = None,
+    ):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.freqs = freqs
+        self.doc_movie_ids = doc_movie_ids
+        self.doc_lengths = doc_lengths
+        self.deleted = deleted
+        self.release_days = release_days
+        self.release_years = release_years
+        self.genre_bits = genre_bits
+        self.genre_index = genre_index
+        self.popularity = popularity
+        self.runtimes = runtimes
+        self.ratings = ratings
+        self.genre_names = genre_names or {}
+        self.updated_at = updated_at
+        self._delta: Dict[int, Tuple[List[int], List[int]]] = {}
+        self._delta_size = 0
+        live = np.flatnonzero(~deleted)
+        self._positions = dict(zip(doc_movie_ids[live].tolist(), live.tolist()))
+        self._live = len(live)
+        self._total_length = float(doc_lengths[~deleted].sum())
+        self._lock = threading.RLock()
+
+    @classmethod
+    def empty(cls) -> "SearchIndex":
+        return cls(
+            terms={},
+            offsets=np.zeros(1, dtype=np.int64),
+            docs=np.empty(0, dtype=np.int32),
+            freqs=np.empty(0, dtype=np.uint16),
+            doc_movie_ids=np.empty(0, dtype=np.int64),
+            doc_lengths=np.empty(0, dtype=np.float32),
+            deleted=np.empty(0, dtype=bool),
+            release_days=np.empty(0, dtype=np.int32),
+            release_years=np.empty(0, dtype=np.int16),
+            genre_bits=np.empty(0, dtype=np.uint64),
+            genre_index={},
+            popularity=np.empty(0, dtype=np.float32),
+            runtimes=np.empty(0, dtype=np.int16),
+            ratings=np.empty(0, dtype=np.float32),
+        )
+
+    @classmethod
+    def build(cls, batches: Iterable[List[MovieDocument]]) -> "SearchIndex":
+        index = cls.empty()
+        for documents in batches:
+            index.add(documents)
+            if index._delta_size > SEARCH_COMPACT_THRESHOLD:
+                index.compact()
+        index.compact()
+        return index
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def max_movie_id(self) -> Optional[int]:
+        return int(self.doc_movie_ids.max()) if len(self.doc_movie_ids) else None
+
+    def add(self, documents: List[MovieDocument]) -> None:
+        """Indexes new or updated movies; their postings go to the delta lists until `compact`."""
+        with self._lock:
+            start = len(self.doc_movie_ids)
+            self._delete([document.movie_id for document in documents])
+
+            lengths, days, years, bits, popularity, runtimes, ratings = [], [], [], [], [], [], []
+            for position, document in enumerate(documents, start=start):
+                frequencies: Counter = Counter()
+                for field, weight in SEARCH_FIELD_WEIGHTS.items():
+                    value = " ".join(document.names) if field == "names" else getattr(document, field)
+                    for token in tokenize(value):
+                        frequencies[token] += weight
+                for token, frequency in frequencies.items():
+                    term = self.terms.setdefault(token, len(self.terms))
+                    delta_docs, delta_freqs = self._delta.setdefault(term, ([], []))
+                    delta_docs.append(position)
+                    delta_freqs.append(min(frequency, np.iinfo(np.uint16).max))
+                self._delta_size += len(frequencies)
+                lengths.append(sum(frequencies.values()))
+                days.append(document.release_date.toordinal() if document.release_date else 0)
+                years.append(document.release_date.year if document.release_date else 0)
+                mask = 0
+                for genre_id in document.genre_ids:
+                    if genre_id not in self.genre_index and len(self.genre_index) < 64:
+                        self.genre_index[genre_id] = len(self.genre_index)
+                    if genre_id in self.genre_index:
+                        mask |= 1 << self.genre_index[genre_id]
+                bits.append(mask)
+                self._positions[document.movie_id] = position
+                popularity.append(popularity_score(document.vote_average, document.vote_count))
+                runtimes.append(min(document.runtime or 0, np.iinfo(np.int16).max))
+                ratings.append(np.nan if document.vote_average is None else document.vote_average)
+
+            self.doc_movie_ids = np.concatenate(
+                [self.doc_movie_ids, np.array([document.movie_id for document in documents], dtype=np.int64)]
+            )
+            self.doc_lengths = np.concatenate([self.doc_lengths, np.array(lengths, dtype=np.float32)])
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(documents), dtype=bool)])
+            self.release_days = np.concatenate([self.release_days, np.array(days, dtype=np.int32)])
+            self.release_years = np.concatenate([self.release_years, np.array(years, dtype=np.int16)])
+            self.genre_bits = np.concatenate([self.genre_bits, np.array(bits, dtype=np.uint64)])
+            self.popularity = np.concatenate([self.popularity, np.array(popularity, dtype=np.float32)])
+            self.runtimes = np.concatenate([self.runtimes, np.array(runtimes, dtype=np.int16)])
+            self.ratings = np.concatenate([self.ratings, np.array(ratings, dtype=np.float32)])
+            self._live += len(documents)
+            self._total_length += float(sum(lengths))
+
+    def remove(self, movie_ids: Iterable[int]) -> None:
+        """Marks the documents of movies deleted from the database; `compact` drops them."""
+        with self._lock:
+            self._delete(list(movie_ids))
+
+    def _delete(self, movie_ids: List[int]) -> None:
+        removed = np.isin(self.doc_movie_ids, movie_ids) & ~self.deleted
+        self._live -= int(removed.sum())
+        self._total_length -= float(self.doc_lengths[removed].sum())
+        self.deleted = self.deleted | removed
+        for movie_id in movie_ids:
+            self._positions.pop(movie_id, None)
+
+    def compact(self) -> None:
+        """Merges the delta lists into the main posting arrays and drops the deleted documents."""
+        with self._lock:
+            if not self._delta and not self.deleted.any():
+                return
+            for name, array in self._compacted_arrays().items():
+                setattr(self, name, array)
+            self._positions = dict(zip(self.doc_movie_ids.tolist(), range(len(self.doc_movie_ids))))
+            self._delta = {}
+            self._delta_size = 0
+
+    def compacted(self) -> "SearchIndex":
+        """Returns a compacted copy, leaving this index unchanged for the searches running on it."""
+        with self._lock:
+            return SearchIndex(
+                terms=dict(self.terms),
+                genre_index=dict(self.genre_index),
+                genre_names=self.genre_names,
+                updated_at=self.updated_at,
+                **self._compacted_arrays(),
+            )
+
+    def _compacted_arrays(self) -> Dict[str, np.ndarray]:
+        keep = ~self.deleted
+        # New position of every kept document; the order, hence that of the postings, is unchanged
+        renumbered = np.cumsum(keep, dtype=np.int64) - 1
+        base_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        delta = sorted(self._delta.items())
+        terms = np.concatenate(
+            [base_terms] + [np.full(len(delta_docs), term, dtype=np.int64) for term, (delta_docs, _) in delta]
+        )
+        docs = np.concatenate([self.docs] + [np.array(delta_docs, dtype=np.int32) for _, (delta_docs, _) in delta])
+        freqs = np.concatenate([self.freqs] + [np.array(delta_freqs, dtype=np.uint16) for _, (_, delta_freqs) in delta])
+        live = keep[docs]
+        terms, docs, freqs = terms[live], docs[live], freqs[live]
+        # Base postings are sorted by term and the delta documents are newer, so a stable
+        # sort keeps the documents of each term in increasing order
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.terms)), out=offsets[1:])
+        arrays = {
+            name: getattr(self, name)[keep]
+            for name in self._ARRAYS
+            if name not in ("offsets", "docs", "freqs", "deleted")
+        }
+        return dict(
+            arrays,
+            offsets=offsets,
+            docs=renumbered[docs[order]].astype(np.int32),
+            freqs=freqs[order],
+            deleted=np.zeros(int(keep.sum()), dtype=bool),
+        )
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the sorted documents of a term and their weighted frequencies."""
+        if term < len(self.offsets) - 1:
+            docs = self.docs[self.offsets[term]:self.offsets[term + 1]]
+            freqs = self.freqs[self.offsets[term]:self.offsets[term + 1]]
+        else:
+            docs, freqs = self.docs[:0], self.freqs[:0]
+        if term in self._delta:
+            delta_docs, delta_freqs = self._delta[term]
+            docs = np.concatenate([docs, np.array(delta_docs, dtype=np.int32)])
+            freqs = np.concatenate([freqs, np.array(delta_freqs, dtype=np.uint16)])
+        return docs, freqs
+
+    def scores(self, query: str) -> Optional[np.ndarray]:
+        """Returns the BM25 score of every document, -inf for those matching no term, or None for an empty query."""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return None
+        with self._lock:
+            scores = np.full(len(self.doc_movie_ids), -np.inf, dtype=np.float32)
+            average_length = self._total_length / self._live if self._live else 1.0
+            for token in tokens:
+                term = self.terms.get(token)
+                if term is None:
+                    continue
+                docs, freqs = self.postings(term)
+                live = ~self.deleted[docs]
+                docs, freqs = docs[live], freqs[live].astype(np.float32)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (self._live - len(docs) + 0.5) / (len(docs) + 0.5))
+                norms = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * self.doc_lengths[docs] / average_length)
+                contribution = idf * freqs * (SEARCH_BM25_K1 + 1) / (freqs + norms)
+                matched = scores[docs]
+                scores[docs] = np.where(np.isfinite(matched), matched, 0.0) + contribution
+            return scores
+
+    def genres_named(self, text: str) -> List[int]:
+        """Returns the genres whose folded name contains the folded text."""
+        folded = fold(text)
+        return [genre_id for genre_id, name in self.genre_names.items() if folded in fold(name)]
+
+    def genre_mask(self, genre_ids: Iterable[int]) -> np.uint64:
+        mask = 0
+        for genre_id in genre_ids:
+            if genre_id in self.genre_index:
+                mask |= 1 << self.genre_index[genre_id]
+        return np.uint64(mask)
+
+    def match(
+        self,
+        query: Optional[str] = None,
+        genre_ids: Optional[Iterable[int]] = None,
+        release_date: Optional[date] = None,
+        candidates: Optional[Dict[int, float]] = None,
+        within: Optional[Iterable[int]] = None,
+        decade: Optional[int] = None,
+        runtime: Optional[str] = None,
+        rating: Optional[str] = None,
+    ) -> np.ndarray:
+        """Returns the score of every document, -inf for those not matching.
+
+        Without query text, the movies passing the filters are ranked by popularity.
+
+        Args:
+            query (Optional[str]): Free text matched against titles, taglines, overviews and names.
+            genre_ids (Optional[Iterable[int]]): Keep movies with any of these genres.
+            release_date (Optional[date]): Keep movies released on this day.
+            candidates (Optional[Dict[int, float]]): Scores of the only movies to consider,
+                computed elsewhere (e.g. by the fuzzy index); replaces the query.
+            within (Optional[Iterable[int]]): Keep only these movies, e.g. those of some people.
+            decade (Optional[int]): Keep movies released in this decade, e.g. 1990.
+            runtime (Optional[str]): Keep movies in this `RUNTIME_LABELS` bucket.
+            rating (Optional[str]): Keep movies in this `RATING_LABELS` band.
+
+        Raises:
+            ValueError: If `runtime` or `rating` is not a known label.
+        """
+        with self._lock:
+            if candidates is not None:
+                scores = np.full(len(self.doc_movie_ids), -np.inf, dtype=np.float32)
+                for movie_id, score in candidates.items():
+                    if movie_id in self._positions:
+                        scores[self._positions[movie_id]] = score
+            else:
+                scores = self.scores(query) if query else None
+                if scores is None:
+                    scores = self.popularity.copy()
+                # Popularity breaks ties between equal text scores
+                scores = scores + 1e-3 * self.popularity
+            keep = ~self.deleted
+            if genre_ids is not None:
+                keep &= (self.genre_bits & self.genre_mask(genre_ids)) != 0
+            if release_date is not None:
+                keep &= self.release_days == release_date.toordinal()
+            if within is not None:
+                allowed = np.zeros(len(keep), dtype=bool)
+                allowed[[self._positions[movie_id] for movie_id in within if movie_id in self._positions]] = True
+                keep &= allowed
+            if decade is not None:
+                keep &= (self.release_years > 0) & (self.release_years // 10 == decade // 10)
+            if runtime is not None:
+                keep &= runtime_buckets(self.runtimes) == RUNTIME_LABELS.index(runtime)
+            if rating is not None:
+                keep &= rating_bands(self.ratings) == RATING_LABELS.index(rating)
+            scores[~keep] = -np.inf
+            return scores
+
+    def page(
+        self, scores: np.ndarray, limit: int = 10, after: Optional[Tuple[float, int]] = None
+    ) -> Tuple[List[int], Optional[Tuple[float, int]]]:
+        """Returns one page of the movies scored by `match`, by decreasing score then increasing ID.
+
+        Pages are delimited by the (score, movie ID) key of their last movie instead of an
+        offset: the movies up to `after` are masked in one vectorised pass, so a deep page
+        costs the same as the first.
+
+        Args:
+            scores (np.ndarray): The scores returned by `match`.
+            limit (int): Maximum number of movies.
+            after (Optional[Tuple[float, int]]): Key of the last movie of the previous page.
+
+        Returns:
+            Tuple[List[int], Optional[Tuple[float, int]]]: The movie IDs, and the key of the
+            last one if more movies follow.
+        """
+        if after is not None:
+            score, movie_id = float(after[0]), int(after[1])
+            later = (scores < score) | ((scores == score) & (self.doc_movie_ids > movie_id))
+            scores = np.where(later, scores, -np.inf)
+        positions = top_k(scores, limit + 1)
+        if len(positions):
+            # Movies tied with the last one may have been left out by the partition: take them all
+            positions = np.flatnonzero(scores >= scores[positions[-1]])
+            positions = positions[np.lexsort((self.doc_movie_ids[positions], -scores[positions]))][: limit + 1]
+        movie_ids = self.doc_movie_ids[positions[:limit]].tolist()
+        if len(positions) <= limit:
+            return movie_ids, None
+        return movie_ids, (float(scores[positions[limit - 1]]), movie_ids[-1])
+
+    @staticmethod
+    def count(scores: np.ndarray) -> int:
+        """Returns the number of movies matched by `match`."""
+        return int(np.count_nonzero(np.isfinite(scores)))
+
+    def search(self, query: Optional[str] = None, limit: int = 10, **filters) -> List[int]:
+        """Returns the IDs of the first page of matching movies, best first; `filters` are those of `match`."""
+        movie_ids, _ = self.page(self.match(query, **filters), limit)
+        return movie_ids
+
+    def facets(self, scores: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Counts the movies scored by `match` per genre, release decade, runtime bucket and rating band.
+
+        Each count is a vectorised pass over the columns of the matching documents, so
+        the cost does not depend on the number of facet values. Movies with an unknown
+        date, runtime or rating are left out of that facet.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The non-zero counts of each facet, by value.
+        """
+        with self._lock:
+            matched = np.isfinite(scores)
+            bits = self.genre_bits[matched]
+            genres = {}
+            for genre_id, bit in self.genre_index.items():
+                count = int(np.count_nonzero(bits & np.uint64(1 << bit)))
+                if count:
+                    genres[self.genre_names.get(genre_id, str(genre_id))] = count
+
+            years = self.release_years[matched]
+            decade_counts = np.bincount(years[years > 0] // 10)
+            decades = np.flatnonzero(decade_counts)
+            buckets = runtime_buckets(self.runtimes[matched])
+            runtime_counts = np.bincount(buckets[buckets >= 0], minlength=len(RUNTIME_LABELS))
+            bands = rating_bands(self.ratings[matched])
+            rating_counts = np.bincount(bands[bands >= 0], minlength=len(RATING_LABELS))
+            return {
+                "genre": genres,
+                "decade": {str(10 * decade): int(decade_counts[decade]) for decade in decades.tolist()},
+                "runtime": {label: int(count) for label, count in zip(RUNTIME_LABELS, runtime_counts) if count},
+                "rating": {label: int(count) for label, count in zip(RATING_LABELS, rating_counts) if count},
+            }
+
+    def save(self, path: str = SEARCH_INDEX_PATH) -> None:
+        """Writes the compacted index to one `.npz` file, terms and genres included."""
+        with self._lock:
+            self.compact()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Tokens never contain newlines, so the vocabulary is stored as one newline-separated buffer
+            terms = sorted(self.terms, key=self.terms.get)
+            genre_index = np.array(sorted(self.genre_index.items()), dtype=np.int64).reshape(-1, 2)
+            genre_ids = sorted(self.genre_names)
+            temporary = f"{path}.tmp.npz"
+            np.savez(
+                temporary,
+                terms=np.frombuffer("\n".join(terms).encode(), dtype=np.uint8),
+                genre_index=genre_index,
+                genre_ids=np.array(genre_ids, dtype=np.int64),
+                genre_names=np.frombuffer("\n".join(self.genre_names[g] for g in genre_ids).encode(), dtype=np.uint8),
+                updated_at=np.datetime64(self.updated_at or "NaT", "us"),
+                **{name: getattr(self, name) for name in self._ARRAYS},
+            )
+            os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str = SEARCH_INDEX_PATH) -> "SearchIndex":
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls._ARRAYS}
+            text = data["terms"].tobytes().decode()
+            genre_index = {int(genre_id): int(bit) for genre_id, bit in data["genre_index"]}
+            genre_names = dict(zip(data["genre_ids"].tolist(), data["genre_names"].tobytes().decode().split("\n")))
+            updated_at = data["updated_at"][()]
+        terms = {term: term_id for term_id, term in enumerate(text.split("\n"))} if text else {}
+        return cls(
+            terms=terms,
+            genre_index=genre_index,
+            genre_names=genre_names,
+            updated_at=None if np.isnat(updated_at) else updated_at.astype(datetime),
+            **arrays,
+        )
+
+
+_index: Optional[SearchIndex] = None
+_index_refreshed_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_search_index(
+    db: Session, path: str = SEARCH_INDEX_PATH, max_age: float = SEARCH_REFRESH_SECONDS
+) -> SearchIndex:
+    """Returns the process-wide index.
+
+    It is loaded from `path` when the file written by the offline job exists, and built
+    from the database otherwise or when the file predates a column of the index. Every
+    `max_age` seconds, it is refreshed by `_refresh_index`.
+    """
+    global _index, _index_refreshed_at
+    with _index_lock:
+        if _index is None and os.path.exists(path):
+            try:
+                _index = SearchIndex.load(path)
+                _index_refreshed_at = 0.0
+            except KeyError as e:
+                print(f"Index de recherche {path} obsolète ({e}), reconstruction depuis la base")
+        if _index is None:
+            _index = build_search_index(db)
+            _index_refreshed_at = time.monotonic()
+        if time.monotonic() - _index_refreshed_at > max_age:
+            _index = _refresh_index(db, _index)
+            _index_refreshed_at = time.monotonic()
+        return _index
+
+
+def build_search_index(db: Session) -> SearchIndex:
+    """Indexes every movie of the database."""
+    # Read first: the edits made during the build are indexed again by the next refresh
+    _, updated_at = load_movie_updates(db, None)
+    index = SearchIndex.build(load_documents(db))
+    index.genre_names = load_genre_names(db)
+    index.updated_at = updated_at
+    return index
+
+
+def _refresh_index(db: Session, index: SearchIndex) -> SearchIndex:
+    """Indexes the movies added, edited or deleted since the index was built or last refreshed.
+
+    The movies added since are read with one range query on the primary key, the edited
+    ones from `MovieUpdates`; a movie edited but no longer in `Movies` was deleted. Once
+    the delta lists or the deleted documents grow too large, a compacted copy replaces
+    the index, so the searches running on it are not disturbed.
+    """
+    edited, updated_at = load_movie_updates(db, index.updated_at)
+    max_movie_id = index.max_movie_id
+    edited = [movie_id for movie_id in edited if max_movie_id is not None and movie_id <= max_movie_id]
+
+    for documents in load_documents(db, after_movie_id=max_movie_id):
+        index.add(documents)
+    found = set()
+    for documents in load_updated_documents(db, edited):
+        index.add(documents)
+        found.update(document.movie_id for document in documents)
+    index.remove(movie_id for movie_id in edited if movie_id not in found)
+    index.genre_names = load_genre_names(db)
+    index.updated_at = updated_at
+
+    if index._delta_size > SEARCH_COMPACT_THRESHOLD or index.deleted.sum() > SEARCH_COMPACT_DELETED_SHARE * len(index):
+        return index.compacted()
+    return index
+
+
+def invalidate_search_index() -> None:
+    """Drops the process-wide index so the next `get_search_index` call loads it again."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+# Construire l'index hors-ligne pour un démarrage rapide : python -m recommendations.search_index
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        search_index = build_search_index(session)
+    search_index.save()
+    print(f"{len(search_index)} films et {len(search_index.terms)} termes indexés dans {SEARCH_INDEX_PATH}")
@@ -0,0 +1,316 @@
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalog import MovieCatalog, top_k
+from .config import (CF_BATCH_SIZE, HYBRID_WEIGHT_GENRE,
+                     HYBRID_WEIGHT_POPULARITY, HYBRID_WEIGHT_SIMILARITY,
+                     SEGMENT_COUNT, SEGMENT_GENRE_WEIGHT, SEGMENT_ITERATIONS,
+                     SEGMENT_POOL_SIZE, SEGMENTS_PATH)
+
+
+def _features(taste: np.ndarray, genres: np.ndarray) -> np.ndarray:
+    """Concatenates unit taste and genre vectors into unit segmentation features.
+
+    The genre part is scaled by `SEGMENT_GENRE_WEIGHT` before the final normalisation,
+    so it only tips the balance between users of close tastes.
+    """
+    features = np.hstack([taste, SEGMENT_GENRE_WEIGHT * genres]).astype(np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return np.divide(features, norms, out=np.zeros_like(features), where=norms > 0)
+
+
+def _normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def kmeans(
+    features: np.ndarray,
+    k: int,
+    iterations: int = SEGMENT_ITERATIONS,
+    seed: int = 0,
+    chunk_size: int = 65536,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means: clusters unit vectors by cosine similarity.
+
+    Assignments are computed `chunk_size` rows at a time, so memory stays bounded
+    by `chunk_size * k` whatever the number of users.
+
+    Args:
+        features (np.ndarray): Unit feature vectors, one row per user.
+        k (int): Number of clusters; capped by the number of rows.
+        iterations (int): Number of Lloyd iterations.
+        seed (int): Seed of the initial centroid draw.
+        chunk_size (int): Number of rows assigned per matrix product.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The unit centroids and the cluster of each row.
+    """
+    k = min(k, len(features))
+    rng = np.random.default_rng(seed)
+    centroids = features[rng.choice(len(features), size=k, replace=False)].copy()
+    assignments = np.zeros(len(features), dtype=np.int32)
+
+    for iteration in range(iterations):
+        previous = assignments.copy()
+        for start in range(0, len(features), chunk_size):
+            block = features[start:start + chunk_size] @ centroids.T
+            assignments[start:start + chunk_size] = block.argmax(axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, features)
+        filled = np.bincount(assignments, minlength=k) > 0
+        # A cluster left empty keeps its previous centroid
+        centroids[filled] = _normalise_rows(sums[filled])
+        if iteration and np.array_equal(assignments, previous):
+            break
+
+    return centroids, assignments
+
+
+class UserSegments:
+    """Clusters of users of similar tastes, each with a precomputed candidate pool.
+
+    Attributes:
+        user_ids (np.ndarray): Sorted IDs of the segmented users (int64).
+        assignments (np.ndarray): The segment of each user (int32).
+        centroids (np.ndarray): Unit centroid of each segment, taste part first (float32); the
+            last one is the zero centroid of the fallback segment.
+        pools (np.ndarray): Candidate movie IDs of each segment, best first, padded with -1 (int64).
+        genre_ids (np.ndarray): The genre ID of each column of the genre part (int64).
+    """
+
+    def __init__(
+        self,
+        user_ids: np.ndarray,
+        assignments: np.ndarray,
+        centroids: np.ndarray,
+        pools: np.ndarray,
+        genre_ids: np.ndarray,
+    ):
+        self.user_ids = user_ids
+        self.assignments = assignments
+        self.centroids = centroids
+        self.pools = pools
+        self.genre_ids = genre_ids
+
+    @property
+    def fallback(self) -> int:
+        """The segment of the users with neither taste nor genres, whose pool is the most popular movies."""
+        return len(self.centroids) - 1
+
+    @property
+    def taste_dim(self) -> int:
+        return self.centroids.shape[1] - len(self.genre_ids)
+
+    def save(self, path: str = SEGMENTS_PATH) -> None:
+        """Writes the segments to a `.npz` file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            user_ids=self.user_ids,
+            assignments=self.assignments,
+            centroids=self.centroids,
+            pools=self.pools,
+            genre_ids=self.genre_ids,
+        )
+
+    @classmethod
+    def load(cls, path: str = SEGMENTS_PATH) -> "UserSegments":
+        """Reads segments written by `save`."""
+        with np.load(path) as data:
+            return cls(
+                data["user_ids"], data["assignments"], data["centroids"], data["pools"], data["genre_ids"]
+            )
+
+    def segment_of(
+        self, user_id: int, taste: Optional[np.ndarray], genre_ids: Iterable[int]
+    ) -> int:
+        """Returns the user's segment.
+
+        Users segmented by the last job keep their assignment; the others, e.g. who
+        signed up since, are placed in the segment of the nearest centroid, or in the
+        fallback segment when they have neither taste nor genres.
+
+        Args:
+            user_id (int): The user.
+            taste (Optional[np.ndarray]): The user's unit taste vector, if any.
+            genre_ids (Iterable[int]): The user's preferred genres.
+
+        Returns:
+            int: The segment.
+        """
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return int(self.assignments[position])
+
+        taste_part = np.zeros((1, self.taste_dim), dtype=np.float32)
+        if taste is not None and taste.size == self.taste_dim:
+            taste_part[0] = taste
+        genre_part = np.isin(self.genre_ids, list(genre_ids)).astype(np.float32)[None, :]
+        features = _features(taste_part, _normalise_rows(genre_part))
+        if not features.any() or not self.fallback:
+            return self.fallback
+        return int((self.centroids[:self.fallback] @ features[0]).argmax())
+
+    def pool(self, segment: int) -> np.ndarray:
+        """Returns the candidate movie IDs of a segment."""
+        pool = self.pools[segment]
+        return pool[pool >= 0]
+
+
+def load_user_profiles(
+    db: Session, batch_size: int = CF_BATCH_SIZE
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Streams the loved movies (note ≥ 4) and the genre picks of every user.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The user and movie IDs of
+        the loved movies, then the user and genre IDs of the genre picks.
+    """
+    loved = (
+        select(models.MovieUsers.user_id, models.MovieUsers.movie_id)
+        .where(models.MovieUsers.note >= 4)
+        .execution_options(yield_per=batch_size)
+    )
+    picks = select(models.UserGenre.user_id, models.UserGenre.genre_id).execution_options(
+        yield_per=batch_size
+    )
+    columns: List[np.ndarray] = []
+    for statement in (loved, picks):
+        left, right = [], []
+        for rows in db.execute(statement).partitions():
+            left.append(np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+            right.append(np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)))
+        columns.append(np.concatenate(left) if left else np.empty(0, dtype=np.int64))
+        columns.append(np.concatenate(right) if right else np.empty(0, dtype=np.int64))
+    return tuple(columns)
+
+
+def build_segments(
+    catalog: MovieCatalog,
+    loved_users: np.ndarray,
+    loved_movies: np.ndarray,
+    pick_users: np.ndarray,
+    pick_genres: np.ndarray,
+    k: int = SEGMENT_COUNT,
+    pool_size: int = SEGMENT_POOL_SIZE,
+    iterations: int = SEGMENT_ITERATIONS,
+) -> UserSegments:
+    """Clusters the users and precomputes the candidate pool of each segment.
+
+    A user is described by their taste vector (mean embedding of their loved movies)
+    and their genre picks. The pool of a segment is the `pool_size` best released movies
+    for its centroid under the hybrid scoring weights, which is what its members would
+    mostly get from a full catalog scan. Users whose loved movies have no usable
+    embedding and who picked no genre cannot be compared with anyone: they are kept
+    out of k-means and placed in a last, fallback segment ranked on popularity alone.
+
+    Args:
+        catalog (MovieCatalog): The in-memory catalog.
+        loved_users (np.ndarray): The user of each loved movie.
+        loved_movies (np.ndarray): The loved movie IDs.
+        pick_users (np.ndarray): The user of each genre pick.
+        pick_genres (np.ndarray): The picked genre IDs.
+        k (int): Number of segments.
+        pool_size (int): Number of candidates kept per segment.
+        iterations (int): Number of k-means iterations.
+
+    Returns:
+        UserSegments: The segments.
+    """
+    positions = np.zeros(len(loved_movies), dtype=np.int64)
+    known = np.zeros(len(loved_movies), dtype=bool)
+    if len(catalog):
+        positions = np.minimum(np.searchsorted(catalog.movie_ids, loved_movies), len(catalog) - 1)
+        known = (catalog.movie_ids[positions] == loved_movies) & catalog.has_embedding[positions]
+    loved_users, positions = loved_users[known], positions[known]
+
+    user_ids = np.union1d(loved_users, pick_users)
+    genre_ids = np.unique(pick_genres)
+    dim = catalog.embeddings.shape[1]
+    loved_matrix = sparse.csr_matrix(
+        (np.ones(len(positions), dtype=np.float32), (np.searchsorted(user_ids, loved_users), positions)),
+        shape=(len(user_ids), len(catalog)),
+    )
+    taste = _normalise_rows(np.asarray(loved_matrix @ catalog.embeddings, dtype=np.float32))
+    picks_matrix = sparse.csr_matrix(
+        (
+            np.ones(len(pick_users), dtype=np.float32),
+            (np.searchsorted(user_ids, pick_users), np.searchsorted(genre_ids, pick_genres)),
+        ),
+        shape=(len(user_ids), len(genre_ids)),
+    )
+    genres = _normalise_rows(np.minimum(picks_matrix.toarray(), 1.0))
+    features = _features(taste, genres)
+
+    described = features.any(axis=1)
+    centroids = np.empty((0, features.shape[1]), dtype=np.float32)
+    assignments = np.zeros(len(user_ids), dtype=np.int32)
+    if described.any():
+        centroids, assignments[described] = kmeans(features[described], k, iterations)
+    assignments[~described] = len(centroids)
+    centroids = np.vstack([centroids, np.zeros((1, features.shape[1]), dtype=np.float32)])
+
+    # Genre columns of the movies, in the order of `genre_ids`
+    movie_genres = np.zeros((len(catalog), len(genre_ids)), dtype=np.float32)
+    for column, genre_id in enumerate(genre_ids):
+        bit = catalog.genre_index.get(int(genre_id))
+        if bit is not None:
+            movie_genres[:, column] = (catalog.genre_bits >> np.uint64(bit)) & np.uint64(1)
+
+    pools = np.full((len(centroids), pool_size), -1, dtype=np.int64)
+    base = HYBRID_WEIGHT_POPULARITY * catalog.popularity
+    base = np.where(catalog.released, base, -np.inf).astype(np.float32)
+    for segment, centroid in enumerate(centroids):
+        taste_part, genre_part = centroid[:dim], centroid[dim:]
+        scores = base.copy()
+        if dim and taste_part.any():
+            scores += HYBRID_WEIGHT_SIMILARITY * np.maximum(
+                catalog.embeddings @ (taste_part / np.linalg.norm(taste_part)), 0.0
+            )
+        if genre_part.any():
+            scores += HYBRID_WEIGHT_GENRE * (movie_genres @ (genre_part / genre_part.max()))
+        best = catalog.movie_ids[top_k(scores, pool_size)]
+        pools[segment, :len(best)] = best
+
+    return UserSegments(user_ids, assignments, centroids, pools, genre_ids)
+
+
+_segments: Optional[UserSegments] = None
+_segments_key: Optional[Tuple[str, float]] = None
+_segments_lock = threading.Lock()
+
+
+def get_user_segments(path: str = SEGMENTS_PATH) -> Optional[UserSegments]:
+    """Returns the persisted segments, reloading them when the file changes."""
+    global _segments, _segments_key
+    with _segments_lock:
+        if not os.path.exists(path):
+            return None
+        key = (path, os.path.getmtime(path))
+        if _segments is None or key != _segments_key:
+            _segments = UserSegments.load(path)
+            _segments_key = key
+        return _segments
+
+
+if __name__ == "__main__":
+    # Job périodique : segmenter les utilisateurs et précalculer les candidats de chaque segment
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        movie_catalog = MovieCatalog.from_db(session)
+        user_segments = build_segments(movie_catalog, *load_user_profiles(session))
+    user_segments.save()
+    print(
+        f"{len(user_segments.user_ids)} utilisateurs répartis en {len(user_segments.centroids)} "
+        f"segments dans {SEGMENTS_PATH}"
+    )
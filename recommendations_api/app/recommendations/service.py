@@ -0,0 +1,160 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .als_based import ALSRecommendationFetcher
+from .catalog import get_catalog
+from .config import CARROUSSEL_LENGTH, IMPRESSION_CANDIDATES
+from .demographic_based import DemographicRecommendationFetcher
+from .diversity import diversify
+from .hybrid_based import HybridRecommendationFetcher
+from .impressions import ImpressionFilter, downrank_shown
+from .movie_based import MovieBasedRecommendationFetcher
+from .pipeline import (FetcherGenerator, PostFilter, Ranker,
+                       RecommendationContext, RecommendationPipeline,
+                       Recommendations)
+from .social_based import SocialBasedRecommendationFetcher
+
+
+def get_seen_movie_ids(db: Session, user_id: int) -> List[int]:
+    """Returns the IDs of the movies the user has rated or saved."""
+    return [
+        movie_id[0]
+        for movie_id in db.query(models.MovieUsers.movie_id)
+        .filter(models.MovieUsers.user_id == user_id)
+        .all()
+    ]
+
+
+def get_genre_ids(db: Session, user_id: int) -> List[int]:
+    """Returns the IDs of the genres the user picked."""
+    return [
+        genre_id[0]
+        for genre_id in db.query(models.UserGenre.genre_id)
+        .filter(models.UserGenre.user_id == user_id)
+        .all()
+    ]
+
+
+def _movie_based(context: RecommendationContext) -> Recommendations:
+    movie_fetcher = MovieBasedRecommendationFetcher()
+    recommendations = {}
+    for movie_id in context.loved_movie_ids():
+        if context.expired():
+            break
+        recommendations.update(movie_fetcher.fetch(movie_id, context.db, context.seen_movie_ids))
+    return recommendations
+
+
+class DiversityRanker(Ranker):
+    """De-duplicates the carousels and re-ranks them with MMR (see `diversity.py`)."""
+
+    def rank(self, context: RecommendationContext, recommendations: Recommendations) -> Recommendations:
+        return diversify(recommendations, get_catalog(context.db))
+
+
+class ImpressionPostFilter(PostFilter):
+    """Pushes the recently shown movies back and cuts the carousels to `CARROUSSEL_LENGTH`."""
+
+    def apply(self, context: RecommendationContext, recommendations: Recommendations) -> Recommendations:
+        return downrank_shown(recommendations, context.impressions)
+
+
+def default_pipeline() -> RecommendationPipeline:
+    """Builds the pipeline of every fetcher, in the order their carousels are merged."""
+    return RecommendationPipeline(
+        generators=[
+            # Also returns the genre_<name> and trending carousels, from the same catalog pass
+            FetcherGenerator(
+                "hybrid",
+                lambda c: HybridRecommendationFetcher(limit=c.limit).fetch(
+                    c.db, c.user_id, c.seen_movie_ids, c.loved_movie_ids()
+                ),
+            ),
+            # One indexed query each: cheaper on the request's session than on a connection of their own
+            FetcherGenerator(
+                "social",
+                lambda c: SocialBasedRecommendationFetcher(limit=c.limit).fetch(c.db, c.user_id, c.seen_movie_ids),
+                concurrent=False,
+            ),
+            FetcherGenerator(
+                "als",
+                lambda c: ALSRecommendationFetcher(limit=c.limit).fetch(c.db, c.user_id, c.seen_movie_ids),
+            ),
+            FetcherGenerator(
+                "demographic",
+                lambda c: DemographicRecommendationFetcher(c.limit).fetch(c.db, c.user_id, c.seen_movie_ids),
+                concurrent=False,
+                # Depends on the user's age band and sexe, not only on their genres
+                shared=False,
+            ),
+            FetcherGenerator("movie", _movie_based),
+        ],
+        ranker=DiversityRanker(),
+        post_filters=[ImpressionPostFilter()],
+    )
+
+
+_pipeline: Optional[RecommendationPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> RecommendationPipeline:
+    """Returns the pipeline used by `compute_recommendations`, building the default one if needed."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = default_pipeline()
+        return _pipeline
+
+
+def set_pipeline(pipeline: Optional[RecommendationPipeline]) -> None:
+    """Replaces the pipeline, e.g. to try another ranker; None restores the default one."""
+    global _pipeline
+    with _pipeline_lock:
+        _pipeline = pipeline
+
+
+def compute_recommendations(
+    db: Session,
+    user_id: int,
+    seen_movie_ids: List[int],
+    impressions: Optional[ImpressionFilter] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+    deadline: Optional[float] = None,
+    shared: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the recommendation pipeline for a user.
+
+    When the user's impressions are given, the generators return `IMPRESSION_CANDIDATES`
+    movies so the recently shown ones can be pushed out.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The ID of the user.
+        seen_movie_ids (List[int]): The IDs of the movies to leave out.
+        impressions (Optional[ImpressionFilter]): The movies recently shown to the user.
+        session_factory (Optional[Callable[[], Session]]): Opens the sessions of the generators
+            run concurrently; they all run on `db` without it.
+        deadline (Optional[float]): `time.monotonic()` value after which the generators still
+            running are dropped and listed under `timed_out`.
+        shared (Optional[bool]): Run only the generators whose output users with the same
+            genres may share (True), or only the others (False); every generator if None.
+
+    Returns:
+        Dict[str, Any]: The de-duplicated carousels, keyed by carousel name.
+    """
+    context = RecommendationContext(
+        db=db,
+        user_id=user_id,
+        seen_movie_ids=seen_movie_ids,
+        impressions=impressions,
+        session_factory=session_factory,
+        limit=IMPRESSION_CANDIDATES if impressions is not None else CARROUSSEL_LENGTH,
+        shared=shared,
+        deadline=deadline,
+    )
+    return get_pipeline().run(context)
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .breaker import db_breaker
+from .cache import to_jsonable
+from .catalog import MovieCatalog, get_catalog, movies_by_ids
+from .config import (SNAPSHOT_LENGTH, SNAPSHOT_PATH,
+                     SNAPSHOT_REFRESH_SECONDS)
+
+
+def build_snapshot(db: Session, catalog: MovieCatalog, length: int = SNAPSHOT_LENGTH) -> Dict[str, Any]:
+    """Computes the carousels that are the same for every user.
+
+    Args:
+        db (Session): The database session.
+        catalog (MovieCatalog): The catalog, whose trending and per-genre orders are served.
+        length (int): Movies per carousel; more than a carousel shows, so seen movies can be skipped.
+
+    Returns:
+        Dict[str, Any]: The `trending_carousel` and one `genre_<name>` carousel per genre.
+    """
+    carousels = {}
+    movie_ids = catalog.movie_ids[catalog.trending_order[:length]].tolist()
+    if movie_ids:
+        carousels["trending_carousel"] = [
+            schemas.RecommendationSchema.from_orm(movie) for movie in movies_by_ids(db, movie_ids)
+        ]
+
+    genre_names = dict(db.query(models.Genres.genre_id, models.Genres.name).all())
+    for genre_id in sorted(catalog.genre_index):
+        if genre_id not in genre_names:
+            continue
+        movie_ids = catalog.movie_ids[catalog.genre_order(genre_id)[:length]].tolist()
+        if movie_ids:
+            carousels[f"genre_{genre_names[genre_id]}"] = [
+                schemas.RecommendationSchema.from_orm(movie) for movie in movies_by_ids(db, movie_ids)
+            ]
+    return to_jsonable(carousels)
+
+
+def save_snapshot(carousels: Dict[str, Any], path: str = SNAPSHOT_PATH) -> None:
+    """Writes the snapshot atomically, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"built_at": time.time(), "carousels": carousels}, file)
+    os.replace(temporary, path)
+
+
+_snapshot: Optional[Dict[str, Any]] = None
+_snapshot_key: Optional[Tuple[str, float]] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    """Returns the carousels of the persisted snapshot, reloading them when the file changes."""
+    global _snapshot, _snapshot_key
+    with _snapshot_lock:
+        if not os.path.exists(path):
+            return None
+        key = (path, os.path.getmtime(path))
+        if _snapshot is None or key != _snapshot_key:
+            with open(path) as file:
+                _snapshot = json.load(file)["carousels"]
+            _snapshot_key = key
+        return _snapshot
+
+
+def invalidate_snapshot() -> None:
+    """Drops the loaded snapshot so the next `get_snapshot` call reads the file again."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def refresh_snapshot(db: Session, path: str = SNAPSHOT_PATH) -> bool:
+    """Rebuilds the snapshot unless the database breaker is open; the previous file is kept on failure."""
+    try:
+        with db_breaker.guard():
+            carousels = build_snapshot(db, get_catalog(db))
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement de l'instantané des recommandations : {e}")
+        return False
+    if not carousels:
+        return False
+    save_snapshot(carousels, path)
+    return True
+
+
+class SnapshotRefresher(threading.Thread):
+    """Background thread rebuilding the snapshot every `interval` seconds."""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float = SNAPSHOT_REFRESH_SECONDS):
+        super().__init__(name="recommendations-snapshot", daemon=True)
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                with self.session_factory() as db:
+                    refresh_snapshot(db)
+            except Exception as e:
+                print(f"Erreur lors du rafraîchissement de l'instantané des recommandations : {e}")
+            self._stopped.wait(self.interval)
+
+
+if __name__ == "__main__":
+    # Job périodique : écrire l'instantané servi pendant une panne de la base
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        refreshed = refresh_snapshot(session)
+    print(f"Instantané {'écrit dans' if refreshed else 'inchangé :'} {SNAPSHOT_PATH}")
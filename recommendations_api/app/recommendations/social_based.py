@@ -0,0 +1,271 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .base import RecommendationFetcher
+from .breaker import db_breaker
+from .catalog import movies_by_ids
+from .config import (CARROUSSEL_LENGTH, CF_BATCH_SIZE, CF_CHUNK_NNZ,
+                     CF_NEIGHBORS, CF_NEIGHBORS_PATH, CF_NEUTRAL_NOTE)
+
+
+class ItemNeighbors:
+    """Top-k co-rated neighbours of every rated movie.
+
+    Attributes:
+        movie_ids (np.ndarray): Sorted IDs of the movies having neighbours (int64).
+        neighbors (np.ndarray): Neighbour movie IDs, one row per movie, padded with -1 (int64).
+        scores (np.ndarray): Similarity of each neighbour, padded with 0 (float32).
+    """
+
+    def __init__(self, movie_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        self.movie_ids = movie_ids
+        self.neighbors = neighbors
+        self.scores = scores
+
+    def save(self, path: str = CF_NEIGHBORS_PATH) -> None:
+        """Writes the neighbour lists to a `.npz` file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, movie_ids=self.movie_ids, neighbors=self.neighbors, scores=self.scores)
+
+    @classmethod
+    def load(cls, path: str = CF_NEIGHBORS_PATH) -> "ItemNeighbors":
+        """Reads neighbour lists written by `save`."""
+        with np.load(path) as data:
+            return cls(data["movie_ids"], data["neighbors"], data["scores"])
+
+    def score(self, ratings: Dict[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores the neighbours of the rated movies.
+
+        Each neighbour accumulates `similarity * (note - CF_NEUTRAL_NOTE)` over the
+        rated movies it is a neighbour of, so liked movies pull their neighbours up
+        and disliked ones push them down.
+
+        Args:
+            ratings (Dict[int, float]): The user's notes, keyed by movie ID.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The candidate movie IDs and their scores.
+        """
+        if not ratings or not len(self.movie_ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rated = np.fromiter(ratings.keys(), dtype=np.int64)
+        weights = np.fromiter(ratings.values(), dtype=np.float32) - CF_NEUTRAL_NOTE
+        positions = np.minimum(np.searchsorted(self.movie_ids, rated), len(self.movie_ids) - 1)
+        known = self.movie_ids[positions] == rated
+
+        neighbors = self.neighbors[positions[known]].ravel()
+        contributions = (self.scores[positions[known]] * weights[known, None]).ravel()
+        valid = neighbors >= 0
+        candidates, inverse = np.unique(neighbors[valid], return_inverse=True)
+        return candidates, np.bincount(inverse, weights=contributions[valid]).astype(np.float32)
+
+
+def load_ratings(db: Session, batch_size: int = CF_BATCH_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Streams the `MovieUsers` notes into three compact arrays.
+
+    Rows are fetched `batch_size` at a time so the ORM never materialises the
+    whole table; only the int32/float32 arrays are kept.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): Number of rows fetched per round trip.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The user IDs, movie IDs and notes.
+    """
+    statement = (
+        select(models.MovieUsers.user_id, models.MovieUsers.movie_id, models.MovieUsers.note)
+        .where(models.MovieUsers.note.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    users, movies, notes = [], [], []
+    for rows in db.execute(statement).partitions():
+        users.append(np.fromiter((row[0] for row in rows), dtype=np.int32, count=len(rows)))
+        movies.append(np.fromiter((row[1] for row in rows), dtype=np.int32, count=len(rows)))
+        notes.append(np.fromiter((row[2] for row in rows), dtype=np.float32, count=len(rows)))
+    if not users:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty, np.empty(0, dtype=np.float32)
+    return np.concatenate(users), np.concatenate(movies), np.concatenate(notes)
+
+
+def build_item_neighbors(
+    user_ids: np.ndarray,
+    movie_ids: np.ndarray,
+    notes: np.ndarray,
+    k: int = CF_NEIGHBORS,
+    chunk_nnz: int = CF_CHUNK_NNZ,
+) -> ItemNeighbors:
+    """Computes the top-k neighbours of every movie with adjusted cosine similarity.
+
+    Notes are centred on each user's mean and the movie columns are L2-normalised,
+    so `Mᵀ M` is the item-item similarity matrix. It is never materialised: it is
+    computed for a run of consecutive movies at a time, and only the top-k entries
+    of each row are kept. Runs are cut so that the non-zeros of each product, bounded
+    by the co-ratings of its movies, stay under `chunk_nnz`; a popular movie thus gets
+    a run of its own. Besides that product, memory holds the input arrays and a single
+    sparse copy of the ratings, read row-wise through a view of its CSC buffers.
+
+    Args:
+        user_ids (np.ndarray): The user of each rating.
+        movie_ids (np.ndarray): The movie of each rating.
+        notes (np.ndarray): The note of each rating.
+        k (int): Number of neighbours kept per movie.
+        chunk_nnz (int): Bound on the non-zeros of each sparse product.
+
+    Returns:
+        ItemNeighbors: The neighbour lists.
+    """
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    movies, movie_index = np.unique(movie_ids, return_inverse=True)
+    means = np.bincount(user_index, weights=notes) / np.bincount(user_index)
+    centred = (notes - means[user_index]).astype(np.float32)
+    norms = np.sqrt(np.bincount(movie_index, weights=centred * centred, minlength=len(movies)))
+    centred *= np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)[movie_index]
+
+    matrix = sparse.csc_matrix(
+        (centred, (user_index, movie_index)), shape=(len(users), len(movies))
+    )
+    del user_index, movie_index, centred
+    matrix.eliminate_zeros()
+    # Row j of this CSR matrix is column j of `matrix`: both share the same buffers
+    transposed = sparse.csr_matrix(
+        (matrix.data, matrix.indices, matrix.indptr), shape=(len(movies), len(users))
+    )
+
+    neighbors = np.full((len(movies), k), -1, dtype=np.int64)
+    scores = np.zeros((len(movies), k), dtype=np.float32)
+    for start, end in _runs(matrix, chunk_nnz):
+        # Mᵀ M is symmetric, so column j of `Mᵀ M[:, run]` is the row of movie j
+        block = (transposed @ matrix[:, start:end]).tocsc()
+        for column in range(block.shape[1]):
+            begin, stop = block.indptr[column], block.indptr[column + 1]
+            rows, values = block.indices[begin:stop], block.data[begin:stop]
+            keep = (rows != start + column) & (values > 0)
+            rows, values = rows[keep], values[keep]
+            if len(values) > k:
+                best = np.argpartition(-values, k - 1)[:k]
+                rows, values = rows[best], values[best]
+            order = np.argsort(-values, kind="stable")
+            neighbors[start + column, :len(order)] = movies[rows[order]]
+            scores[start + column, :len(order)] = values[order]
+
+    return ItemNeighbors(movies.astype(np.int64), neighbors, scores)
+
+
+def _runs(matrix: sparse.csc_matrix, chunk_nnz: int) -> List[Tuple[int, int]]:
+    """Splits the movies into runs whose products have at most `chunk_nnz` non-zeros.
+
+    The column of movie j in `Mᵀ M` has at most one entry per movie co-rated with it,
+    that is the sum of the rating counts of its raters, capped at the number of movies.
+
+    Args:
+        matrix (sparse.csc_matrix): The users x movies ratings matrix.
+        chunk_nnz (int): Bound on the non-zeros of each run.
+
+    Returns:
+        List[Tuple[int, int]]: The `(start, end)` positions of every run.
+    """
+    ratings_per_user = np.bincount(matrix.indices, minlength=matrix.shape[0])
+    co_ratings = np.concatenate(([0], np.cumsum(ratings_per_user[matrix.indices], dtype=np.int64)))
+    costs = np.minimum(np.diff(co_ratings[matrix.indptr]), matrix.shape[1])
+    bounds = np.concatenate(([0], np.cumsum(costs)))
+    runs, start = [], 0
+    while start < matrix.shape[1]:
+        end = int(np.searchsorted(bounds, bounds[start] + chunk_nnz, side="right")) - 1
+        end = max(end, start + 1)
+        runs.append((start, end))
+        start = end
+    return runs
+
+
+_neighbors: Optional[ItemNeighbors] = None
+_neighbors_key: Optional[Tuple[str, float]] = None
+_neighbors_lock = threading.Lock()
+
+
+def get_item_neighbors(path: str = CF_NEIGHBORS_PATH) -> Optional[ItemNeighbors]:
+    """Returns the persisted neighbour lists, reloading them when the file changes."""
+    global _neighbors, _neighbors_key
+    with _neighbors_lock:
+        if not os.path.exists(path):
+            return None
+        key = (path, os.path.getmtime(path))
+        if _neighbors is None or key != _neighbors_key:
+            _neighbors = ItemNeighbors.load(path)
+            _neighbors_key = key
+        return _neighbors
+
+
+class SocialBasedRecommendationFetcher(RecommendationFetcher):
+    """Fetches "users who liked what you liked also liked" recommendations."""
+
+    def __init__(self, neighbors_path: str = CF_NEIGHBORS_PATH, limit: int = CARROUSSEL_LENGTH):
+        self.neighbors_path = neighbors_path
+        self.limit = limit
+
+    def fetch(
+        self, db: Session, user_id: int, seen_movie_ids: List[int]
+    ) -> Dict[str, List[schemas.RecommendationSchema]]:
+        """
+        Recommends movies from the item-item neighbours of the movies the user rated.
+
+        The neighbour lists are built offline by `build_item_neighbors` (run this module
+        as a script); at request time only the user's notes are read from the database.
+
+        Args:
+            db (Session): The database session object.
+            user_id (int): The ID of the user for whom recommendations are being made.
+            seen_movie_ids (List[int]): The IDs of the movies the user has already seen.
+
+        Returns:
+            Dict[str, List[schemas.RecommendationSchema]]: A dictionary with the `social_carousel` key.
+            If no recommendations are found, returns a message indicating no recommendations are available.
+            If an error occurs, returns a message with the error description.
+        """
+        try:
+            item_neighbors = get_item_neighbors(self.neighbors_path)
+            if item_neighbors is None:
+                return {"message": "Item neighbours have not been built yet."}
+
+            ratings = dict(
+                db.query(models.MovieUsers.movie_id, models.MovieUsers.note)
+                .filter(models.MovieUsers.user_id == user_id, models.MovieUsers.note.isnot(None))
+                .all()
+            )
+            candidates, scores = item_neighbors.score(ratings)
+            keep = (scores > 0) & ~np.isin(candidates, np.fromiter(seen_movie_ids, dtype=np.int64))
+            candidates, scores = candidates[keep], scores[keep]
+            best = candidates[np.argsort(-scores, kind="stable")[:self.limit]].tolist()
+            movies = movies_by_ids(db, best)
+
+            if not movies:
+                return {"message": "No recommendations available."}
+
+            return {
+                "social_carousel": [
+                    schemas.RecommendationSchema.from_orm(movie) for movie in movies
+                ]
+            }
+
+        except db_breaker.errors:
+            raise
+        except Exception as e:
+            return {"message": f"An error occurred: {str(e)}"}
+
+
+# Construire les voisins hors-ligne : python -m recommendations.social_based
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        item_neighbors = build_item_neighbors(*load_ratings(session))
+    item_neighbors.save()
+    print(f"Voisins calculés pour {len(item_neighbors.movie_ids)} films dans {CF_NEIGHBORS_PATH}")
@@ -0,0 +1,140 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .config import (TOP_CREDITS_ACTORS, TOP_CREDITS_BATCH_SIZE,
+                     TOP_CREDITS_JOBS)
+from .http_cache import bump_catalog_version, record_movie_updates
+
+
+def select_top_credits(db: Session, movie_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+    """Selects the top-billed actors and the important crew of some movies from `Credits`.
+
+    Only acting and `TOP_CREDITS_JOBS` credits are read, joined to their people and job
+    in the same query. The datacrawler has a copy of this function and of
+    `rebuild_top_credits` in `datacrawler/top_credits.py`: change both together.
+
+    Args:
+        db (Session): The database session.
+        movie_ids (Iterable[int]): The movies.
+
+    Returns:
+        Dict[int, List[Dict]]: The rows of `MovieTopCredits` of each movie, in rank order:
+        the first `TOP_CREDITS_ACTORS` actors by `cast_order`, then the crew by credit ID.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return {}
+    rows = db.execute(
+        select(
+            models.Credits.id_movie,
+            models.Credits.credit_id,
+            models.Credits.id_people,
+            models.Peoples.name,
+            models.Peoples.photo,
+            models.Credits.id_job,
+            models.Jobs.title,
+            models.Credits.character_name,
+            models.Credits.cast_order,
+        )
+        .join(models.Peoples, models.Credits.id_people == models.Peoples.people_id)
+        .join(models.Jobs, models.Credits.id_job == models.Jobs.job_id)
+        .where(
+            models.Credits.id_movie.in_(movie_ids),
+            models.Jobs.title.in_(("Acting",) + TOP_CREDITS_JOBS),
+        )
+        .order_by(models.Credits.id_movie, models.Credits.credit_id)
+    ).all()
+
+    actors, crew = defaultdict(list), defaultdict(list)
+    for movie_id, credit_id, people_id, name, photo, job_id, title, character_name, cast_order in rows:
+        row = {
+            "movie_id": movie_id,
+            "credit_id": credit_id,
+            "people_id": people_id,
+            "people_name": name,
+            "people_photo": photo,
+            "job_id": job_id,
+            "job_title": title,
+            "character_name": character_name,
+            "cast_order": cast_order,
+        }
+        (actors if title == "Acting" else crew)[movie_id].append(row)
+
+    top_credits = {}
+    for movie_id in movie_ids:
+        billed = sorted(
+            actors[movie_id], key=lambda row: row["cast_order"] if row["cast_order"] is not None else float("inf")
+        )
+        selected = billed[:TOP_CREDITS_ACTORS] + crew[movie_id]
+        top_credits[movie_id] = [dict(row, rank=rank) for rank, row in enumerate(selected)]
+    return top_credits
+
+
+def rebuild_top_credits(db: Session, movie_ids: Iterable[int], batch_size: int = TOP_CREDITS_BATCH_SIZE) -> int:
+    """Replaces the `MovieTopCredits` rows of some movies; called whenever their credits are ingested.
+
+    Returns:
+        int: Number of rows written.
+    """
+    movie_ids = list(movie_ids)
+    written = 0
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        rows = [row for credits in select_top_credits(db, batch).values() for row in credits]
+        db.execute(delete(models.MovieTopCredits).where(models.MovieTopCredits.movie_id.in_(batch)))
+        if rows:
+            db.execute(insert(models.MovieTopCredits), rows)
+        written += len(rows)
+        # Credited names are searchable
+        record_movie_updates(db, batch)
+    bump_catalog_version(db, "top_credits")
+    db.commit()
+    return written
+
+
+def _credit_schema(row) -> schemas.CreditSchema:
+    return schemas.CreditSchema(
+        credit_id=row["credit_id"],
+        id_movie=row["movie_id"],
+        id_people=row["people_id"],
+        id_job=row["job_id"],
+        job=schemas.JobSchema(job_id=row["job_id"], title=row["job_title"]),
+        people=schemas.PeopleSchema(
+            people_id=row["people_id"], name=row["people_name"], photo=row["people_photo"]
+        ),
+        character_name=row["character_name"],
+        cast_order=row["cast_order"],
+    )
+
+
+def get_top_credits(db: Session, movie_id: int) -> List[schemas.CreditSchema]:
+    """Returns the top credits of a movie with one query on the `MovieTopCredits` primary key.
+
+    Movies not ingested since the table was added are selected from `Credits` instead.
+    """
+    rows = (
+        db.execute(
+            select(models.MovieTopCredits.__table__)
+            .where(models.MovieTopCredits.movie_id == movie_id)
+            .order_by(models.MovieTopCredits.rank)
+        )
+        .mappings()
+        .all()
+    )
+    if not rows:
+        rows = select_top_credits(db, [movie_id])[movie_id]
+    return [_credit_schema(row) for row in rows]
+
+
+# Remplir la table pour tous les films : python -m recommendations.top_credits
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        all_movie_ids = [row[0] for row in session.query(models.Movies.movie_id).all()]
+        written = rebuild_top_credits(session, all_movie_ids)
+    print(f"{written} crédits principaux enregistrés pour {len(all_movie_ids)} films")
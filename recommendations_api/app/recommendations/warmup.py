@@ -0,0 +1,107 @@
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from .breaker import redis_breaker
+from .cache import get_cache_stats
+from .cold_start import cold_start_cache, is_cold_start
+from .config import WARMUP_TTL
+from .precomputed import precomputed_key, store_precomputed
+from .service import compute_recommendations, get_genre_ids, get_seen_movie_ids
+
+# Keys shared with the Django frontend (frontend/users/views.py), which pushes on login
+WARMUP_QUEUE_KEY = "recommendations:warmup"
+WARMUP_PENDING_KEY = "recommendations:warmup:pending:{user_id}"
+
+stats = get_cache_stats("warmup")
+
+
+def warm_user(db: Session, redis_client, user_id: int, ttl: int = WARMUP_TTL) -> bool:
+    """Computes a user's recommendations and stores them where `/recommendations/` looks first.
+
+    Args:
+        db (Session): The database session.
+        redis_client: The Redis client.
+        user_id (int): The user who just logged in.
+        ttl (int): Lifetime of the warmed payload in seconds.
+
+    Returns:
+        bool: False if the user already had a precomputed payload, True otherwise.
+    """
+    if redis_client.exists(precomputed_key(user_id)):
+        return False
+    if is_cold_start(db, user_id):
+        recommendations = cold_start_cache.get_or_compute(
+            redis_client, get_genre_ids(db, user_id), lambda: compute_recommendations(db, user_id, [])
+        )
+    else:
+        recommendations = compute_recommendations(db, user_id, get_seen_movie_ids(db, user_id))
+    store_precomputed(redis_client, {user_id: recommendations}, ttl)
+    return True
+
+
+def record_warmup_outcome(redis_client, user_id: int, served_from_cache: bool) -> None:
+    """Counts a warm hit or miss if the user's request follows a login warm-up.
+
+    A miss means the home page asked before the consumer was done.
+    """
+    if not redis_client:
+        return
+    try:
+        if not redis_client.delete(WARMUP_PENDING_KEY.format(user_id=user_id)):
+            return
+    except Exception as e:
+        redis_breaker.observe(e)
+        print(f"Erreur lors de la lecture du préchauffage dans Redis : {e}")
+        return
+    if served_from_cache:
+        stats.hit(redis_client)
+    else:
+        stats.miss(redis_client)
+
+
+class WarmupConsumer(threading.Thread):
+    """Background thread popping the login warm-up queue.
+
+    Every API worker runs one; `BRPOP` hands each queued user to a single consumer.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        redis_factory: Callable[[], Optional[object]],
+        timeout: int = 5,
+    ):
+        super().__init__(name="recommendations-warmup", daemon=True)
+        self.session_factory = session_factory
+        self.redis_factory = redis_factory
+        self.timeout = timeout
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        redis_client = None
+        while not self._stopped.is_set():
+            if redis_client is None:
+                redis_client = self.redis_factory()
+                if redis_client is None:
+                    self._stopped.wait(self.timeout)
+                    continue
+            try:
+                self.consume_one(redis_client)
+            except Exception as e:
+                print(f"Erreur lors du préchauffage des recommandations : {e}")
+                redis_client = None
+
+    def consume_one(self, redis_client) -> Optional[int]:
+        """Waits up to `timeout` seconds for a queued user and warms their recommendations."""
+        item = redis_client.brpop(WARMUP_QUEUE_KEY, timeout=self.timeout)
+        if item is None:
+            return None
+        user_id = int(item[1])
+        with self.session_factory() as db:
+            warm_user(db, redis_client, user_id)
+        return user_id
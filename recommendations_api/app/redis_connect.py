@@ -1,6 +1,8 @@
 import redis
 from dotenv import load_dotenv
 import os
+from recommendations.breaker import redis_breaker
+from recommendations.config import REDIS_TIMEOUT_SECONDS
 
 load_dotenv()
 
@@ -8,18 +10,31 @@ HOST = os.getenv("REDIS_HOST")
 PORT = os.getenv("REDIS_PORT")
 
 def connect_to_redis():
+    # Disjoncteur ouvert : Redis est considéré comme indisponible sans attendre de délai de connexion
+    if not redis_breaker.allow():
+        return None
     try:
         # Connexion à la base de données Redis
-        client = redis.Redis(host=HOST, port=PORT, password=None)
+        client = redis.Redis(
+            host=HOST,
+            port=PORT,
+            password=None,
+            socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+            socket_timeout=REDIS_TIMEOUT_SECONDS,
+        )
         
         # Vérification de la connexion
         if client.ping():
+            redis_breaker.record_success()
             print("Connexion réussie à la base de données Redis")
+            return client
         else:
             print("Échec de la connexion à la base de données Redis")
     
     except Exception as e:
         print(f"Erreur lors de la connexion à Redis : {e}")
+    redis_breaker.record_failure()
+    return None
 
 if __name__ == "__main__":
     connect_to_redis()
\ No newline at end of file
@@ -0,0 +1,246 @@
+# conftest.py
+
+import os
+import pickle
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+
+# Read by recommendations.config: the tests share one in-memory connection across threads
+os.environ.setdefault("PIPELINE_WORKERS", "1")
+
+from recommendations import models
+from recommendations.autocomplete import invalidate_autocomplete
+from recommendations.breaker import all_breakers
+from recommendations.catalog import invalidate_catalog
+from recommendations.cold_start import cold_start_cache
+from recommendations.demographic_based import invalidate_demographic_index
+from recommendations.fuzzy_index import invalidate_fuzzy_index
+from recommendations.http_cache import body_cache, catalog_version
+from recommendations.metadata_based import invalidate_metadata_index
+from recommendations.people_index import invalidate_people_index
+from recommendations.search_index import invalidate_search_index
+from recommendations.service import set_pipeline
+
+# main.py creates its engine at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("WARMUP_CONSUMER", "0")
+os.environ.setdefault("SNAPSHOT_REFRESHER", "0")
+os.environ.setdefault("INDEX_WARMUP", "0")
+
+# Small catalog: movie_id -> (title, genre ids, embedding, vote_average, vote_count, revenue)
+MOVIES = {
+    1: ("Alien", [1, 2], [1.0, 0.0, 0.0], 8.5, 9000, 1.0e8),
+    2: ("Aliens", [1, 2], [0.9, 0.1, 0.0], 8.4, 8000, 1.3e8),
+    3: ("Amélie", [3, 4], [0.0, 1.0, 0.0], 8.3, 7000, 1.7e8),
+    4: ("Interstellar", [2, 5], [0.7, 0.0, 0.7], 8.6, 30000, 7.0e8),
+    5: ("Notting Hill", [3, 4], [0.0, 0.9, 0.1], 7.2, 5000, 3.6e8),
+    6: ("The Thing", [1], None, 8.2, 6000, 2.0e7),
+}
+GENRES = {1: "Horror", 2: "Science Fiction", 3: "Comedy", 4: "Romance", 5: "Drama"}
+JOBS = {1: "Acting", 2: "Director", 3: "Producer", 4: "Grip"}
+PEOPLES = {
+    10: "Sigourney Weaver",
+    11: "Ridley Scott",
+    12: "John Carpenter",
+    13: "Kurt Russell",
+    14: "Tom Skerritt",
+    15: "Walter Hill",
+    16: "Audrey Tautou",
+}
+# credit_id -> (movie_id, people_id, job_id, character_name, cast_order)
+CREDITS = {
+    100: (1, 10, 1, "Ripley", 0),
+    101: (1, 14, 1, "Dallas", 1),
+    102: (1, 11, 2, None, None),
+    103: (1, 15, 3, None, None),
+    104: (1, 16, 4, None, None),
+    105: (2, 10, 1, "Ripley", 0),
+    106: (2, 15, 3, None, None),
+    107: (6, 13, 1, "MacReady", 0),
+    108: (6, 14, 1, "Garry", 1),
+    109: (6, 12, 2, None, None),
+    110: (3, 16, 1, "Amélie Poulain", 0),
+}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+
+    for genre_id, name in GENRES.items():
+        session.add(models.Genres(genre_id=genre_id, name=name))
+    for movie_id, (title, genre_ids, embedding, average, count, revenue) in MOVIES.items():
+        session.add(
+            models.Movies(
+                movie_id=movie_id,
+                title=title,
+                release_date=date(1980 + movie_id * 5, 1, 1),
+                vote_average=average,
+                vote_count=count,
+                revenue=revenue,
+                runtime=90 + movie_id * 10,
+                embeddings=pickle.dumps(np.array(embedding, dtype=np.float32))
+                if embedding
+                else None,
+            )
+        )
+        for genre_id in genre_ids:
+            session.add(models.MovieGenres(movie_id=movie_id, genre_id=genre_id))
+    for job_id, title in JOBS.items():
+        session.add(models.Jobs(job_id=job_id, title=title))
+    for people_id, name in PEOPLES.items():
+        session.add(models.Peoples(people_id=people_id, name=name))
+    for credit_id, (movie_id, people_id, job_id, character_name, cast_order) in CREDITS.items():
+        session.add(
+            models.Credits(
+                credit_id=credit_id,
+                id_movie=movie_id,
+                id_people=people_id,
+                id_job=job_id,
+                character_name=character_name,
+                cast_order=cast_order,
+            )
+        )
+    session.add(models.Users(user_id=1, nom="Ripley", birthday=date(1990, 5, 1), sexe="F"))
+    session.add(models.Users(user_id=2, nom="Dallas", birthday=date(1960, 3, 1), sexe="M"))
+    session.add(models.UserGenre(user_id=1, genre_id=1))
+    session.add(models.UserGenre(user_id=1, genre_id=2))
+    session.add(models.UserGenre(user_id=2, genre_id=3))
+    session.add(models.MovieUsers(user_id=1, movie_id=1, note=5))
+    session.add(models.MovieUsers(user_id=2, movie_id=3, note=5))
+    session.add(models.MovieUsers(user_id=2, movie_id=1, note=2))
+    session.commit()
+    invalidate_catalog()
+    invalidate_metadata_index()
+    invalidate_demographic_index()
+    invalidate_search_index()
+    invalidate_autocomplete()
+    invalidate_fuzzy_index()
+    invalidate_people_index()
+    set_pipeline(None)
+    cold_start_cache.clear()
+    catalog_version.invalidate()
+    body_cache.clear()
+    for breaker in all_breakers():
+        breaker.reset()
+
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the API uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def incr(self, key, amount=1):
+        self.data[key] = str(int(self.data.get(key, 0)) + amount).encode()
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def lpush(self, key, *values):
+        self.data.setdefault(key, []).extend(str(value).encode() for value in values)
+        return len(self.data[key])
+
+    def brpop(self, key, timeout=0):
+        # Never blocks: an empty list times out immediately
+        if self.data.get(key):
+            return key.encode(), self.data[key].pop(0)
+        return None
+
+    def setbit(self, key, offset, value):
+        bitmap = bytearray(self.data.get(key, b""))
+        if len(bitmap) <= offset // 8:
+            bitmap.extend(bytes(offset // 8 + 1 - len(bitmap)))
+        mask = 0x80 >> (offset % 8)
+        previous = int(bool(bitmap[offset // 8] & mask))
+        bitmap[offset // 8] = bitmap[offset // 8] | mask if value else bitmap[offset // 8] & ~mask
+        self.data[key] = bytes(bitmap)
+        return previous
+
+    def getbit(self, key, offset):
+        bitmap = self.data.get(key, b"")
+        return int(offset // 8 < len(bitmap) and bool(bitmap[offset // 8] & (0x80 >> (offset % 8))))
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them against the FakeRedis on `execute`."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def client(db, redis_client):
+    from database import get_db
+    from main import app, get_current_user, TokenData
+    from redis_connect import connect_to_redis
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[connect_to_redis] = lambda: redis_client
+    test_client = TestClient(app)
+
+    def login(user_id):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(user_id=user_id)
+
+    test_client.login = login
+    try:
+        yield test_client
+    finally:
+        app.dependency_overrides.clear()
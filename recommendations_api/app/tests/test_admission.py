@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import jwt
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from recommendations.admission import (AdmissionControlMiddleware,
+                                       AdmissionController)
+from recommendations.precomputed import store_precomputed
+
+
+def test_controller_sheds_after_the_queue_time_limit():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue_seconds=0.01)
+        first = await controller.acquire()
+        second = await controller.acquire()
+        await controller.release()
+        third = await controller.acquire()
+        return first, second, third, controller.snapshot()
+
+    first, second, third, stats = asyncio.run(scenario())
+
+    assert (first, second, third) == (True, False, True)
+    assert stats["admitted"] == 2
+    assert stats["shed"] == 1
+
+
+def test_middleware_serves_admitted_requests_and_sheds_the_rest():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.1)
+        return {"computed": True}
+
+    async def shed(scope):
+        return JSONResponse({"shed": True}, status_code=503, headers={"Retry-After": "1"})
+
+    controller = AdmissionController(max_in_flight=2, max_queue_seconds=0.02)
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, paths=["/slow"], shed=shed)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/slow") for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+
+    assert sorted(response.status_code for response in responses) == [200, 200, 503, 503, 503]
+    assert controller.snapshot()["in_flight"] == 0
+
+
+def _token(user_id):
+    return "Bearer " + jwt.encode({"sub": str(user_id)}, "secret", algorithm="HS256")
+
+
+def test_shed_recommendations_serve_the_stale_precomputed_payload(db, client, redis_client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "SECRET_KEY", "secret")
+    monkeypatch.setattr(main, "ALGORITHM", "HS256")
+    monkeypatch.setattr(main, "connect_to_redis", lambda: redis_client)
+    monkeypatch.setattr(main.admission_controller, "max_in_flight", 0)
+    monkeypatch.setattr(main.admission_controller, "max_queue_seconds", 0.0)
+    store_precomputed(redis_client, {1: {"hybrid_carousel": [{"movie_id": 4}]}})
+
+    response = client.get("/recommendations/", headers={"Authorization": _token(1)})
+
+    assert response.json() == {"hybrid_carousel": [{"movie_id": 4}]}
+    assert response.headers["X-Recommendations-Source"] == "stale"
+
+
+def test_shed_recommendations_without_fallback_return_503(db, client, redis_client, tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(main, "SECRET_KEY", "secret")
+    monkeypatch.setattr(main, "ALGORITHM", "HS256")
+    monkeypatch.setattr(main, "connect_to_redis", lambda: redis_client)
+    monkeypatch.setattr(main.admission_controller, "max_in_flight", 0)
+    monkeypatch.setattr(main.admission_controller, "max_queue_seconds", 0.0)
+
+    response = client.get("/recommendations/", headers={"Authorization": _token(2)})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_shed_recommendations_require_authentication(db, client, redis_client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "SECRET_KEY", "secret")
+    monkeypatch.setattr(main, "ALGORITHM", "HS256")
+    monkeypatch.setattr(main, "connect_to_redis", lambda: redis_client)
+    monkeypatch.setattr(main.admission_controller, "max_in_flight", 0)
+    monkeypatch.setattr(main.admission_controller, "max_queue_seconds", 0.0)
+
+    assert client.get("/recommendations/").status_code == 403
+    assert client.get("/recommendations/", headers={"Authorization": "Bearer forged"}).status_code == 403
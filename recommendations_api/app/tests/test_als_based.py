@@ -0,0 +1,78 @@
+import numpy as np
+
+from recommendations.als_based import ALSModel, ALSRecommendationFetcher
+
+# user_id, movie_id, note: two taste groups, {1, 2} and {3, 5}
+RATINGS = [
+    (1, 1, 5), (1, 2, 5), (1, 3, 1),
+    (2, 1, 4), (2, 2, 5), (2, 5, 2),
+    (3, 1, 5), (3, 2, 4), (3, 3, 2),
+    (4, 3, 5), (4, 5, 5), (4, 1, 1),
+    (5, 3, 4), (5, 5, 5), (5, 2, 2),
+]
+
+
+def _model(**kwargs):
+    users, movies, notes = (np.array(column) for column in zip(*RATINGS))
+    return ALSModel.train(users, movies, notes.astype(np.float32), factors=4, iterations=15, **kwargs)
+
+
+def test_train_fits_the_known_notes():
+    model = _model()
+
+    predictions = model.user_factors @ model.item_factors.T + model.offset
+    assert predictions[0, 0] > predictions[0, 2]
+    assert predictions[3, 3] > predictions[3, 0]
+
+
+def test_fold_in_matches_the_taste_group():
+    model = _model()
+
+    user_vector = model.fold_in({1: 5})
+    scores = model.scores(user_vector)
+
+    assert scores[1] > scores[3]
+
+
+def test_implicit_training_and_fold_in():
+    model = _model(implicit=True)
+
+    scores = model.scores(model.fold_in({3: 5}))
+
+    assert model.movie_ids[np.argmax(scores)] == 3
+
+
+def test_save_and_mmap_load(tmp_path):
+    _model().save(str(tmp_path))
+
+    model = ALSModel.load(str(tmp_path))
+
+    assert isinstance(model.item_factors, np.memmap)
+    assert model.movie_ids.tolist() == [1, 2, 3, 5]
+    assert model.fold_in({42: 5}) is None
+
+
+def test_fold_in_solves_the_ridge_problem_of_the_known_movies():
+    rng = np.random.default_rng(0)
+    movie_ids = np.arange(0, 2000, 2, dtype=np.int64)
+    item_factors = rng.normal(size=(1000, 8)).astype(np.float32)
+    model = ALSModel(np.arange(1), movie_ids, np.zeros((1, 8), np.float32), item_factors, implicit=False)
+    ratings = {int(movie_id): float(rng.integers(1, 6)) for movie_id in rng.choice(movie_ids, 30, replace=False)}
+
+    # Odd IDs are not in the model and are ignored
+    user_vector = model.fold_in({**ratings, 1: 5.0}, regularization=0.1)
+
+    fixed = item_factors[np.searchsorted(movie_ids, list(ratings))]
+    notes = np.array(list(ratings.values()))
+    expected = np.linalg.solve(fixed.T @ fixed + 0.1 * len(notes) * np.eye(8), fixed.T @ notes)
+    assert np.allclose(user_vector, expected, atol=1e-4)
+
+
+def test_fetch_returns_als_carousel(db, tmp_path):
+    _model().save(str(tmp_path))
+
+    result = ALSRecommendationFetcher(str(tmp_path)).fetch(db, 1, [1])
+
+    assert [movie.movie_id for movie in result["als_carousel"]][0] == 2
+    assert len(result["als_carousel"]) > 1
+    assert len(ALSRecommendationFetcher(str(tmp_path), limit=1).fetch(db, 1, [1])["als_carousel"]) == 1
@@ -0,0 +1,65 @@
+import random
+
+from recommendations.autocomplete import TitleAutocomplete
+from recommendations.search_index import normalize
+
+
+def _titles(autocomplete, query, limit=10):
+    return [suggestion["title"] for suggestion in autocomplete.complete(query, limit)]
+
+
+def test_title_starts_come_before_word_matches_then_popularity():
+    movies = [("The Thing", 10.0), ("Thing", 1.0), ("Things to Come", 5.0), ("Heat", 20.0)]
+    autocomplete = TitleAutocomplete(
+        [{"movie_id": i, "title": title, "release_date": None, "poster_path": None} for i, (title, _) in enumerate(movies)],
+        [popularity for _, popularity in movies],
+    )
+
+    assert _titles(autocomplete, "thi") == ["Things to Come", "Thing", "The Thing"]
+    assert _titles(autocomplete, "Things  T") == ["Things to Come"]
+    assert _titles(autocomplete, "the t") == ["The Thing"]
+    assert _titles(autocomplete, "th", limit=1) == ["The Thing"]
+    assert _titles(autocomplete, "x") == []
+
+
+def test_autocomplete_endpoint_makes_no_query_once_built(db, client, monkeypatch):
+    first = client.get("/movies/autocomplete", params={"q": "al"})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no query expected")
+
+    monkeypatch.setattr(db, "query", fail)
+
+    assert [movie["title"] for movie in first.json()] == ["Alien", "Aliens"]
+    assert client.get("/movies/autocomplete", params={"q": "Ame"}).json() == [
+        {"movie_id": 3, "title": "Amélie", "release_date": "1995-01-01", "poster_path": None}
+    ]
+    assert [movie["title"] for movie in client.get("/movies/autocomplete", params={"q": "aliens"}).json()] == ["Aliens"]
+    assert client.get("/movies/autocomplete", params={"q": "thin"}).json()[0]["movie_id"] == 6
+    assert client.get("/movies/autocomplete", params={"q": "al", "limit": 50}).status_code == 422
+
+
+def test_completion_matches_a_full_scan_of_the_titles():
+    rng = random.Random(0)
+    words = ["".join(rng.choice("abcde") for _ in range(rng.randint(1, 4))) for _ in range(50)]
+    suggestions = [
+        {"movie_id": i, "title": " ".join(rng.sample(words, rng.randint(1, 4))), "release_date": None, "poster_path": None}
+        for i in range(1000)
+    ]
+    popularity = [rng.random() for _ in suggestions]
+    autocomplete = TitleAutocomplete(suggestions, popularity)
+
+    def scan(prefix):
+        scores = {}
+        for suggestion, score in zip(suggestions, popularity):
+            title_words = normalize(suggestion["title"]).split(" ")
+            starts = [start for start in range(len(title_words)) if " ".join(title_words[start:]).startswith(prefix)]
+            if starts:
+                scores[suggestion["movie_id"]] = score + (1.0 if starts[0] == 0 else 0.0)
+        return sorted(scores, key=scores.get, reverse=True)[:10]
+
+    for _ in range(100):
+        title_words = normalize(rng.choice(suggestions)["title"]).split(" ")
+        key = " ".join(title_words[rng.randrange(len(title_words)):])
+        prefix = normalize(key[: rng.randint(1, len(key))])
+        assert [suggestion["movie_id"] for suggestion in autocomplete.complete(prefix)] == scan(prefix)
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+
+import batch_recommendations
+from recommendations.catalog import MovieCatalog, get_catalog, install_catalog
+from recommendations.precomputed import (get_precomputed, precomputed_key,
+                                         store_precomputed)
+
+
+def test_catalog_save_and_memory_mapped_load(db, tmp_path):
+    catalog = MovieCatalog.from_db(db)
+    catalog.save(str(tmp_path))
+
+    loaded = MovieCatalog.load(str(tmp_path))
+
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert np.array_equal(loaded.embeddings, catalog.embeddings)
+    assert loaded.genre_index == catalog.genre_index
+    install_catalog(loaded)
+    assert get_catalog(db, max_age=0) is loaded
+
+
+def test_process_chunk_stores_payloads_in_bulk(db, redis_client, monkeypatch):
+    monkeypatch.setattr(batch_recommendations, "SessionLocal", lambda: db)
+    monkeypatch.setattr(batch_recommendations, "_worker_redis", redis_client)
+
+    stored, failed = batch_recommendations._process_chunk([1, 2])
+
+    assert (stored, failed) == (2, 0)
+    payload = json.loads(redis_client.get(precomputed_key(1)))
+    assert 1 not in [movie["movie_id"] for movie in payload["hybrid_carousel"]]
+
+
+def test_active_user_chunks_skips_cold_start_users(db, monkeypatch):
+    monkeypatch.setattr(batch_recommendations, "SessionLocal", lambda: db)
+
+    assert list(batch_recommendations.active_user_chunks(chunk_size=1)) == [[1], [2]]
+
+
+def test_endpoint_serves_precomputed_payload(client, redis_client):
+    payload = {"trending_carousel": [{"movie_id": 1, "title": "Alien"}, {"movie_id": 4, "title": "Interstellar"}]}
+    store_precomputed(redis_client, {2: payload})
+
+    client.login(2)
+    result = client.get("/recommendations/").json()
+
+    # Movie 1 was rated by user 2 after the batch ran
+    assert result == {"trending_carousel": [{"movie_id": 4, "title": "Interstellar"}]}
+    assert get_precomputed(redis_client, 42) is None
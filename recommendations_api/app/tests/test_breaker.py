@@ -0,0 +1,155 @@
+import json
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.exc import OperationalError
+
+from recommendations.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                     CircuitOpenError, db_breaker,
+                                     redis_breaker)
+from recommendations.catalog import get_catalog
+from recommendations.pipeline import (FetcherGenerator, RecommendationContext,
+                                      RecommendationPipeline)
+from recommendations.precomputed import get_precomputed
+from recommendations.service import set_pipeline
+from recommendations.snapshot import (build_snapshot, get_snapshot,
+                                      save_snapshot)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("recommendations.breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("backend", failure_threshold=2, reset_seconds=10)
+
+    _open(breaker)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot() == {"state": CLOSED, "failures": 0, "rejected": 2}
+
+
+def test_guard_counts_only_backend_errors():
+    breaker = CircuitBreaker("database", errors=(OperationalError,), failure_threshold=1)
+
+    try:
+        with breaker.guard():
+            raise ValueError("bug")
+    except ValueError:
+        pass
+    assert breaker.state == CLOSED
+
+    try:
+        with breaker.guard():
+            raise OperationalError("SELECT 1", {}, Exception("gone away"))
+    except OperationalError:
+        pass
+    assert breaker.state == OPEN
+
+    try:
+        with breaker.guard():
+            raise AssertionError("must not run")
+    except CircuitOpenError:
+        pass
+
+
+def test_snapshot_holds_trending_and_top_per_genre(db, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+
+    save_snapshot(build_snapshot(db, get_catalog(db)), path)
+    carousels = get_snapshot(path)
+
+    assert carousels["trending_carousel"][0]["movie_id"] == 6
+    assert [movie["movie_id"] for movie in carousels["genre_Drama"]] == [4]
+    assert json.load(open(path))["carousels"] == carousels
+
+
+def test_endpoint_serves_the_snapshot_while_the_database_breaker_is_open(db, client, tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot.json")
+    save_snapshot({"trending_carousel": [{"movie_id": 4}]}, path)
+    monkeypatch.setattr("main.SNAPSHOT_PATH", path)
+    _open(db_breaker)
+
+    client.login(1)
+    response = client.get("/recommendations/")
+
+    assert response.json() == {"trending_carousel": [{"movie_id": 4}]}
+    assert response.headers["X-Recommendations-Source"] == "snapshot"
+    assert client.get("/metrics/breakers").json()["database"]["state"] == OPEN
+
+
+def test_endpoint_returns_503_without_snapshot(db, client, tmp_path, monkeypatch):
+    monkeypatch.setattr("main.SNAPSHOT_PATH", str(tmp_path / "missing.json"))
+    _open(db_breaker)
+
+    client.login(1)
+    response = client.get("/recommendations/")
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_pipeline_reports_messages_instead_of_serving_them(db):
+    pipeline = RecommendationPipeline(
+        [
+            FetcherGenerator("ok", lambda c: {"ok_carousel": [{"movie_id": 1}]}),
+            FetcherGenerator("failing", lambda c: {"message": "An error occurred: boom"}),
+        ]
+    )
+
+    recommendations = pipeline.run(RecommendationContext(db=db, user_id=1, seen_movie_ids=[]))
+
+    assert recommendations == {"ok_carousel": [{"movie_id": 1}]}
+    assert pipeline.stage_stats()["failing"]["messages"] == 1
+
+
+def test_generators_losing_the_database_open_the_circuit(db, client, tmp_path, monkeypatch):
+    def lost(context):
+        raise OperationalError("SELECT 1", {}, Exception("gone away"))
+
+    path = str(tmp_path / "snapshot.json")
+    save_snapshot({"trending_carousel": [{"movie_id": 4}]}, path)
+    monkeypatch.setattr("main.SNAPSHOT_PATH", path)
+    set_pipeline(RecommendationPipeline([FetcherGenerator("a", lost), FetcherGenerator("b", lost)]))
+
+    client.login(1)
+    for _ in range(db_breaker.failure_threshold):
+        response = client.get("/recommendations/")
+
+    assert response.headers["X-Recommendations-Source"] == "snapshot"
+    assert db_breaker.state == OPEN
+
+
+def test_one_generator_losing_the_database_is_reported_not_raised(db):
+    def lost(context):
+        raise OperationalError("SELECT 1", {}, Exception("gone away"))
+
+    pipeline = RecommendationPipeline(
+        [FetcherGenerator("ok", lambda c: {"ok_carousel": [{"movie_id": 1}]}), FetcherGenerator("lost", lost)]
+    )
+
+    recommendations = pipeline.run(RecommendationContext(db=db, user_id=1, seen_movie_ids=[]))
+
+    assert recommendations == {"ok_carousel": [{"movie_id": 1}]}
+    assert pipeline.stage_stats()["lost"]["messages"] == 1
+
+
+def test_redis_errors_after_connecting_open_the_circuit():
+    class LostRedis:
+        def get(self, key):
+            raise RedisConnectionError("Connection reset by peer")
+
+    for _ in range(redis_breaker.failure_threshold):
+        assert get_precomputed(LostRedis(), 1) is None
+
+    assert redis_breaker.state == OPEN
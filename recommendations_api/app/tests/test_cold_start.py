@@ -0,0 +1,105 @@
+import json
+from datetime import date
+
+from recommendations import models
+from recommendations.cache import get_cache_stats
+from recommendations.cold_start import (ColdStartCache, cold_start_key,
+                                        filter_seen, is_cold_start)
+from recommendations.schemas import RecommendationSchema
+
+
+def test_cold_start_key_is_canonical():
+    assert cold_start_key([28, 12, 35]) == cold_start_key([35, 28, 12, 12])
+    assert cold_start_key([28, 12]) != cold_start_key([28, 12, 35])
+
+
+def test_is_cold_start_ignores_saved_movies(db):
+    db.add(models.Users(user_id=3))
+    db.add(models.MovieUsers(user_id=3, movie_id=2, note=None))
+    db.commit()
+
+    assert is_cold_start(db, 3)
+    assert not is_cold_start(db, 1)
+
+
+def test_filter_seen_drops_emptied_carousels():
+    payload = {
+        "trending_carousel": [{"movie_id": 1}, {"movie_id": 2}],
+        "genre_Horror": [{"movie_id": 1}],
+        "message": "No recommendations available.",
+    }
+
+    assert filter_seen(payload, [1]) == {
+        "trending_carousel": [{"movie_id": 2}],
+        "message": "No recommendations available.",
+    }
+
+
+def test_payloads_are_stored_as_plain_json():
+    payload = ColdStartCache().set(None, [1], {
+        "trending_carousel": [RecommendationSchema(movie_id=1, title="Alien", release_date=date(1979, 5, 25))],
+        "message": "No recommendations available.",
+    })
+
+    assert payload == {
+        "trending_carousel": [
+            {"movie_id": 1, "title": "Alien", "release_date": "1979-05-25", "vote_average": None, "backdrop_path": None}
+        ],
+        "message": "No recommendations available.",
+    }
+
+
+def test_get_or_compute_shares_results_across_workers(redis_client):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"trending_carousel": [RecommendationSchema(movie_id=1, title="Alien")]}
+
+    first, second = ColdStartCache(), ColdStartCache()
+    first.get_or_compute(redis_client, [2, 1], compute)
+    payload = second.get_or_compute(redis_client, [1, 2], compute)
+
+    assert len(calls) == 1
+    assert payload["trending_carousel"][0]["title"] == "Alien"
+    assert json.loads(redis_client.get(cold_start_key([1, 2])))["trending_carousel"][0]["movie_id"] == 1
+
+
+def test_new_users_with_the_same_genres_share_one_result(db, client, redis_client):
+    stats = get_cache_stats("cold_start")
+    hits, misses = stats.hits, stats.misses
+    for user_id in (3, 4):
+        db.add(models.Users(user_id=user_id))
+        db.add(models.UserGenre(user_id=user_id, genre_id=3))
+        db.add(models.UserGenre(user_id=user_id, genre_id=4))
+    db.add(models.MovieUsers(user_id=4, movie_id=5, note=None))
+    db.commit()
+
+    client.login(3)
+    first = client.get("/recommendations/").json()
+    client.login(4)
+    second = client.get("/recommendations/").json()
+
+    assert (stats.hits - hits, stats.misses - misses) == (1, 1)
+    assert 5 in [movie["movie_id"] for movie in first["hybrid_carousel"]]
+    assert 5 not in [movie["movie_id"] for movie in second["hybrid_carousel"]]
+    metrics = client.get("/metrics/cache").json()
+    assert metrics["cold_start"]["shared"]["hits"] == 1
+
+
+def test_cold_start_users_with_the_same_genres_keep_their_own_demographic_carousel(db, client, redis_client):
+    db.add(models.Users(user_id=3, birthday=date(1990, 1, 1), sexe="F"))
+    db.add(models.Users(user_id=4, birthday=date(1960, 1, 1), sexe="M"))
+    for user_id in (3, 4):
+        db.add(models.UserGenre(user_id=user_id, genre_id=3))
+    db.commit()
+
+    client.login(3)
+    first = client.get("/recommendations/").json()
+    client.login(4)
+    second = client.get("/recommendations/").json()
+
+    # Ripley, born in 1990, loves Alien; Dallas, born in 1960, loves Amélie
+    assert first["demographic_carousel"][0]["movie_id"] == 1
+    assert second["demographic_carousel"][0]["movie_id"] == 3
+    assert "demographic_carousel" not in json.loads(redis_client.get(cold_start_key([3])))
@@ -0,0 +1,45 @@
+def _pages(client, url):
+    ids, cursor = [], None
+    while True:
+        page = client.get(url, params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        ids.append([item["credit_id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_credits_are_paginated_by_job_cast_order_and_id(db, client):
+    assert _pages(client, "/movies/1/credits") == [[100, 101], [102, 104], [103]]
+
+
+def test_credits_job_filter_and_compact_shape(db, client):
+    page = client.get("/movies/1/credits", params={"job": "Acting"}).json()
+
+    assert page == {
+        "items": [
+            {
+                "credit_id": 100,
+                "people_id": 10,
+                "name": "Sigourney Weaver",
+                "photo": None,
+                "job": "Acting",
+                "character_name": "Ripley",
+                "cast_order": 0,
+            },
+            {
+                "credit_id": 101,
+                "people_id": 14,
+                "name": "Tom Skerritt",
+                "photo": None,
+                "job": "Acting",
+                "character_name": "Dallas",
+                "cast_order": 1,
+            },
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_credits_reject_invalid_cursor_and_limit(db, client):
+    assert client.get("/movies/1/credits", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/movies/1/credits", params={"limit": 0}).status_code == 422
@@ -0,0 +1,60 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from recommendations import models
+from recommendations.demographic_based import (DemographicIndex,
+                                               DemographicRecommendationFetcher,
+                                               age_band, get_demographic_index,
+                                               segment_chain)
+
+
+def test_age_band_uses_the_birthday():
+    today = date(2024, 6, 1)
+
+    assert age_band(date(2006, 6, 2), today) == 0
+    assert age_band(date(2006, 6, 1), today) == 1
+    assert age_band(date(1950, 1, 1), today) == 6
+    assert age_band(None, today) is None
+
+
+def test_segment_chain_broadens_the_segment():
+    assert segment_chain(2, "F") == [(2, "F"), (2, None), (None, "F"), (None, None)]
+    assert segment_chain(None, None) == [(None, None)]
+
+
+def test_index_ranks_movies_per_segment(db):
+    index = DemographicIndex.from_db(db)
+
+    band = age_band(date(1960, 3, 1), date.today())
+    assert index.rankings[(band, "M")].tolist() == [3, 1]
+    assert index.rankings[(None, None)].tolist()[0] in (1, 3)
+    assert index.segment_of(2) == (band, "M")
+    assert index.segment_of(42) is None
+
+
+def test_fetch_serves_segment_without_sql(db):
+    get_demographic_index(db)
+    queries = []
+
+    def listener(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = DemographicRecommendationFetcher().fetch(db, 2, [3])
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert [movie.title for movie in result["demographic_carousel"]] == ["Alien"]
+    assert queries == []
+
+
+def test_fetch_looks_up_new_users(db):
+    get_demographic_index(db)
+    db.add(models.Users(user_id=3, nom="Kane", birthday=date(1962, 1, 1), sexe="M"))
+    db.commit()
+
+    result = DemographicRecommendationFetcher().fetch(db, 3, [])
+
+    assert [movie.title for movie in result["demographic_carousel"]][0] == "Amélie"
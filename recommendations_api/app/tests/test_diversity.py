@@ -0,0 +1,49 @@
+import numpy as np
+
+from recommendations.catalog import MovieCatalog
+from recommendations.diversity import carousel_rank, diversify, mmr_order
+from recommendations.schemas import RecommendationSchema
+
+
+def _carousel(*movie_ids):
+    return [RecommendationSchema(movie_id=movie_id, title=f"Movie {movie_id}") for movie_id in movie_ids]
+
+
+def test_carousel_rank_matches_prefixes():
+    assert carousel_rank("hybrid_carousel") < carousel_rank("movie_Alien")
+    assert carousel_rank("genre_Horror") < carousel_rank("trending_carousel")
+    assert carousel_rank("message") == carousel_rank("unknown")
+
+
+def test_mmr_order_spreads_near_duplicates():
+    embeddings = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.9, 0.8], dtype=np.float32)
+
+    assert mmr_order(embeddings, relevance, lambda_=0.5).tolist() == [0, 2, 1]
+    assert mmr_order(embeddings, relevance, lambda_=1.0).tolist() == [0, 1, 2]
+
+
+def test_diversify_removes_duplicates_in_priority_order(db):
+    catalog = MovieCatalog.from_db(db)
+    recommendations = {
+        "genre_Horror": _carousel(1, 2, 6),
+        "trending_carousel": _carousel(4, 1, 2),
+        "hybrid_carousel": _carousel(2, 5),
+        "movie_Alien": _carousel(6, 2),
+        "message": "No preferred genres found for this user.",
+    }
+
+    result = diversify(recommendations, catalog)
+
+    assert list(result) == [
+        "genre_Horror",
+        "trending_carousel",
+        "hybrid_carousel",
+        "movie_Alien",
+        "message",
+    ]
+    assert [movie.movie_id for movie in result["hybrid_carousel"]] == [2, 5]
+    assert [movie.movie_id for movie in result["genre_Horror"]] == [1]
+    assert [movie.movie_id for movie in result["trending_carousel"]] == [4]
+    assert [movie.movie_id for movie in result["movie_Alien"]] == [6]
+    assert result["message"] == recommendations["message"]
@@ -0,0 +1,61 @@
+import time
+from datetime import date
+
+from recommendations import models
+from recommendations.fuzzy_index import (FuzzyIndex, edit_distance,
+                                         get_fuzzy_index, similarity)
+from recommendations.search_index import MovieDocument
+
+
+def _document(movie_id, title, names=(), votes=(7.0, 100)):
+    return MovieDocument(movie_id, title, None, None, list(names), date(2000, 1, 1), *votes, [])
+
+
+def test_similarity_compares_to_the_closest_words():
+    assert edit_distance("interstelar", "interstellar") == 1
+    assert similarity("amelie", "le fabuleux destin d amelie") == 1.0
+    assert similarity("interstelar", "interstellar") > 0.9
+
+
+def test_misspelled_titles_and_names_find_their_movies():
+    index = FuzzyIndex([[
+        _document(1, "Interstellar", names=["Matthew McConaughey"]),
+        _document(2, "Le Fabuleux Destin d'Amélie Poulain", names=["Audrey Tautou"]),
+        _document(3, "Interstate 60"),
+        _document(4, "Da Vinci Code", names=["Audrey Tautou"]),
+    ]])
+
+    assert max(index.search("Interstelar").items(), key=lambda item: item[1])[0] == 1
+    assert 2 in index.search("amelie")
+    assert sorted(index.search("odrey tautou")) == [2, 4]
+    assert index.search("zzz") == {}
+
+
+def test_popularity_breaks_ties_between_equally_close_titles():
+    index = FuzzyIndex([[_document(1, "Alien", votes=(6.0, 10)), _document(2, "Alien", votes=(8.5, 9000))]])
+
+    scores = index.search("alen")
+    assert scores[2] > scores[1]
+
+
+def test_fuzzy_search_endpoint(db, client):
+    assert client.get("/movies/search/", params={"title": "Intersteler"}).status_code == 404
+
+    response = client.get("/movies/search/", params={"title": "Intersteler", "fuzzy": True})
+    assert [movie["movie_id"] for movie in response.json()["items"]] == [4]
+
+    response = client.get("/movies/search/", params={"title": "sigourny waever", "fuzzy": True, "genre": "horror"})
+    assert sorted(movie["movie_id"] for movie in response.json()["items"]) == [1, 2]
+
+
+def test_stale_index_is_served_while_a_new_one_is_built(db):
+    first = get_fuzzy_index(db)
+    db.add(models.Movies(movie_id=7, title="Zardoz", vote_average=6.0, vote_count=100))
+    db.commit()
+
+    assert get_fuzzy_index(db, max_age=0) is first
+    deadline = time.monotonic() + 5
+    while get_fuzzy_index(db) is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert 7 in get_fuzzy_index(db).search("zardos")
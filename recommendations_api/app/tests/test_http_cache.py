@@ -0,0 +1,70 @@
+import time
+from email.utils import formatdate
+
+from recommendations import models
+from recommendations.http_cache import catalog_version
+from recommendations.top_credits import rebuild_top_credits
+
+
+def test_catalog_endpoints_answer_304_without_orm_work(db, client, monkeypatch):
+    first = client.get("/genres")
+    etag = first.headers["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no query expected")
+
+    monkeypatch.setattr(db, "query", fail)
+    response = client.get("/genres", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert "max-age" in first.headers["Cache-Control"]
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_encoded_bodies_are_reused_until_the_catalog_changes(db, client):
+    first = client.get("/movies/1/credits", params={"job": "Acting"})
+    db.query(models.Credits).filter(models.Credits.credit_id == 101).update({"character_name": "Captain"})
+
+    cached = client.get("/movies/1/credits", params={"job": "Acting"})
+    db.add(models.Genres(genre_id=6, name="Western"))
+    db.commit()
+    catalog_version.invalidate()
+    refreshed = client.get("/movies/1/credits", params={"job": "Acting"})
+
+    assert cached.content == first.content
+    assert refreshed.headers["ETag"] != first.headers["ETag"]
+    assert refreshed.json()["items"][1]["character_name"] == "Captain"
+
+
+def test_missing_movie_is_not_cached(db, client):
+    assert client.get("/movies/999").status_code == 404
+    assert client.get("/movies/1").json()["title"] == "Alien"
+
+
+def test_last_modified_answers_if_modified_since(db, client):
+    first = client.get("/movies/1")
+    last_modified = first.headers["Last-Modified"]
+
+    unchanged = client.get("/movies/1", headers={"If-Modified-Since": last_modified})
+    older = client.get("/movies/1", headers={"If-Modified-Since": formatdate(time.time() - 3600, usegmt=True)})
+    # If-None-Match wins over If-Modified-Since
+    stale_etag = client.get("/movies/1", headers={"If-Modified-Since": last_modified, "If-None-Match": '"old"'})
+
+    assert unchanged.status_code == 304
+    assert older.status_code == 200
+    assert stale_etag.status_code == 200
+
+
+def test_rewriting_top_credits_changes_the_version(db, client):
+    rebuild_top_credits(db, [1])
+    first = client.get("/movies/1")
+    # Same rows again: only the shared CatalogUpdates time tells the workers
+    rebuild_top_credits(db, [1])
+    catalog_version.invalidate()
+
+    second = client.get("/movies/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,111 @@
+import time
+
+import numpy as np
+import pytest
+
+from recommendations import hybrid_based, models
+from recommendations.catalog import MovieCatalog, _project, get_catalog, top_k
+from recommendations.hybrid_based import HybridRecommendationFetcher, hybrid_scores, hybrid_top_k
+
+
+def test_catalog_from_db(db):
+    catalog = MovieCatalog.from_db(db)
+
+    assert catalog.movie_ids.tolist() == [1, 2, 3, 4, 5, 6]
+    assert catalog.has_embedding.tolist() == [True, True, True, True, True, False]
+    assert np.allclose(np.linalg.norm(catalog.embeddings[:5], axis=1), 1.0)
+    assert catalog.popularity.min() >= 0 and catalog.popularity.max() <= 1
+    assert catalog.positions([4, 42, 1]).tolist() == [3, 0]
+
+
+def test_catalog_orders_trending_and_genre_movies(db):
+    catalog = MovieCatalog.from_db(db)
+
+    assert catalog.movie_ids[catalog.trending_order].tolist() == [6, 5, 4, 3, 2, 1]
+    assert catalog.movie_ids[catalog.genre_order(1)].tolist() == [1, 2, 6]
+    assert catalog.genre_order(42).tolist() == []
+
+
+def test_hybrid_scores_exclude_seen_and_follow_taste(db):
+    catalog = MovieCatalog.from_db(db)
+    taste = catalog.taste_vector([1])
+
+    scores = hybrid_scores(catalog, taste, catalog.genre_mask([1, 2]), catalog.positions([1]))
+
+    assert scores[0] == -np.inf
+    best = catalog.movie_ids[top_k(scores, 3)].tolist()
+    assert best[0] == 2
+    assert 3 not in best
+
+
+def test_top_k_skips_excluded_movies():
+    scores = np.array([0.1, -np.inf, 0.5, 0.3], dtype=np.float32)
+
+    assert top_k(scores, 10).tolist() == [2, 3, 0]
+
+
+def _random_catalog(size=5000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    # Decreasing spread per direction, like real embeddings
+    embeddings = rng.standard_normal((size, dim)).astype(np.float32) / np.arange(1, dim + 1)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    has_embedding = rng.random(size) < 0.9
+    embeddings[~has_embedding] = 0.0
+    projection, projected, residuals = _project(embeddings, has_embedding, dim=8)
+    return MovieCatalog(
+        movie_ids=np.arange(1, size + 1),
+        embeddings=embeddings,
+        has_embedding=has_embedding,
+        popularity=rng.random(size).astype(np.float32),
+        genre_bits=rng.integers(0, 1 << 8, size).astype(np.uint64),
+        genre_index={genre_id: genre_id for genre_id in range(8)},
+        released=rng.random(size) < 0.95,
+        release_days=np.zeros(size, dtype=np.int32),
+        vote_average=np.zeros(size, dtype=np.float32),
+        vote_count=np.zeros(size, dtype=np.float32),
+        projection=projection,
+        projected=projected,
+        residuals=residuals,
+    )
+
+
+@pytest.mark.parametrize("rescore_limit", [50_000, 0])
+def test_hybrid_top_k_matches_a_full_scan(monkeypatch, rescore_limit):
+    monkeypatch.setattr(hybrid_based, "HYBRID_RESCORE_LIMIT", rescore_limit)
+    catalog = _random_catalog()
+
+    for user in range(5):
+        taste = catalog.taste_vector(np.random.default_rng(user).choice(catalog.movie_ids, 5))
+        genre_mask = catalog.genre_mask([user, user + 1])
+        seen = catalog.positions(range(1, 200))
+
+        scores = hybrid_scores(catalog, taste, genre_mask, seen)
+        best = hybrid_top_k(catalog, taste, genre_mask, 20, seen)
+
+        assert np.allclose(scores[best], scores[top_k(scores, 20)])
+        assert not np.isin(best, seen).any()
+
+
+def test_fetch_returns_hybrid_genre_and_trending_carousels(db):
+    result = HybridRecommendationFetcher().fetch(db, 1, [1])
+
+    titles = [movie.title for movie in result["hybrid_carousel"]]
+    assert titles[0] == "Aliens"
+    assert "Alien" not in titles
+    assert [movie.title for movie in result["genre_Horror"]] == ["Aliens", "The Thing"]
+    assert [movie.title for movie in result["genre_Science Fiction"]] == ["Interstellar", "Aliens"]
+    assert result["trending_carousel"][0].title == "The Thing"
+    assert "Alien" not in [movie.title for movie in result["trending_carousel"]]
+
+
+def test_stale_catalog_is_served_while_a_new_one_is_loaded(db):
+    first = get_catalog(db)
+    db.add(models.Movies(movie_id=7, title="Zardoz", vote_average=6.0, vote_count=100))
+    db.commit()
+
+    assert get_catalog(db, max_age=0) is first
+    deadline = time.monotonic() + 5
+    while get_catalog(db) is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert 7 in get_catalog(db).movie_ids
@@ -0,0 +1,67 @@
+from recommendations.impressions import (ImpressionFilter, bloom_offsets,
+                                         downrank_shown, impression_key)
+
+WEEK = 7 * 24 * 3600
+
+
+def test_bloom_offsets_are_deterministic_and_bounded():
+    offsets = bloom_offsets([1, 2, 3], bits=64, hashes=4)
+
+    assert offsets.shape == (3, 4)
+    assert (offsets >= 0).all() and (offsets < 64).all()
+    assert (bloom_offsets([2], bits=64, hashes=4) == offsets[1]).all()
+
+
+def test_recorded_movies_are_found_with_redis_bit_order(redis_client):
+    impressions = ImpressionFilter.load(redis_client, 1, now=0)
+    impressions.record(redis_client, [10, 20])
+
+    reloaded = ImpressionFilter.load(redis_client, 1, now=0)
+
+    assert reloaded.contains([10, 20, 30]).tolist() == [True, True, False]
+    offset = int(bloom_offsets([10])[0, 0])
+    assert redis_client.getbit(impression_key(1, 0), offset) == 1
+
+
+def test_impressions_expire_after_two_windows(redis_client):
+    ImpressionFilter.load(redis_client, 1, now=0).record(redis_client, [10])
+
+    assert ImpressionFilter.load(redis_client, 1, now=WEEK).contains([10])[0]
+    assert not ImpressionFilter.load(redis_client, 1, now=2 * WEEK).contains([10])[0]
+
+
+def test_memory_is_fixed_per_user(redis_client):
+    impressions = ImpressionFilter.load(redis_client, 1, now=0)
+    for start in range(0, 5000, 100):
+        impressions.record(redis_client, range(start, start + 100))
+
+    assert len(redis_client.get(impression_key(1, 0))) <= impressions.bits // 8
+
+
+def test_downrank_shown_keeps_fresh_movies_first(redis_client):
+    impressions = ImpressionFilter.load(redis_client, 1, now=0)
+    impressions.record(redis_client, [1, 2])
+    payload = {
+        "trending_carousel": [{"movie_id": movie_id} for movie_id in (1, 2, 3, 4)],
+        "message": "kept",
+    }
+
+    ranked = downrank_shown(payload, impressions, length=3)
+
+    assert [movie["movie_id"] for movie in ranked["trending_carousel"]] == [3, 4, 1]
+    assert ranked["message"] == "kept"
+
+
+def test_endpoint_pushes_shown_movies_back_and_records_them(db, client, redis_client):
+    ImpressionFilter.load(redis_client, 1).record(redis_client, [2])
+
+    client.login(1)
+    result = client.get("/recommendations/").json()
+
+    carousels = [[movie["movie_id"] for movie in value] for value in result.values() if isinstance(value, list)]
+    assert any(2 in carousel for carousel in carousels)
+    for carousel in carousels:
+        if 2 in carousel:
+            assert carousel[-1] == 2
+    shown = ImpressionFilter.load(redis_client, 1)
+    assert shown.contains({movie_id for carousel in carousels for movie_id in carousel}).all()
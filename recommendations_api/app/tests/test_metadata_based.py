@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+
+from recommendations import models
+from recommendations.metadata_based import (MetadataIndex, MetadataRecommendationFetcher,
+                                            get_metadata_index)
+from recommendations.movie_based import MovieBasedRecommendationFetcher
+
+
+def test_rare_features_weigh_more_than_common_ones():
+    index = MetadataIndex.build([
+        (1, "genre:1"), (1, "Director:7"),
+        (2, "genre:1"), (2, "Director:7"),
+        (3, "genre:1"), (3, "cast:9"),
+        (4, "genre:1"),
+    ])
+
+    assert index.similar(1, 3) == [2, 4, 3]
+    assert np.allclose(index.matrix.multiply(index.matrix).sum(axis=1), 1.0)
+
+
+def test_similar_filters_candidates_and_unknown_movies():
+    index = MetadataIndex.build([(1, "genre:1"), (2, "genre:1"), (3, "genre:1"), (4, "genre:2")])
+
+    assert index.similar(1, 5, allowed=np.array([3, 4])) == [3]
+    assert index.similar(1, 5, excluded=np.array([2, 4])) == [3]
+    assert index.similar(42, 5) == []
+
+
+def test_from_db_uses_crew_top_cast_and_genres(db):
+    index = MetadataIndex.from_db(db)
+
+    assert "Director:11" in index.features
+    assert "cast:14" in index.features
+    assert "genre:1" in index.features
+    assert not any(feature.startswith(("Producer", "Grip")) for feature in index.features)
+
+
+def test_movie_fetcher_falls_back_on_metadata(db):
+    result = MovieBasedRecommendationFetcher().fetch(6, db, [])
+
+    assert [movie.movie_id for movie in result["movie_The Thing"]][0] == 1
+
+
+def test_metadata_fetcher_excludes_seen_movies(db):
+    result = MetadataRecommendationFetcher().fetch(6, db, [1])
+
+    assert [movie.movie_id for movie in result["movie_The Thing"]] == [2]
+
+
+def test_stale_index_is_served_while_a_new_one_is_built(db):
+    first = get_metadata_index(db)
+    db.add(models.Credits(credit_id=999, id_movie=3, id_people=12, id_job=2))
+    db.commit()
+
+    assert get_metadata_index(db, max_age=0) is first
+    deadline = time.monotonic() + 5
+    while get_metadata_index(db) is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    index = get_metadata_index(db)
+    position = index.movie_ids.tolist().index(3)
+    assert index.matrix[position, index.features.index("Director:12")] > 0
@@ -0,0 +1,62 @@
+import numpy as np
+
+from recommendations import models
+from recommendations.catalog import MovieCatalog
+from recommendations.movie_based import MovieBasedRecommendationFetcher
+from recommendations.neighbors import MovieNeighborGraph
+
+
+def test_build_finds_nearest_embeddings(db, tmp_path):
+    graph = MovieNeighborGraph.build(MovieCatalog.from_db(db), k=2, block_size=2, work_dir=str(tmp_path))
+
+    assert graph.movie_ids.tolist() == [1, 2, 3, 4, 5]
+    assert graph.neighbors[0].tolist()[0] == 2
+    assert graph.neighbors[2].tolist()[0] == 5
+    assert (graph.neighbors != graph.movie_ids[:, None]).all()
+    assert not (tmp_path / "embeddings.npy").exists()
+
+
+def test_process_pool_matches_inline_build(db, tmp_path):
+    catalog = MovieCatalog.from_db(db)
+
+    inline = MovieNeighborGraph.build(catalog, k=3, block_size=2, work_dir=str(tmp_path))
+    pooled = MovieNeighborGraph.build(catalog, k=3, block_size=2, processes=2, work_dir=str(tmp_path))
+
+    assert np.array_equal(inline.neighbors, pooled.neighbors)
+
+
+def test_save_load_and_write_table(db, tmp_path):
+    MovieNeighborGraph.build(MovieCatalog.from_db(db), k=2, work_dir=str(tmp_path)).save(str(tmp_path))
+    graph = MovieNeighborGraph.load(str(tmp_path))
+
+    graph.write_table(db, batch_size=3)
+
+    rows = (
+        db.query(models.MovieNeighbors.neighbor_id)
+        .filter(models.MovieNeighbors.movie_id == 1)
+        .order_by(models.MovieNeighbors.rank)
+        .all()
+    )
+    assert [row[0] for row in rows] == graph.neighbors[0].tolist()
+    assert db.query(models.MovieNeighbors).count() == 10
+
+
+def test_movie_fetcher_reads_precomputed_neighbors(db, tmp_path):
+    MovieNeighborGraph.build(MovieCatalog.from_db(db), k=2, work_dir=str(tmp_path)).write_table(db)
+
+    result = MovieBasedRecommendationFetcher().fetch(1, db, [2])
+
+    assert [movie.movie_id for movie in result["movie_Alien"]] == [4]
+
+
+def test_similar_endpoint_serves_the_graph(db, client, tmp_path):
+    MovieNeighborGraph.build(MovieCatalog.from_db(db), k=2, work_dir=str(tmp_path)).write_table(db)
+
+    response = client.get("/movies/1/similar")
+
+    assert response.status_code == 200
+    assert [movie["movie_id"] for movie in response.json()] == [2, 4]
+    assert client.get("/movies/6/similar").status_code == 404
+    assert [movie["movie_id"] for movie in client.get("/movies/1/similar", params={"limit": 1}).json()] == [2]
+    assert client.get("/movies/1/similar", params={"limit": 0}).status_code == 422
+    assert client.get("/movies/1/similar", params={"limit": 1000}).status_code == 422
@@ -0,0 +1,54 @@
+from datetime import date
+
+from recommendations.cursors import encode_cursor
+
+from recommendations.search_index import MovieDocument, SearchIndex
+
+
+def _pages(client, url, params, key):
+    pages, cursor = [], None
+    while True:
+        page = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append([item[key] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_search_pages_follow_the_ranking_without_gaps(db, client):
+    everything = client.get("/movies/search/", params={"limit": 10}).json()
+
+    pages = _pages(client, "/movies/search/", {"limit": 4}, "movie_id")
+
+    assert everything["next_cursor"] is None
+    assert pages == [[4, 1, 2, 3], [6, 5]]
+    assert sum(pages, []) == [movie["movie_id"] for movie in everything["items"]]
+
+
+def test_tied_scores_are_paged_by_movie_id():
+    documents = [MovieDocument(movie_id, "Same", None, None, [], date(2000, 1, 1), 7.0, 100, []) for movie_id in (9, 3, 7, 1, 5)]
+    index = SearchIndex.build([documents])
+    scores = index.match("same")
+
+    first, after = index.page(scores, 2)
+    second, after = index.page(scores, 2, after)
+    third, after = index.page(scores, 2, after)
+
+    assert (first, second, third, after) == ([1, 3], [5, 7], [9], None)
+
+
+def test_genres_are_paged_by_id(db, client):
+    assert _pages(client, "/genres", {"limit": 2}, "genre_id") == [[1, 2], [3, 4], [5]]
+
+
+def test_invalid_cursors_are_rejected(db, client):
+    assert client.get("/genres", params={"cursor": "nope"}).status_code == 400
+    assert client.get("/movies/search/", params={"cursor": "WzFd"}).status_code == 400
+
+
+def test_cursors_with_values_of_the_wrong_type_are_rejected(db, client):
+    assert client.get("/movies/search/", params={"cursor": encode_cursor(["x", 1])}).status_code == 400
+    assert client.get("/movies/search/", params={"cursor": encode_cursor([1.5, True])}).status_code == 400
+    assert client.get("/genres", params={"cursor": encode_cursor(["1"])}).status_code == 400
+    assert client.get("/movies/1/credits", params={"cursor": encode_cursor([1, 2, 3])}).status_code == 400
+    assert client.get("/movies/search/", params={"cursor": encode_cursor([1, 2]), "limit": 2}).status_code in (200, 404)
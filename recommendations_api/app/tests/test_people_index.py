@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+
+from recommendations import models
+from recommendations.people_index import PeopleIndex, get_people_index
+
+
+def test_intersections_of_people_and_roles():
+    credits = np.array([
+        # people_id, job_id, movie_id
+        (1, 1, 30), (1, 1, 10), (1, 1, 20), (1, 2, 40),
+        (2, 2, 20), (2, 2, 30), (2, 1, 50),
+        (3, 1, 20), (3, 1, 20),
+    ])
+    index = PeopleIndex(credits, {"Acting": 1, "Director": 2})
+
+    assert index.movies_of(1, "Acting").tolist() == [10, 20, 30]
+    assert index.movies_of(1).tolist() == [10, 20, 30, 40]
+    assert index.intersect([(1, "Acting"), (2, "Director")]).tolist() == [20, 30]
+    assert index.intersect([(1, "Acting"), (2, "Director"), (3, None)]).tolist() == [20]
+    assert index.intersect([(1, "Director"), (2, "Director")]).tolist() == []
+    assert index.intersect([(4, None)]).tolist() == []
+    assert index.movies_of(1, "Writer").tolist() == []
+
+
+def test_index_is_built_from_credits(db):
+    index = get_people_index(db)
+
+    assert index.movies_of(10, "Acting").tolist() == [1, 2]
+    assert index.movies_of(12, "Director").tolist() == [6]
+    assert 999 not in index
+
+
+def test_search_by_actor_director_and_genre(db, client):
+    def search(**params):
+        response = client.get("/movies/search/", params=params)
+        return sorted(movie["movie_id"] for movie in response.json()["items"]) if response.status_code == 200 else 404
+
+    assert search(actor=14) == [1, 6]
+    assert search(actor=14, director=12) == [6]
+    assert search(actor=10, genre="horror") == [1, 2]
+    assert search(people=[10, 15]) == [1, 2]
+    assert search(actor=14, title="thing") == [6]
+    assert search(actor=10, director=12) == 404
+
+
+def test_filmography_groups_movies_by_job(db, client):
+    response = client.get("/people/14/filmography")
+
+    assert response.json()["roles"][0]["job"] == "Acting"
+    assert [movie["title"] for movie in response.json()["roles"][0]["movies"]] == ["The Thing", "Alien"]
+    assert [role["job"] for role in client.get("/people/15/filmography").json()["roles"]] == ["Producer"]
+    assert client.get("/people/999/filmography").status_code == 404
+
+
+def test_stale_index_is_served_while_a_new_one_is_built(db):
+    first = get_people_index(db)
+    db.add(models.Credits(credit_id=999, id_movie=3, id_people=12, id_job=2))
+    db.commit()
+
+    assert get_people_index(db, max_age=0) is first
+    deadline = time.monotonic() + 5
+    while get_people_index(db) is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert get_people_index(db).movies_of(12, "Director").tolist() == [3, 6]
@@ -0,0 +1,237 @@
+import threading
+import time
+
+from recommendations.cold_start import cold_start_cache
+from recommendations.pipeline import (TIMED_OUT_KEY, CachePolicy,
+                                      FetcherGenerator, PostFilter,
+                                      RecommendationContext,
+                                      RecommendationPipeline, StageBudget,
+                                      get_executor)
+from recommendations.service import (compute_recommendations, get_pipeline,
+                                     set_pipeline)
+
+
+def _carousel(*movie_ids):
+    return [{"movie_id": movie_id} for movie_id in movie_ids]
+
+
+def _context(db, **kwargs):
+    return RecommendationContext(db=db, user_id=1, seen_movie_ids=kwargs.pop("seen", []), **kwargs)
+
+
+class FakeSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class Truncate(PostFilter):
+    def apply(self, context, recommendations):
+        return {key: value[:1] for key, value in recommendations.items()}
+
+
+def test_pipeline_merges_in_generator_order_and_profiles_stages(db):
+    pipeline = RecommendationPipeline(
+        [
+            FetcherGenerator("first", lambda c: {"a_carousel": _carousel(1, 2), "shared": _carousel(3)}),
+            FetcherGenerator("second", lambda c: {"shared": _carousel(4)}),
+        ],
+        post_filters=[Truncate()],
+    )
+
+    recommendations, reports = pipeline.run_with_profile(_context(db))
+
+    assert recommendations == {"a_carousel": _carousel(1), "shared": _carousel(4)}
+    assert [report.name for report in reports] == ["first", "second", "merge", "Truncate"]
+    assert pipeline.stage_stats()["first"]["calls"] == 1
+
+
+def test_size_budget_and_over_budget_report(db):
+    def slow(context):
+        time.sleep(0.02)
+        return {"slow_carousel": _carousel(1, 2, 3)}
+
+    pipeline = RecommendationPipeline(
+        [FetcherGenerator("slow", slow, budget=StageBudget(seconds=0.001, max_items=2))]
+    )
+
+    recommendations, reports = pipeline.run_with_profile(_context(db))
+
+    assert recommendations == {"slow_carousel": _carousel(1, 2)}
+    assert reports[0].over_budget
+    assert pipeline.stage_stats()["slow"]["over_budget"] == 1
+
+
+def test_shared_cache_filters_each_users_seen_movies(db):
+    calls = []
+
+    def trending(context):
+        calls.append(context.seen_movie_ids)
+        return {"trending_carousel": _carousel(1, 2, 3)}
+
+    pipeline = RecommendationPipeline(
+        [FetcherGenerator("trending", trending, cache=CachePolicy(ttl=60, per_user=False))]
+    )
+
+    first = pipeline.run(_context(db, seen=[1]))
+    second, reports = pipeline.run_with_profile(_context(db, seen=[2]))
+
+    assert calls == [[]]
+    assert first == {"trending_carousel": _carousel(2, 3)}
+    assert second == {"trending_carousel": _carousel(1, 3)}
+    assert reports[0].cached
+
+
+def test_concurrent_generators_run_in_parallel_with_their_own_sessions(db):
+    barrier = threading.Barrier(2, timeout=2)
+    sessions = []
+
+    def generator(name):
+        def generate(context):
+            sessions.append(context.db)
+            barrier.wait()
+            return {name: _carousel(1)}
+
+        return FetcherGenerator(name, generate)
+
+    pipeline = RecommendationPipeline([generator("a"), generator("b")], workers=2)
+
+    recommendations = pipeline.run(_context(db, session_factory=FakeSession))
+
+    assert list(recommendations) == ["a", "b"]
+    assert db not in sessions
+
+
+def test_a_request_opens_at_most_workers_sessions(db):
+    opened, sessions = [], []
+
+    def session_factory():
+        opened.append(True)
+        return FakeSession()
+
+    def generator(name):
+        return FetcherGenerator(name, lambda c: sessions.append(c.db) or {name: _carousel(1)})
+
+    pipeline = RecommendationPipeline([generator(name) for name in ("a", "b", "c")], workers=2)
+
+    recommendations = pipeline.run(_context(db, session_factory=session_factory))
+
+    assert list(recommendations) == ["a", "b", "c"]
+    assert len(opened) == 2
+    assert sessions.count(db) == 1
+
+
+def test_generators_share_one_process_wide_pool(db):
+    threads = []
+
+    def generator(name):
+        return FetcherGenerator(name, lambda c: threads.append(threading.current_thread()) or {name: _carousel(1)})
+
+    pipeline = RecommendationPipeline([generator("a"), generator("b")], workers=2)
+    for _ in range(3):
+        pipeline.run(_context(db, session_factory=FakeSession))
+
+    assert len(set(threads)) <= get_executor()._max_workers
+    assert all(thread.name.startswith("pipeline") for thread in threads)
+
+
+def test_generators_queued_past_the_deadline_never_open_a_session(db):
+    opened = []
+
+    def session_factory():
+        opened.append(True)
+        return FakeSession()
+
+    pipeline = RecommendationPipeline(
+        [FetcherGenerator(name, lambda c: {}) for name in ("a", "b")], workers=2
+    )
+
+    recommendations = pipeline.run(_context(db, session_factory=session_factory, deadline=time.monotonic()))
+
+    assert recommendations == {TIMED_OUT_KEY: ["a", "b"]}
+    assert opened == []
+
+
+def test_pipeline_can_be_swapped_without_touching_the_endpoint(db, client):
+    set_pipeline(RecommendationPipeline([FetcherGenerator("static", lambda c: {"static": _carousel(5)})]))
+
+    client.login(1)
+
+    assert client.get("/recommendations/").json() == {"static": _carousel(5)}
+    assert "static" in client.get("/metrics/pipeline").json()
+
+
+def test_default_pipeline_serves_every_fetcher(db):
+    recommendations = compute_recommendations(db, 1, [1])
+
+    assert "hybrid_carousel" in recommendations
+    assert set(get_pipeline().stage_stats()) >= {"hybrid", "movie", "merge", "rank"}
+
+
+def test_generators_missing_the_deadline_are_dropped_and_named(db):
+    release = threading.Event()
+
+    def slow(context):
+        release.wait(2)
+        return {"slow_carousel": _carousel(1)}
+
+    pipeline = RecommendationPipeline(
+        [
+            FetcherGenerator("fast", lambda c: {"fast_carousel": _carousel(2)}),
+            FetcherGenerator("slow", slow),
+        ],
+        workers=2,
+    )
+
+    start = time.monotonic()
+    recommendations = pipeline.run(
+        _context(db, session_factory=FakeSession, deadline=time.monotonic() + 0.05)
+    )
+    release.set()
+
+    assert time.monotonic() - start < 1
+    assert recommendations == {"fast_carousel": _carousel(2), TIMED_OUT_KEY: ["slow"]}
+    assert pipeline.stage_stats()["slow"]["timeouts"] == 1
+
+
+def test_sequential_stages_are_skipped_once_the_deadline_has_passed(db):
+    calls = []
+
+    def first(context):
+        calls.append("first")
+        time.sleep(0.02)
+        return {"first_carousel": _carousel(1)}
+
+    pipeline = RecommendationPipeline(
+        [FetcherGenerator("first", first), FetcherGenerator("second", lambda c: calls.append("second"))]
+    )
+
+    recommendations = pipeline.run(_context(db, deadline=time.monotonic() + 0.01))
+
+    assert calls == ["first"]
+    assert recommendations == {"first_carousel": _carousel(1), TIMED_OUT_KEY: ["second"]}
+
+
+def test_endpoint_flags_the_carousels_that_missed_the_budget(db, client, monkeypatch):
+    monkeypatch.setattr("main.RECOMMENDATIONS_BUDGET_SECONDS", 0.2)
+
+    def slow(context):
+        time.sleep(0.3)
+        return {"static": _carousel(5)}
+
+    set_pipeline(
+        RecommendationPipeline([FetcherGenerator("static", slow), FetcherGenerator("late", lambda c: {})])
+    )
+
+    client.login(1)
+
+    assert client.get("/recommendations/").json() == {"static": _carousel(5), TIMED_OUT_KEY: ["late"]}
+
+
+def test_cold_start_cache_does_not_store_partial_recommendations(db):
+    partial = {"static": _carousel(5), TIMED_OUT_KEY: ["late"]}
+
+    assert cold_start_cache.get_or_compute(None, [1], lambda: partial) == partial
+    assert cold_start_cache.get(None, [1]) is None
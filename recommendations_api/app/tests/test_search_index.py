@@ -0,0 +1,135 @@
+from datetime import date
+
+from recommendations import models
+from recommendations.http_cache import record_movie_updates
+from recommendations.search_index import (MovieDocument, SearchIndex,
+                                          get_search_index, load_documents,
+                                          tokenize)
+
+
+def _document(movie_id, title, overview="", names=(), genre_ids=(), votes=(7.0, 100)):
+    return MovieDocument(movie_id, title, None, overview, list(names), date(2000, 1, 1), *votes, list(genre_ids))
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Le Fabuleux Destin d'Amélie") == ["le", "fabuleux", "destin", "d", "amelie"]
+
+
+def test_bm25_ranks_title_matches_above_overview_matches():
+    index = SearchIndex.build([[
+        _document(1, "Space Station", overview="A crew in orbit."),
+        _document(2, "Harbour", overview="A story about a station in space and the people waiting there."),
+        _document(3, "Desert"),
+    ]])
+
+    assert index.search("space station") == [1, 2]
+    assert index.search("nothing") == []
+
+
+def test_added_and_updated_documents_are_searchable_before_and_after_compaction(tmp_path):
+    index = SearchIndex.build([[_document(1, "Alien"), _document(2, "Heat")]])
+
+    index.add([_document(3, "Alien Resurrection"), _document(2, "Heat Wave")])
+    assert sorted(index.search("alien")) == [1, 3]
+    assert index.search("wave") == [2]
+    assert len(index) == 3
+
+    index.compact()
+    path = str(tmp_path / "search_index.npz")
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert sorted(loaded.search("alien")) == [1, 3]
+    assert loaded.search("heat") == [2]
+    assert len(loaded) == 3
+
+
+def test_compaction_drops_deleted_documents():
+    index = SearchIndex.build([[_document(1, "Alien"), _document(2, "Heat"), _document(3, "Aliens")]])
+    index.add([_document(2, "Heat Wave")])
+    index.remove([1])
+
+    compacted = index.compacted()
+    assert len(index.doc_movie_ids) == 4
+    index.compact()
+
+    for searched in (index, compacted):
+        assert searched.doc_movie_ids.tolist() == [3, 2]
+        assert not searched.deleted.any()
+        assert searched.search("alien") == []
+        assert searched.search("heat") == [2]
+        assert searched.search("aliens") == [3]
+
+
+def test_documents_include_credited_names(db):
+    documents = {document.movie_id: document for batch in load_documents(db, batch_size=2) for document in batch}
+
+    assert len(documents) == 6
+    assert "Sigourney Weaver" in documents[1].names
+    assert documents[1].genre_ids == [1, 2]
+
+
+def test_search_endpoint_matches_names_and_filters(db, client):
+    response = client.get("/movies/search/", params={"title": "weaver"})
+    assert sorted(movie["movie_id"] for movie in response.json()["items"]) == [1, 2]
+
+    response = client.get("/movies/search/", params={"title": "amelie"})
+    assert [movie["title"] for movie in response.json()["items"]] == ["Amélie"]
+
+    response = client.get("/movies/search/", params={"genre": "horror", "limit": 2})
+    assert [movie["movie_id"] for movie in response.json()["items"]] == [1, 2]
+
+    response = client.get("/movies/search/", params={"title": "weaver", "release_date": "1990-01-01"})
+    assert [movie["movie_id"] for movie in response.json()["items"]] == [2]
+
+    assert client.get("/movies/search/", params={"title": "weaver", "genre": "comedy"}).status_code == 404
+    assert client.get("/movies/search/", params={"release_date": "01/01/1990"}).status_code == 400
+
+
+def test_process_index_catches_up_on_new_movies(db, tmp_path):
+    path = str(tmp_path / "missing.npz")
+    assert get_search_index(db, path).search("alien") == [1]
+
+    db.add(models.Movies(movie_id=7, title="Alien 3", vote_average=6.4, vote_count=3000))
+    db.commit()
+    assert get_search_index(db, path).search("alien") == [1]
+    assert sorted(get_search_index(db, path, max_age=0).search("alien")) == [1, 7]
+
+
+def test_process_index_reads_edited_and_deleted_movies_again(db, tmp_path):
+    path = str(tmp_path / "missing.npz")
+    assert get_search_index(db, path).search("amelie") == [3]
+
+    db.get(models.Movies, 1).title = "Nostromo"
+    db.query(models.Movies).filter(models.Movies.movie_id == 3).delete()
+    record_movie_updates(db, [1, 3])
+    db.commit()
+    index = get_search_index(db, path, max_age=0)
+
+    assert index.search("nostromo") == [1]
+    assert index.search("alien") == []
+    assert index.search("amelie") == []
+    assert index.updated_at is not None
+    assert get_search_index(db, path, max_age=0).search("nostromo") == [1]
+
+
+def test_search_returns_facet_counts_of_all_matches(db, client):
+    response = client.get("/movies/search/", params={"genre": "horror", "limit": 1}).json()
+
+    assert len(response["items"]) == 1
+    assert response["total"] == 3
+    assert response["facets"] == {
+        "genre": {"Horror": 3, "Science Fiction": 2},
+        "decade": {"1980": 1, "1990": 1, "2010": 1},
+        "runtime": {"90-120": 2, "150+": 1},
+        "rating": {"8+": 3},
+    }
+
+
+def test_facet_values_are_filters(db, client):
+    def search(**params):
+        return [movie["movie_id"] for movie in client.get("/movies/search/", params=params).json()["items"]]
+
+    assert search(runtime="150+") == [6]
+    assert search(decade=1990) == [2, 3]
+    assert search(rating="7-8") == [5]
+    assert client.get("/movies/search/", params={"runtime": "long"}).status_code == 400
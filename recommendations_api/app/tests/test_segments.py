@@ -0,0 +1,84 @@
+import numpy as np
+
+from recommendations.catalog import MovieCatalog
+from recommendations.hybrid_based import HybridRecommendationFetcher
+from recommendations.segments import (UserSegments, build_segments, kmeans,
+                                      load_user_profiles)
+
+
+def _segments(db, **kwargs):
+    return build_segments(MovieCatalog.from_db(db), *load_user_profiles(db), **kwargs)
+
+
+def test_kmeans_separates_clusters():
+    features = np.array([[1, 0], [0.9, 0.1], [0, 1], [0.1, 0.9]], dtype=np.float32)
+    features /= np.linalg.norm(features, axis=1, keepdims=True)
+
+    centroids, assignments = kmeans(features, 2, chunk_size=1)
+
+    assert assignments[0] == assignments[1] != assignments[2] == assignments[3]
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0)
+
+
+def test_build_segments_splits_users_and_ranks_pools(db):
+    segments = _segments(db, k=2, pool_size=3)
+
+    assert segments.user_ids.tolist() == [1, 2]
+    assert segments.assignments[0] != segments.assignments[1]
+    # User 1 loves Alien and picked horror and science fiction
+    assert segments.pool(segments.assignments[0])[0] in (1, 2)
+    assert segments.pools.shape == (3, 3)
+
+
+def test_unknown_user_joins_nearest_segment(db, tmp_path):
+    path = str(tmp_path / "segments.npz")
+    _segments(db, k=2).save(path)
+    segments = UserSegments.load(path)
+    catalog = MovieCatalog.from_db(db)
+
+    segment = segments.segment_of(42, catalog.taste_vector([2]), [1])
+
+    assert segment == segments.assignments[0]
+    assert segments.segment_of(42, None, []) == segments.fallback
+
+
+def test_users_without_features_get_the_fallback_segment(db):
+    catalog = MovieCatalog.from_db(db)
+    catalog.embeddings[2] = 0.0
+    loved_users, loved_movies, pick_users, pick_genres = load_user_profiles(db)
+
+    segments = build_segments(
+        catalog, np.append(loved_users, 9), np.append(loved_movies, 3), pick_users, pick_genres, k=2
+    )
+
+    assert segments.user_ids.tolist() == [1, 2, 9]
+    assert segments.assignments.tolist()[2] == segments.fallback == 2
+    assert not segments.centroids[segments.fallback].any()
+    # Ranked on popularity alone, like a full scan without taste nor genres
+    assert segments.pool(segments.fallback)[0] == 4
+
+
+def test_fetch_reranks_segment_pool(db, tmp_path):
+    path = str(tmp_path / "segments.npz")
+    _segments(db, k=2, pool_size=6).save(path)
+    fetcher = HybridRecommendationFetcher(segments_path=path)
+    hits = fetcher.segment_stats.hits
+
+    result = fetcher.fetch(db, 1, [1])
+
+    titles = [movie.title for movie in result["hybrid_carousel"]]
+    assert titles[0] == "Aliens"
+    assert "Alien" not in titles
+    assert fetcher.segment_stats.hits == hits + 1
+
+
+def test_fetch_scans_catalog_when_pool_runs_short(db, tmp_path):
+    path = str(tmp_path / "segments.npz")
+    _segments(db, k=2, pool_size=2).save(path)
+    fetcher = HybridRecommendationFetcher(segments_path=path)
+    misses = fetcher.segment_stats.misses
+
+    result = fetcher.fetch(db, 1, [1])
+
+    assert len(result["hybrid_carousel"]) > 1
+    assert fetcher.segment_stats.misses == misses + 1
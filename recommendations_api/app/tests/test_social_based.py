@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import sparse
+
+from recommendations.social_based import (ItemNeighbors,
+                                          SocialBasedRecommendationFetcher,
+                                          _runs, build_item_neighbors,
+                                          load_ratings)
+
+# user_id, movie_id, note: users 1-3 like movies 1 and 2 together, users 4-5 like 3 and 5
+RATINGS = [
+    (1, 1, 5), (1, 2, 5), (1, 3, 1),
+    (2, 1, 4), (2, 2, 5), (2, 5, 2),
+    (3, 1, 5), (3, 2, 4), (3, 3, 2),
+    (4, 3, 5), (4, 5, 5), (4, 1, 1),
+    (5, 3, 4), (5, 5, 5), (5, 2, 2),
+]
+
+
+def _neighbors(**kwargs):
+    users, movies, notes = (np.array(column) for column in zip(*RATINGS))
+    return build_item_neighbors(users, movies, notes.astype(np.float32), **kwargs)
+
+
+def test_build_item_neighbors_pairs_co_liked_movies():
+    item_neighbors = _neighbors(k=2, chunk_nnz=8)
+
+    assert item_neighbors.movie_ids.tolist() == [1, 2, 3, 5]
+    assert item_neighbors.neighbors[0, 0] == 2
+    assert item_neighbors.neighbors[2, 0] == 5
+    assert (item_neighbors.scores[:, 0] > 0).all()
+    assert (item_neighbors.neighbors != item_neighbors.movie_ids[:, None]).all()
+
+
+def test_chunk_nnz_does_not_change_the_result():
+    one_chunk, many_chunks = _neighbors(chunk_nnz=10**6), _neighbors(chunk_nnz=1)
+
+    assert np.array_equal(one_chunk.neighbors, many_chunks.neighbors)
+    assert np.allclose(one_chunk.scores, many_chunks.scores)
+
+
+def test_runs_bound_the_non_zeros_of_each_product():
+    users, movies, notes = (np.array(column) for column in zip(*RATINGS))
+    matrix = sparse.csc_matrix((notes.astype(np.float32), (users - 1, np.unique(movies, return_inverse=True)[1])))
+
+    runs = _runs(matrix, chunk_nnz=8)
+
+    assert runs[0][0] == 0 and runs[-1][1] == matrix.shape[1]
+    assert all(previous[1] == following[0] for previous, following in zip(runs, runs[1:]))
+    for start, end in runs:
+        assert end - start == 1 or (matrix.T @ matrix[:, start:end]).nnz <= 8
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "item_neighbors.npz")
+    _neighbors().save(path)
+
+    loaded = ItemNeighbors.load(path)
+
+    assert loaded.movie_ids.tolist() == [1, 2, 3, 5]
+    candidates, scores = loaded.score({1: 5})
+    assert candidates[np.argmax(scores)] == 2
+
+
+def test_load_ratings_streams_notes(db):
+    users, movies, notes = load_ratings(db, batch_size=1)
+
+    assert sorted(zip(users.tolist(), movies.tolist(), notes.tolist())) == [
+        (1, 1, 5.0), (2, 1, 2.0), (2, 3, 5.0)
+    ]
+
+
+def test_fetch_returns_social_carousel(db, tmp_path):
+    path = str(tmp_path / "item_neighbors.npz")
+    _neighbors().save(path)
+
+    result = SocialBasedRecommendationFetcher(path).fetch(db, 1, [1])
+
+    assert result["social_carousel"][0].title == "Aliens"
+
+
+def test_fetch_keeps_the_best_limit_movies(db, tmp_path):
+    path = str(tmp_path / "item_neighbors.npz")
+    neighbors = np.array([[2, 3, 4]], dtype=np.int64)
+    ItemNeighbors(np.array([1], dtype=np.int64), neighbors, np.array([[0.9, 0.5, 0.1]], dtype=np.float32)).save(path)
+
+    result = SocialBasedRecommendationFetcher(path, limit=2).fetch(db, 1, [1])
+
+    assert [movie.movie_id for movie in result["social_carousel"]] == [2, 3]
@@ -0,0 +1,66 @@
+import ast
+from pathlib import Path
+
+import pytest
+
+from recommendations import models
+from recommendations.config import TOP_CREDITS_ACTORS, TOP_CREDITS_JOBS
+from recommendations.http_cache import bump_catalog_version, catalog_version
+from recommendations.top_credits import (get_top_credits, rebuild_top_credits,
+                                         select_top_credits)
+
+
+def test_select_keeps_billed_actors_then_important_crew(db, monkeypatch):
+    monkeypatch.setattr("recommendations.top_credits.TOP_CREDITS_ACTORS", 1)
+
+    credits = select_top_credits(db, [1, 4])
+
+    # Weaver is billed first; Skerritt is past the limit and the grip is not an important job
+    assert [row["credit_id"] for row in credits[1]] == [100, 102, 103]
+    assert [row["rank"] for row in credits[1]] == [0, 1, 2]
+    assert credits[4] == []
+
+
+def test_rebuild_replaces_the_rows_of_the_movies(db):
+    assert rebuild_top_credits(db, [1, 2]) == 6
+    db.query(models.Credits).filter(models.Credits.credit_id == 103).delete()
+
+    rebuild_top_credits(db, [1])
+
+    rows = db.query(models.MovieTopCredits).filter(models.MovieTopCredits.movie_id == 1).all()
+    assert [row.credit_id for row in sorted(rows, key=lambda row: row.rank)] == [100, 101, 102]
+    assert db.query(models.MovieTopCredits).filter(models.MovieTopCredits.movie_id == 2).count() == 2
+
+
+def test_movie_details_read_the_table_and_fall_back_to_credits(db, client):
+    computed = client.get("/movies/1").json()["credits"]
+    rebuild_top_credits(db, [1])
+    db.query(models.MovieTopCredits).filter(models.MovieTopCredits.credit_id == 101).update(
+        {"character_name": "Captain Dallas"}
+    )
+    # An edit that adds no rows must be announced, and is seen once the version is recomputed
+    bump_catalog_version(db, "manual")
+    db.commit()
+    catalog_version.invalidate()
+
+    stored = client.get("/movies/1").json()["credits"]
+
+    assert [credit["credit_id"] for credit in computed] == [100, 101, 102, 103]
+    assert computed[0]["people"]["name"] == "Sigourney Weaver"
+    assert computed[0]["job"]["title"] == "Acting"
+    assert stored[1]["character_name"] == "Captain Dallas"
+    assert [credit.credit_id for credit in get_top_credits(db, 1)] == [100, 101, 102, 103]
+
+
+def test_datacrawler_copy_selects_the_same_credits():
+    path = Path(__file__).resolve().parents[3] / "datacrawler" / "top_credits.py"
+    if not path.exists():
+        pytest.skip("datacrawler not shipped with this image")
+    constants = {
+        node.targets[0].id: ast.literal_eval(node.value)
+        for node in ast.parse(path.read_text()).body
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+    }
+
+    assert constants["TOP_CREDITS_ACTORS"] == TOP_CREDITS_ACTORS
+    assert constants["TOP_CREDITS_JOBS"] == TOP_CREDITS_JOBS
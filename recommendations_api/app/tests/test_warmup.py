@@ -0,0 +1,49 @@
+from recommendations.cache import get_cache_stats
+from recommendations.precomputed import get_precomputed, precomputed_key
+from recommendations.warmup import (WARMUP_PENDING_KEY, WARMUP_QUEUE_KEY,
+                                    WarmupConsumer, warm_user)
+
+
+def _login(redis_client, user_id):
+    """What the frontend does when the user logs in."""
+    redis_client.lpush(WARMUP_QUEUE_KEY, user_id)
+    redis_client.set(WARMUP_PENDING_KEY.format(user_id=user_id), 1, ex=300)
+
+
+def test_warm_user_stores_payload_once(db, redis_client):
+    assert warm_user(db, redis_client, 1)
+    assert not warm_user(db, redis_client, 1)
+
+    payload = get_precomputed(redis_client, 1)
+    assert 1 not in [movie["movie_id"] for movie in payload["hybrid_carousel"]]
+
+
+def test_consumer_warms_queued_users(db, redis_client):
+    consumer = WarmupConsumer(lambda: db, lambda: redis_client)
+    _login(redis_client, 2)
+
+    assert consumer.consume_one(redis_client) == 2
+    assert consumer.consume_one(redis_client) is None
+    assert redis_client.exists(precomputed_key(2))
+
+
+def test_warm_hit_ratio(db, client, redis_client):
+    stats = get_cache_stats("warmup")
+    hits, misses = stats.hits, stats.misses
+    consumer = WarmupConsumer(lambda: db, lambda: redis_client)
+
+    _login(redis_client, 1)
+    consumer.consume_one(redis_client)
+    client.login(1)
+    client.get("/recommendations/")
+
+    # The home page asks before the consumer is done
+    _login(redis_client, 2)
+    client.login(2)
+    client.get("/recommendations/")
+
+    # Requests without a login warm-up are not counted
+    client.get("/recommendations/")
+
+    assert (stats.hits - hits, stats.misses - misses) == (1, 1)
+    assert client.get("/metrics/cache").json()["warmup"]["shared"]["hit_rate"] == 0.5
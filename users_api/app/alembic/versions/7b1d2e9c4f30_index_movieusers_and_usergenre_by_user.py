@@ -0,0 +1,29 @@
+"""index MovieUsers and UserGenre by user
+
+Revision ID: 7b1d2e9c4f30
+Revises: 0543ba528003
+Create Date: 2026-10-19 09:12:04.518327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1d2e9c4f30'
+down_revision: Union[str, None] = '0543ba528003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The primary keys are movie_id and genre_id alone: the lists paged by user need these indexes
+    op.create_index('ix_MovieUsers_user_id_movie_id', 'MovieUsers', ['user_id', 'movie_id'], unique=False)
+    op.create_index('ix_UserGenre_user_id_genre_id', 'UserGenre', ['user_id', 'genre_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_UserGenre_user_id_genre_id', table_name='UserGenre')
+    op.drop_index('ix_MovieUsers_user_id_movie_id', table_name='MovieUsers')
@@ -1,43 +1,51 @@
 from typing import Any, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import tuple_
 from sqlmodel import func, select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
 from app.models import GenreUser, GenreUserCreate, GenreUserOut, GenreUsersOut, GenreUserOut, Message, GenreUserUpdate
+from app.utils import decode_cursor, encode_cursor
 
 router = APIRouter()
 
 
 @router.get("/", response_model=GenreUsersOut)
 def read_genreusers(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
 ) -> Any:
     """
-    Retrieve genreusers.
-    """
+    Retrieve genreusers, ordered by (user_id, genre_id).
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(GenreUser)
+    Pass the `next_cursor` of a page as `cursor` to get the next one: every page
+    seeks into the ix_UserGenre_user_id_genre_id index, however deep it is. The rows
+    are counted on the first page only: the cursor carries the count to the next ones.
+    """
+    count_statement = select(func.count()).select_from(GenreUser)
+    statement = select(GenreUser).order_by(GenreUser.user_id, GenreUser.genre_id)
+    if not current_user.is_superuser:
+        count_statement = count_statement.where(GenreUser.user_id == current_user.user_id)
+        statement = statement.where(GenreUser.user_id == current_user.user_id)
+    if cursor is None:
         count = session.execute(count_statement).scalar()
-        statement = select(GenreUser).offset(skip).limit(limit)
-        genreusers = session.execute(statement).scalars().all()
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(GenreUser)
-            .where(GenreUser.user_id == current_user.user_id)
-        )
-        count = session.execute(count_statement).scalar()
-        statement = (
-            select(GenreUser)
-            .where(GenreUser.user_id == current_user.user_id)
-            .offset(skip)
-            .limit(limit)
-        )
-        genreusers = session.execute(statement).scalars().all()
-
-    return GenreUsersOut(data=genreusers, count=count)
+        try:
+            user_id, genre_id, count = decode_cursor(cursor, (int, int, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        statement = statement.where(tuple_(GenreUser.user_id, GenreUser.genre_id) > (user_id, genre_id))
+    genreusers = session.execute(statement.limit(limit + 1)).scalars().all()
+
+    next_cursor = None
+    if len(genreusers) > limit:
+        genreusers = genreusers[:limit]
+        next_cursor = encode_cursor((genreusers[-1].user_id, genreusers[-1].genre_id, count))
+    return GenreUsersOut(data=genreusers, count=count, next_cursor=next_cursor)
 
 # Not needed for now
 # @router.get("/{id}", response_model=GenreUserOut)
@@ -1,9 +1,11 @@
 from typing import Any, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import tuple_
 from sqlmodel import func, select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
 from app.models import (
     MovieUser,
     MovieUserCreate,
@@ -13,39 +15,45 @@ from app.models import (
     Message,
     MovieUserUpdate,
 )
+from app.utils import decode_cursor, encode_cursor
 
 router = APIRouter()
 
 
 @router.get("/", response_model=MovieUsersOut)
 def read_movieusers(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
 ) -> Any:
     """
-    Retrieve movieusers.
-    """
+    Retrieve movieusers, ordered by (user_id, movie_id).
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(MovieUser)
+    Pass the `next_cursor` of a page as `cursor` to get the next one: every page
+    seeks into the ix_MovieUsers_user_id_movie_id index, however deep it is. The rows
+    are counted on the first page only: the cursor carries the count to the next ones.
+    """
+    count_statement = select(func.count()).select_from(MovieUser)
+    statement = select(MovieUser).order_by(MovieUser.user_id, MovieUser.movie_id)
+    if not current_user.is_superuser:
+        count_statement = count_statement.where(MovieUser.user_id == current_user.user_id)
+        statement = statement.where(MovieUser.user_id == current_user.user_id)
+    if cursor is None:
         count = session.execute(count_statement).scalar()
-        statement = select(MovieUser).offset(skip).limit(limit)
-        movieusers = session.execute(statement).scalars().all()
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(MovieUser)
-            .where(MovieUser.user_id == current_user.user_id)
-        )
-        count = session.execute(count_statement).scalar()
-        statement = (
-            select(MovieUser)
-            .where(MovieUser.user_id == current_user.user_id)
-            .offset(skip)
-            .limit(limit)
-        )
-        movieusers = session.execute(statement).scalars().all()
+        try:
+            user_id, movie_id, count = decode_cursor(cursor, (int, int, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        statement = statement.where(tuple_(MovieUser.user_id, MovieUser.movie_id) > (user_id, movie_id))
+    movieusers = session.execute(statement.limit(limit + 1)).scalars().all()
 
-    return MovieUsersOut(data=movieusers, count=count)
+    next_cursor = None
+    if len(movieusers) > limit:
+        movieusers = movieusers[:limit]
+        next_cursor = encode_cursor((movieusers[-1].user_id, movieusers[-1].movie_id, count))
+    return MovieUsersOut(data=movieusers, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{id}", response_model=MovieUserOut)
@@ -1,7 +1,7 @@
 from crypt import methods
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import col, delete, func, select
 
 from app import crud
@@ -25,7 +25,12 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import (
+    decode_cursor,
+    encode_cursor,
+    generate_new_account_email,
+    send_email,
+)
 
 router = APIRouter()
 
@@ -33,18 +38,35 @@ router = APIRouter()
 @router.get(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UsersOut
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
-    """
-    Retrieve users.
+def read_users(
+    session: SessionDep,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+) -> Any:
     """
+    Retrieve users, ordered by user_id.
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.execute(count_statement).scalar()
-
-    statement = select(User).offset(skip).limit(limit)
-    users = session.execute(statement).scalars().all()
+    Pass the `next_cursor` of a page as `cursor` to get the next one. The users are
+    counted on the first page only: the cursor carries the count to the next ones.
+    """
 
-    return UsersOut(data=users, count=count)
+    statement = select(User).order_by(User.user_id)
+    if cursor is None:
+        count_statement = select(func.count()).select_from(User)
+        count = session.execute(count_statement).scalar()
+    else:
+        try:
+            after, count = decode_cursor(cursor, (int, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        statement = statement.where(User.user_id > after)
+    users = session.execute(statement.limit(limit + 1)).scalars().all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor((users[-1].user_id, count))
+    return UsersOut(data=users, count=count, next_cursor=next_cursor)
 
 
 @router.post(
@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 from pydantic import EmailStr
 from datetime import date
@@ -105,6 +106,7 @@ class UserOut(UserBase):
 class UsersOut(SQLModel):
     data: list[UserOut]
     count: int
+    next_cursor: str | None = None
 
 
 # Shared properties
@@ -129,6 +131,8 @@ class MovieUserUpdate(MovieUserBase):
 # Database model, database table inferred from class name
 class MovieUser(MovieUserBase, table=True):
     __tablename__ = "MovieUsers"
+    # Keyset pagination of GET /movieusers/ seeks on (user_id, movie_id)
+    __table_args__ = (Index("ix_MovieUsers_user_id_movie_id", "user_id", "movie_id"),)
     movie_id: int | None = Field(
         default=None, primary_key=True, foreign_key="Movies.movie_id"
     )
@@ -149,6 +153,7 @@ class MovieUserOut(MovieUserBase):
 class MovieUsersOut(SQLModel):
     data: list[MovieUserOut]
     count: int
+    next_cursor: str | None = None
 
 
 class GenreUserBase(SQLModel):
@@ -167,6 +172,8 @@ class GenreUserUpdate(SQLModel):
 # Database model, database table inferred from class name
 class GenreUser(SQLModel, table=True):
     __tablename__ = "UserGenre"
+    # Keyset pagination of GET /genreusers/ seeks on (user_id, genre_id)
+    __table_args__ = (Index("ix_UserGenre_user_id_genre_id", "user_id", "genre_id"),)
     genre_id: Optional[int] = Field(
         default=None, primary_key=True, foreign_key="Genres.genre_id"
     )
@@ -184,6 +191,7 @@ class GenreUserOut(GenreUserBase):
 class GenreUsersOut(SQLModel):
     data: list[GenreUserOut]
     count: int
+    next_cursor: str | None = None
 
 
 # Generic message
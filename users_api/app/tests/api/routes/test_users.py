@@ -25,6 +25,28 @@ def test_read_users_with_role_admin():
     assert response.json()["data"][0]["email"] == "admin@example.com"
 
 
+def test_read_users_by_pages():
+    user_data = {"username": "admin@example.com", "password": "password"}
+    response = client.post("/api/v1/login/access-token", data=user_data)
+    token = response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+    everyone = client.get("/api/v1/users/", headers=headers).json()["data"]
+    users, params = [], {"limit": 2}
+    while True:
+        response = client.get("/api/v1/users/", headers=headers, params=params)
+        assert response.status_code == 200
+        assert response.json()["count"] == len(everyone)
+        users += response.json()["data"]
+        if response.json()["next_cursor"] is None:
+            break
+        params["cursor"] = response.json()["next_cursor"]
+    assert [user["user_id"] for user in users] == [user["user_id"] for user in everyone]
+    response = client.get("/api/v1/users/", headers=headers, params={"cursor": "nope"})
+    assert response.status_code == 400
+    response = client.get("/api/v1/users/", headers=headers, params={"limit": 0})
+    assert response.status_code == 422
+
+
 def test_read_own_user():
     user_data = {"username": "newuser@example.com", "password": "newpassword3"}
     response = client.post("/api/v1/login/access-token", data=user_data)
@@ -1,8 +1,10 @@
+import base64
+import json
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 import emails  # type: ignore
 import jwt
@@ -116,3 +118,23 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes the sort key of the last row of a page into an opaque, URL-safe cursor."""
+    data = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> tuple[Any, ...]:
+    """Decodes a cursor made by `encode_cursor` into values of the given types; raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    # bool is a subclass of int, but never part of a sort key
+    if any(isinstance(value, bool) or not isinstance(value, kind) for value, kind in zip(values, types)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(values)